@@ -42,11 +42,11 @@
                 <svg class="w-8 h-8 mr-3 text-emerald-600" fill="none" stroke="currentColor" viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M7 12l3-3 3 3 4-4M18 10a8 8 0 11-16 0 8 8 0 0116 0zm-5 4v-4m0 0l-3 3m3-3l3 3"></path></svg>
                 Time-Series Stock Price Predictor
             </h1>
-            <p class="text-gray-500 mt-1">Simulating a Data Science backend for financial forecasting.</p>
+            <p class="text-gray-500 mt-1">Forecasts served live by the Python prediction service.</p>
         </header>
 
         <!-- Input and Configuration (Dark Control Panel Redesign) -->
-        <div class="card bg-gray-800 p-6 rounded-xl mb-8 grid grid-cols-1 md:grid-cols-4 gap-4 items-end text-white shadow-xl">
+        <div class="card bg-gray-800 p-6 rounded-xl mb-8 grid grid-cols-1 md:grid-cols-5 gap-4 items-end text-white shadow-xl">
             <div>
                 <label for="ticker" class="block text-sm font-medium text-gray-300">Stock Ticker (e.g., GOOG, AAPL)</label>
                 <input type="text" id="ticker" value="GOOG" class="mt-1 block w-full p-2 border border-gray-600 rounded-lg uppercase shadow-sm focus:ring-emerald-500 focus:border-emerald-500 bg-gray-700 text-white">
@@ -55,6 +55,15 @@
                 <label for="prediction-days" class="block text-sm font-medium text-gray-300">Prediction Days (Max 30)</label>
                 <input type="number" id="prediction-days" value="14" min="1" max="30" class="mt-1 block w-full p-2 border border-gray-600 rounded-lg shadow-sm focus:ring-emerald-500 focus:border-emerald-500 bg-gray-700 text-white">
             </div>
+            <div>
+                <label for="resolution" class="block text-sm font-medium text-gray-300">Bar Resolution</label>
+                <select id="resolution" class="mt-1 block w-full p-2 border border-gray-600 rounded-lg shadow-sm focus:ring-emerald-500 focus:border-emerald-500 bg-gray-700 text-white">
+                    <option value="1d" selected>Daily</option>
+                    <option value="30m">30 minutes</option>
+                    <option value="5m">5 minutes</option>
+                    <option value="1m">1 minute</option>
+                </select>
+            </div>
             <div class="md:col-span-2">
                 <button onclick="runPrediction()" id="run-button" class="w-full py-2.5 px-4 bg-emerald-500 text-white font-bold rounded-lg hover:bg-emerald-400 transition duration-200 shadow-xl flex items-center justify-center">
                     <span id="button-text">Run Prediction Model</span>
@@ -117,6 +126,107 @@
         
     </div>
 
+    <!-- Chart data preparation, run in a Web Worker (see chartWorker below) -->
+    <script id="chart-worker-source" type="text/js-worker">
+        // Fetches /predict/stream (NDJSON), decodes each event into a date list
+        // and Float64Array columns (null -> NaN), decimates long series with
+        // LTTB, and transfers the columns to the page without copying.
+        const PREDICTED_FIELDS = ['price', 'lower_bound', 'upper_bound'];
+        let activeRun = null;
+
+        /** Indices kept by Largest-Triangle-Three-Buckets (every index if the series fits the budget). */
+        function lttbIndices(y, budget) {
+            const n = y.length;
+            if (!budget || n <= budget || n <= 3) return Uint32Array.from({ length: n }, (_, i) => i);
+            budget = Math.max(budget, 3);
+            const selected = new Uint32Array(budget);
+            const bucketSize = (n - 2) / (budget - 2);
+            let anchor = 0;
+            for (let bucket = 0; bucket < budget - 2; bucket++) {
+                const start = Math.floor(bucket * bucketSize) + 1;
+                const stop = Math.floor((bucket + 1) * bucketSize) + 1;
+                // Third triangle vertex: the next bucket's centroid (the last point for the last bucket)
+                const nextStop = Math.min(Math.floor((bucket + 2) * bucketSize) + 1, n);
+                let meanX = n - 1, meanY = y[n - 1];
+                if (nextStop > stop) {
+                    meanX = 0;
+                    meanY = 0;
+                    for (let i = stop; i < nextStop; i++) { meanX += i; meanY += y[i]; }
+                    meanX /= nextStop - stop;
+                    meanY /= nextStop - stop;
+                }
+                let best = start, bestArea = -1;
+                for (let i = start; i < stop; i++) {
+                    const area = Math.abs((anchor - meanX) * (y[i] - y[anchor]) - (anchor - i) * (meanY - y[anchor]));
+                    if (area > bestArea) { bestArea = area; best = i; }
+                }
+                selected[bucket + 1] = anchor = best;
+            }
+            selected[budget - 1] = n - 1;
+            return selected;
+        }
+
+        /** Posts one event's records as columns, decimated to budget points on the first field. */
+        function postColumns(id, type, records, fields, budget, extra) {
+            const columns = {};
+            for (const field of fields) {
+                const values = new Float64Array(records.length);
+                for (let i = 0; i < records.length; i++) values[i] = records[i][field] ?? NaN;
+                columns[field] = values;
+            }
+            let dates = records.map(record => record.date);
+            const keep = lttbIndices(columns[fields[0]], budget);
+            if (keep.length < records.length) {
+                dates = Array.from(keep, i => dates[i]);
+                for (const field of fields) columns[field] = Float64Array.from(keep, i => columns[field][i]);
+            }
+            self.postMessage({ id, type, dates, ...columns, ...extra }, Object.values(columns).map(c => c.buffer));
+        }
+
+        function handleEvent(id, event, budget) {
+            if (event.event === 'error') throw new Error(event.error);
+            if (event.event === 'history') {
+                postColumns(id, 'history', event.historical_data, ['price'], budget, { latestPrice: event.latest_price });
+            } else if (event.event === 'points') {
+                // Blocks are already downsampled to their share of the budget
+                postColumns(id, 'points', event.predicted_data, PREDICTED_FIELDS, 0);
+            } else if (event.event === 'quantiles') {
+                postColumns(id, 'quantiles', event.predicted_data, PREDICTED_FIELDS, budget);
+            }
+        }
+
+        async function run(id, url, budget) {
+            if (activeRun) activeRun.abort(); // A new run cancels the stream of the previous one
+            const controller = activeRun = new AbortController();
+            try {
+                const response = await fetch(url, { signal: controller.signal });
+                if (!response.ok) {
+                    const payload = await response.json();
+                    throw new Error(payload.error || `HTTP ${response.status}`);
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffered = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffered += decoder.decode(value, { stream: true });
+                    let newline;
+                    while ((newline = buffered.indexOf('\n')) >= 0) {
+                        const line = buffered.slice(0, newline);
+                        buffered = buffered.slice(newline + 1);
+                        if (line) handleEvent(id, JSON.parse(line), budget);
+                    }
+                }
+                self.postMessage({ id, type: 'done' });
+            } catch (error) {
+                if (error.name !== 'AbortError') self.postMessage({ id, type: 'error', message: error.message });
+            }
+        }
+
+        self.onmessage = ({ data }) => run(data.id, data.url, data.budget);
+    </script>
+
     <script>
         // --- Global Variables ---
         let priceChartInstance = null;
@@ -162,78 +272,71 @@
             }
         }
 
-        // --- Core Prediction Logic (Simulates Python Backend Call) ---
+        // --- Core Prediction Logic (Python Backend Call) ---
+
+        // Base URL of the asyncio prediction service (python server.py --port 8000)
+        const API_BASE_URL = 'http://127.0.0.1:8000';
 
         /**
-         * Simulates the API call to the Python model.
+         * Points per series the chart can actually show: history and forecast
+         * share the x-axis, so each gets about half of the chart's device pixels.
+         * The server downsamples longer (intraday) series to this budget.
          */
-        function simulate_api_call(ticker, predictionDays) {
-            return new Promise(resolve => {
-                // Introduce artificial delay to mimic network latency and model training time
-                setTimeout(() => {
-                    const days = 90; // Historical days
-                    const historicalData = [];
-                    let basePrice = 150.00;
-                    if (ticker === 'AAPL') basePrice = 180.00;
-                    if (ticker === 'TSLA') basePrice = 250.00;
-                    if (ticker === 'GOOG') basePrice = 145.00; // Adjusted for GOOG mock
-
-                    let date = new Date();
-                    date.setDate(date.getDate() - days);
-
-                    // Generate Historical Data
-                    for (let i = 0; i < days; i++) {
-                        let price = basePrice + (i * 0.15) + (Math.random() - 0.5) * 2.0;
-                        historicalData.push({
-                            "date": date.toISOString().split('T')[0],
-                            "price": Math.round(price * 100) / 100
-                        });
-                        date.setDate(date.getDate() + 1);
-                    }
-                    
-                    // Generate Predicted Data
-                    const predictedPrices = [];
-                    let currentPrice = historicalData[historicalData.length - 1]['price'];
-
-                    for (let i = 1; i <= predictionDays; i++) {
-                        let trend = (Math.random() * 0.5) + 0.1; 
-                        let noise = (Math.random() - 0.5) * 1.5;
-                        
-                        currentPrice = currentPrice * (1 + (trend + noise) / 100);
-                        if (currentPrice < 50) currentPrice = 50;
-                        
-                        // Confidence Interval Logic
-                        const confidence_multiplier = 0.005 + (i * 0.001); 
-                        const lower_bound = currentPrice * (1 - confidence_multiplier);
-                        const upper_bound = currentPrice * (1 + confidence_multiplier);
-
-                        let futureDate = new Date();
-                        futureDate.setDate(futureDate.getDate() + i);
-                        
-                        predictedPrices.push({
-                            "date": futureDate.toISOString().split('T')[0],
-                            "price": Math.round(currentPrice * 100) / 100,
-                            "lower_bound": Math.round(lower_bound * 100) / 100,
-                            "upper_bound": Math.round(upper_bound * 100) / 100
-                        });
-                    }
+        function chartPointBudget() {
+            const width = document.getElementById('priceChart').parentElement.clientWidth || window.innerWidth;
+            return Math.max(100, Math.round(width * (window.devicePixelRatio || 1) / 2));
+        }
+
+        // Stream decoding, column building and decimation run in a Web Worker
+        // (source in the chart-worker-source script below), so long histories
+        // never block the page; it posts typed-array columns per event.
+        const chartWorker = new Worker(URL.createObjectURL(new Blob(
+            [document.getElementById('chart-worker-source').textContent], { type: 'text/javascript' })));
+        let currentRun = null;
 
-                    const latestPrice = historicalData[historicalData.length - 1]['price'];
-                    
-                    resolve({
-                        ticker: ticker,
-                        latest_price: latestPrice,
-                        historical_data: historicalData,
-                        predicted_data: predictedPrices
-                    });
-                }, 2500); // 2.5 seconds delay
+        /**
+         * Streams a prediction from the Python service (/predict/stream) through
+         * the worker and hands each decoded event to onEvent as it arrives.
+         * Starting a new run supersedes (and settles) the previous one.
+         */
+        function streamPrediction(ticker, predictionDays, resolution, onEvent) {
+            const params = new URLSearchParams({
+                ticker: ticker, days: predictionDays, resolution: resolution, points: chartPointBudget()
+            });
+            if (currentRun) currentRun.resolve();
+            return new Promise((resolve, reject) => {
+                const run = currentRun = { id: (currentRun ? currentRun.id : 0) + 1, resolve: resolve };
+                chartWorker.onmessage = ({ data }) => {
+                    if (data.id !== run.id) return; // Late message from a superseded run
+                    if (data.type === 'done') resolve();
+                    else if (data.type === 'error') reject(new Error(data.message));
+                    else onEvent(data);
+                };
+                chartWorker.postMessage({
+                    id: run.id, url: `${API_BASE_URL}/predict/stream?${params}`, budget: chartPointBudget()
+                });
             });
         }
 
+        /** Updates the KPI cards from the latest price and the last forecast price drawn so far. */
+        function updateKpis(latestPrice, predictedPrice) {
+            document.getElementById('kpi-latest-price').textContent = formatCurrency(latestPrice);
+            if (predictedPrice === undefined) return;
+
+            const change = predictedPrice - latestPrice; // Calculate change here
+            document.getElementById('kpi-predicted-end').textContent = formatCurrency(predictedPrice);
+
+            // --- KPI Change update using new icon/color logic ---
+            document.getElementById('kpi-change').innerHTML = formatPercentage(latestPrice, predictedPrice);
+            document.getElementById('kpi-change-icon').innerHTML = getChangeIcon(change);
+            // --------------------------------------------------
+        }
+
         /** Main function to orchestrate the prediction and UI update. */
         async function runPrediction() {
             const ticker = document.getElementById('ticker').value.trim().toUpperCase();
             const days = parseInt(document.getElementById('prediction-days').value);
+            const resolution = document.getElementById('resolution').value;
             
             if (!ticker || days < 1 || days > 30) {
                 // Use the UI element to display error
@@ -247,31 +350,27 @@
 
             setLoadingState(true);
             document.getElementById('initial-message').classList.add('hidden');
-            document.getElementById('results-area').classList.add('hidden');
 
             try {
-                // Call the mock backend
-                const result = await simulate_api_call(ticker, days);
-
-                // Update KPIs
-                const latestPrice = result.latest_price;
-                const predictedPrice = result.predicted_data[result.predicted_data.length - 1].price;
-                const change = predictedPrice - latestPrice; // Calculate change here
-
-                document.getElementById('kpi-latest-price').textContent = formatCurrency(latestPrice);
-                document.getElementById('kpi-predicted-end').textContent = formatCurrency(predictedPrice);
-                
-                // --- KPI Change update using new icon/color logic ---
-                document.getElementById('kpi-change').innerHTML = formatPercentage(latestPrice, predictedPrice);
-                document.getElementById('kpi-change-icon').innerHTML = getChangeIcon(change); 
-                // --------------------------------------------------
-
-                // Update Chart
-                renderPriceChart(result);
-                document.getElementById('chart-title').textContent = `Price Trend and Forecast for ${ticker}`;
-                document.getElementById('results-area').classList.remove('hidden');
+                // Stream from the Python backend: draw the history first, then
+                // append forecast points (or refine Monte Carlo bands) as they arrive
+                let latestPrice = null;
+                await streamPrediction(ticker, days, resolution, message => {
+                    if (message.type === 'history') {
+                        latestPrice = message.latestPrice;
+                        showHistory(message);
+                        document.getElementById('chart-title').textContent = `Price Trend and Forecast for ${ticker}`;
+                        document.getElementById('results-area').classList.remove('hidden');
+                    } else if (message.type === 'points') {
+                        appendPredictedPoints(message);
+                    } else if (message.type === 'quantiles') {
+                        replacePredictedPoints(message);
+                    }
+                    if (latestPrice !== null) updateKpis(latestPrice, lastForecastPrice());
+                });
 
             } catch (error) {
+                document.getElementById('results-area').classList.add('hidden');
                 document.getElementById('initial-message').innerHTML = `
                     <p class="text-red-500 font-semibold">❌ Prediction Failed: ${error.message}</p>
                 `;
@@ -285,22 +384,89 @@
 
         // --- Chart Rendering ---
 
-        function renderPriceChart(data) {
-            if (priceChartInstance) priceChartInstance.destroy();
+        // Histories longer than this are drawn without point markers
+        const DENSE_POINTS = 200;
+
+        // The chart's series as typed arrays on a category axis of chartSeries.labels
+        // (history dates, then forecast dates). The history is the worker's
+        // Float64Array as is; the forecast columns grow in place (NaN before the
+        // forecast starts) and the chart gets zero-copy views of their filled
+        // part. The chart is built once; new runs and streamed points only
+        // reassign the views to its datasets and redraw.
+        const chartSeries = {
+            labels: [], historyLength: 0, history: new Float64Array(0),
+            predicted: growableColumn(), upper: growableColumn(), lower: growableColumn()
+        };
+
+        function growableColumn() {
+            return { values: new Float64Array(0), length: 0 };
+        }
 
-            const ctx = document.getElementById('priceChart').getContext('2d');
+        /** Writes values into a growable column at position offset (NaN-filling any gap before it). */
+        function writeColumn(column, values, offset) {
+            const end = offset + values.length;
+            if (end > column.values.length) {
+                // Doubling keeps a stream of blocks at amortized O(1) per point
+                const grown = new Float64Array(Math.max(end, 2 * column.values.length));
+                grown.set(column.values.subarray(0, column.length));
+                column.values = grown;
+            }
+            column.values.fill(NaN, column.length, offset);
+            column.values.set(values, offset);
+            column.length = end;
+        }
 
-            // 1. Combine all data points for the X-Axis labels
-            const allPoints = [...data.historical_data, ...data.predicted_data];
-            const labels = allPoints.map(p => p.date);
+        /** The filled part of a growable column, as a view for the chart. */
+        function columnView(column) {
+            return column.values.subarray(0, column.length);
+        }
 
-            // 2. Prepare datasets
-            const historicalPrices = data.historical_data.map(p => p.price);
-            const predictedPrices = Array(data.historical_data.length).fill(NaN).concat(data.predicted_data.map(p => p.price));
-            
-            // Confidence Band Data
-            const lowerBound = Array(data.historical_data.length).fill(NaN).concat(data.predicted_data.map(p => p.lower_bound));
-            const upperBound = Array(data.historical_data.length).fill(NaN).concat(data.predicted_data.map(p => p.upper_bound));
+        function lastForecastPrice() {
+            const { predicted, labels, historyLength } = chartSeries;
+            return labels.length > historyLength ? predicted.values[predicted.length - 1] : undefined;
+        }
+
+        /** Starts a new run's series from its (decoded, decimated) history. */
+        function showHistory(message) {
+            chartSeries.labels = message.dates;
+            chartSeries.historyLength = message.dates.length;
+            chartSeries.history = message.price;
+            chartSeries.predicted.length = chartSeries.upper.length = chartSeries.lower.length = 0;
+            refreshChart();
+        }
+
+        /** Appends forecast points to the existing chart without rebuilding it. */
+        function appendPredictedPoints(message) {
+            const offset = chartSeries.labels.length;
+            for (const date of message.dates) chartSeries.labels.push(date);
+            writeColumn(chartSeries.predicted, message.price, offset);
+            writeColumn(chartSeries.upper, message.upper_bound, offset);
+            writeColumn(chartSeries.lower, message.lower_bound, offset);
+            refreshChart();
+        }
+
+        /** Replaces the forecast part of the chart (Monte Carlo snapshots refine the whole horizon). */
+        function replacePredictedPoints(message) {
+            chartSeries.labels.length = chartSeries.historyLength;
+            appendPredictedPoints(message);
+        }
+
+        /** Points the existing datasets at the current series and redraws without animation. */
+        function refreshChart() {
+            const chart = priceChartInstance || createPriceChart();
+            const [history, predicted, upper, lower] = chart.data.datasets;
+            chart.data.labels = chartSeries.labels;
+            history.data = chartSeries.history;
+            history.pointRadius = chartSeries.historyLength > DENSE_POINTS ? 0 : 1;
+            predicted.data = columnView(chartSeries.predicted);
+            upper.data = columnView(chartSeries.upper);
+            lower.data = columnView(chartSeries.lower);
+            chart.update('none');
+        }
+
+        /** Builds the one chart instance the page reuses for every run. */
+        function createPriceChart() {
+            const ctx = document.getElementById('priceChart').getContext('2d');
 
             // Create a gradient fill for the historical data (looks professional)
             const historicalGradient = ctx.createLinearGradient(0, 0, 0, 400);
@@ -310,11 +476,13 @@
             priceChartInstance = new Chart(ctx, {
                 type: 'line',
                 data: {
-                    labels: labels,
+                    // Values are typed arrays indexed like chartSeries.labels; NaN
+                    // (history positions of the forecast series) is not drawn
+                    labels: [],
                     datasets: [
                         {
                             label: 'Historical Price',
-                            data: historicalPrices,
+                            data: [],
                             borderColor: '#10b981', // Emerald-500
                             backgroundColor: historicalGradient,
                             fill: true,
@@ -325,7 +493,7 @@
                         },
                         {
                             label: 'Predicted Price',
-                            data: predictedPrices,
+                            data: [],
                             borderColor: '#6366f1', // Indigo-500
                             borderDash: [5, 5],
                             tension: 0.3,
@@ -338,7 +506,7 @@
                         // Upper Bound (Line for band top)
                         {
                             label: 'Upper Bound (95% CI)',
-                            data: upperBound,
+                            data: [],
                             borderColor: 'rgba(99, 102, 241, 0.2)', // Light Indigo
                             borderWidth: 1,
                             tension: 0.3,
@@ -353,7 +521,7 @@
                         // Lower Bound (Line for band bottom)
                         {
                             label: 'Lower Bound (95% CI)',
-                            data: lowerBound,
+                            data: [],
                             borderColor: 'rgba(99, 102, 241, 0.2)', // Light Indigo
                             borderWidth: 1,
                             tension: 0.3,
@@ -366,7 +534,9 @@
                 options: {
                     responsive: true,
                     maintainAspectRatio: false,
+                    animation: false,
                     plugins: { 
+                        // Series arrive decimated to the chart's pixel budget (server and worker LTTB)
                         legend: { 
                             position: 'top',
                             labels: {
@@ -375,7 +545,12 @@
                                     return legendItem.datasetIndex !== 2 && legendItem.datasetIndex !== 3;
                                 }
                             }
-                        } 
+                        },
+                        tooltip: {
+                            callbacks: {
+                                label: item => `${item.dataset.label}: ${formatCurrency(item.parsed.y)}`
+                            }
+                        }
                     },
                     scales: {
                         y: {
@@ -387,23 +562,19 @@
                             grid: { display: false },
                             ticks: { 
                                 maxTicksLimit: 10, // Limit ticks to keep the axis clean
-                                autoSkip: true,
+                                autoSkip: true
                             }
                         }
                     },
                     interaction: {
-                        mode: 'index',
+                        // History and forecast values sit at different label positions, so match by x
+                        mode: 'nearest',
+                        axis: 'x',
                         intersect: false,
-                    },
-                    tooltips: {
-                        callbacks: {
-                            label: function(tooltipItem, data) {
-                                return formatCurrency(tooltipItem.raw);
-                            }
-                        }
                     }
                 }
             });
+            return priceChartInstance;
         }
         
         // Attach global function to the window object
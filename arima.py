@@ -0,0 +1,189 @@
+# =================================================================
+# ARIMA(p, d, 0) MODEL, BATCHED ACROSS TICKERS
+# Fits an autoregressive model to the d-times differenced log prices of
+# a whole tickers x days matrix at once:
+#   - sample autocovariances for lags 0..p (one vectorized pass per lag)
+#   - Levinson-Durbin recursion for the Yule-Walker AR coefficients and
+#     the innovation variance, O(p^2) per ticker, vectorized over tickers
+# Forecasts are the conditional mean of the log price; the prediction
+# interval variance comes from the psi-weights of the integrated model,
+# sigma^2 * sum(psi_j^2), so the bounds are analytic (no simulation).
+# =================================================================
+
+from statistics import NormalDist
+
+import numpy as np
+
+DEFAULT_ORDER = (5, 1, 0)  # (p, d, q); only q = 0 is supported
+
+
+def check_order(order):
+    """Validates an (p, d, q) order and returns (p, d)."""
+    p, d, q = order
+    if q != 0:
+        raise ValueError("Only ARIMA(p, d, 0) models are supported (q must be 0).")
+    if p < 1 or d < 0:
+        raise ValueError("The ARIMA order needs p >= 1 and d >= 0.")
+    return int(p), int(d)
+
+
+def difference(values, d):
+    """Differences a matrix d times along the last axis (NaN padding propagates)."""
+    for _ in range(d):
+        values = np.diff(values, axis=-1)
+    return values
+
+
+def autocovariances(series, max_lag):
+    """
+    Biased sample autocovariances gamma_0..gamma_max_lag of every row.
+
+    NaN marks missing leading values (right-aligned histories, see
+    fitting.stack_histories); each row uses its own valid length. The
+    biased (1/n) estimator keeps the Toeplitz matrix positive definite,
+    so the fitted AR polynomial is always stationary.
+
+    Returns:
+        (mean, gamma, n): row means, a rows x (max_lag + 1) array and the
+        number of valid values per row.
+    """
+    valid = ~np.isnan(series)
+    n = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, series, 0.0).sum(axis=1) / n
+        centred = np.where(valid, series - mean[:, None], 0.0)
+        length = series.shape[1]
+        gamma = np.stack([
+            (centred[:, lag:] * centred[:, :length - lag]).sum(axis=1) / n
+            for lag in range(max_lag + 1)
+        ], axis=1)
+    return mean, gamma, n
+
+
+def levinson_durbin(gamma, p):
+    """
+    Solves the Yule-Walker equations of order p for every row with the
+    Levinson-Durbin recursion.
+
+    Args:
+        gamma: rows x (p + 1) autocovariances.
+        p: AR order.
+
+    Returns:
+        (phi, sigma2): rows x p AR coefficients (phi[:, 0] multiplies the
+        most recent value) and the innovation variances.
+    """
+    rows = gamma.shape[0]
+    phi = np.zeros((rows, p))
+    variance = gamma[:, 0].copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for k in range(p):
+            # Reflection coefficient of order k + 1
+            kappa = (gamma[:, k + 1] - (phi[:, :k] * gamma[:, k:0:-1]).sum(axis=1)) / variance
+            if k:
+                phi[:, :k] -= kappa[:, None] * phi[:, :k][:, ::-1]
+            phi[:, k] = kappa
+            variance = variance * (1.0 - kappa * kappa)
+    return phi, variance
+
+
+def fit_arima(prices, order=DEFAULT_ORDER):
+    """
+    Fits ARIMA(p, d, 0) to the log prices of every row of a tickers x days
+    matrix (oldest day first, NaN for missing leading days).
+
+    Returns:
+        A dictionary of per-ticker arrays: 'phi' (tickers x p), 'mean'
+        (mean of the differenced series, i.e. the drift when d = 1),
+        'sigma2' (innovation variance), 'n_obs', plus 'order'. Rows with
+        too few values for the order get NaN estimates.
+    """
+    p, d = check_order(order)
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        series = difference(np.log(prices), d)
+    mean, gamma, n = autocovariances(series, p)
+    phi, sigma2 = levinson_durbin(gamma, p)
+
+    enough = n > p + 1
+    return {
+        "phi": np.where(enough[:, None], phi, np.nan),
+        "mean": np.where(enough, mean, np.nan),
+        "sigma2": np.where(enough, sigma2, np.nan),
+        "n_obs": n,
+        "order": (p, d, 0),
+    }
+
+
+def arima_params(fit, row=0):
+    """
+    Returns one row of a fit as the params dictionary the forecast takes,
+    or None when that row could not be fitted.
+    """
+    if np.isnan(fit["sigma2"][row]) or np.isnan(fit["mean"][row]):
+        return None
+    return {"phi": fit["phi"][row:row + 1], "mean": fit["mean"][row:row + 1],
+            "sigma2": fit["sigma2"][row:row + 1], "order": fit["order"]}
+
+
+def psi_weights(phi, d, horizon):
+    """
+    Psi-weights psi_0..psi_{horizon-1} of the integrated model, i.e. of
+    the AR polynomial phi(B) * (1 - B)^d, for every row of phi.
+    """
+    rows, p = phi.shape
+    # Coefficients of phi(B) (1 - B)^d as polynomial in B: 1 - sum(a_i B^i)
+    polynomial = np.concatenate((np.ones((rows, 1)), -phi), axis=1)
+    for _ in range(d):
+        polynomial = np.concatenate((polynomial, np.zeros((rows, 1))), axis=1)
+        polynomial[:, 1:] -= polynomial[:, :-1].copy()
+    a = -polynomial[:, 1:]
+
+    psi = np.zeros((rows, horizon))
+    psi[:, 0] = 1.0
+    for j in range(1, horizon):
+        terms = min(j, a.shape[1])
+        psi[:, j] = (a[:, :terms] * psi[:, j - terms:j][:, ::-1]).sum(axis=1)
+    return psi
+
+
+def forecast_arima(prices, fit, horizon, confidence=0.95):
+    """
+    Forecasts every row `horizon` steps ahead.
+
+    Args:
+        prices: tickers x days price matrix the fit came from (only the
+            last p + d days are used).
+        fit: Output of fit_arima (or arima_params for a single row).
+        horizon: Steps to forecast.
+        confidence: Central prediction interval width.
+
+    Returns:
+        Dictionary of tickers x horizon arrays: 'price' (the median,
+        exp of the conditional mean log price), 'lower_bound' and
+        'upper_bound'.
+    """
+    p, d = check_order(fit["order"])
+    phi, mean, sigma2 = fit["phi"], fit["mean"], fit["sigma2"]
+    log_prices = np.log(np.atleast_2d(np.asarray(prices, dtype=np.float64))[:, -(p + d + 1):])
+
+    # 1. Conditional mean of the differenced series, step by step
+    series = difference(log_prices, d)[:, -p:] - mean[:, None]
+    path = np.concatenate((series, np.zeros((len(series), horizon))), axis=1)
+    for h in range(horizon):
+        path[:, p + h] = (phi * path[:, h:p + h][:, ::-1]).sum(axis=1)
+    forecast = path[:, p:] + mean[:, None]
+
+    # 2. Undo the differencing: integrate from the last value of each level
+    for level in range(d - 1, -1, -1):
+        last = difference(log_prices, level)[:, -1:]
+        forecast = last + np.cumsum(forecast, axis=1)
+
+    # 3. Analytic interval: Var(h) = sigma^2 * sum_{j < h} psi_j^2
+    variance = sigma2[:, None] * np.cumsum(psi_weights(phi, d, horizon) ** 2, axis=1)
+    spread = NormalDist().inv_cdf(0.5 + confidence / 2) * np.sqrt(variance)
+    return {
+        "price": np.exp(forecast),
+        "lower_bound": np.exp(forecast - spread),
+        "upper_bound": np.exp(forecast + spread),
+    }
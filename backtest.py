@@ -0,0 +1,252 @@
+# =================================================================
+# WALK-FORWARD BACKTESTING
+# Replays each ticker's history over rolling forecast origins: at every
+# origin the model is fitted on the trailing training window only, the
+# forecast engine predicts the next `horizon` days, and the forecast is
+# scored against the prices that followed. All origins of a ticker are
+# fitted (fitting.fit_matrix over a sliding-window view) and forecast in
+# one vectorized pass; tickers are sharded over a process pool.
+#
+#     python backtest.py --file universe.txt --horizon 30 --days 2520 --workers 8
+#
+# Per horizon day the report gives MAE, MAPE, directional accuracy and
+# the empirical coverage of the interval and of each bound on its own.
+# =================================================================
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from itertools import islice
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from batch import DEFAULT_TICKERS_PER_TASK, ticker_rng
+from feature import HISTORY_DAYS, interval_bounds, median_prices, mock_history_arrays
+from fitting import fit_matrix
+
+DEFAULT_BACKTEST_DAYS = 1000   # Mock history length when no store is given
+DEFAULT_ORIGIN_CHUNK = 4096    # Origins forecast per vectorized block (bounds memory)
+
+# Per-horizon-day sums; adding them across tickers and dividing by 'count'
+# gives the pooled metrics
+SUM_FIELDS = ("count", "abs_error", "abs_pct_error", "direction_hits", "inside", "above_lower", "below_upper")
+
+
+def empty_sums(horizon):
+    return {field: np.zeros(horizon) for field in SUM_FIELDS}
+
+
+def add_sums(total, sums):
+    """Adds one set of per-horizon sums into another in place; returns total."""
+    for field in SUM_FIELDS:
+        total[field] += sums[field]
+    return total
+
+
+def backtest_prices(prices, horizon, window=HISTORY_DAYS, step=1, confidence=0.95,
+                    origin_chunk=DEFAULT_ORIGIN_CHUNK):
+    """
+    Walk-forward backtest of one price series.
+
+    Args:
+        prices: 1-D array of closing prices, oldest first (NaN for a
+            missing bar; forecasts touching one are skipped).
+        horizon: Days predicted from every origin.
+        window: Training window length; the first origin is the last day
+            of the first full window.
+        step: Days between consecutive origins.
+        confidence: Interval width, as served by the model.
+
+    Returns:
+        Per-horizon-day sums (see SUM_FIELDS); pass them to summarize().
+        A series too short for one window plus the horizon scores nothing
+        (all sums zero), so it does not abort a multi-ticker run.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    sums = empty_sums(horizon)
+    if len(prices) < window + horizon:
+        return sums
+    origins = np.arange(window - 1, len(prices) - horizon, step)
+    steps = np.arange(1, horizon + 1)
+    windows = sliding_window_view(prices, window)
+    futures = sliding_window_view(prices, horizon + 1)
+
+    for start in range(0, len(origins), origin_chunk):
+        chunk = origins[start:start + origin_chunk]
+
+        # 1. Fit every origin's trailing window at once (rows = origins)
+        fit = fit_matrix(windows[chunk - window + 1])
+        drift, volatility = fit["drift"][:, None], fit["volatility"][:, None]
+
+        # 2. Forecast every origin with the served engine: the conditional median plus bounds
+        latest = prices[chunk][:, None]
+        with np.errstate(invalid="ignore"):
+            predicted = median_prices(latest, (drift, volatility), steps)
+            lower, upper = interval_bounds(latest, (drift, volatility), steps, confidence)
+
+        # 3. Score against what happened next
+        actual = futures[chunk, 1:]
+        valid = ~(np.isnan(predicted) | np.isnan(actual) | np.isnan(latest))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            error = np.abs(predicted - actual)
+            scores = {
+                "count": valid,
+                "abs_error": error,
+                "abs_pct_error": 100.0 * error / actual,
+                "direction_hits": np.sign(predicted - latest) == np.sign(actual - latest),
+                "inside": (lower <= actual) & (actual <= upper),
+                "above_lower": actual >= lower,
+                "below_upper": actual <= upper,
+            }
+        for field, values in scores.items():
+            sums[field] += np.where(valid, values, 0.0).sum(axis=0)
+    return sums
+
+
+def summarize(sums):
+    """
+    Turns per-horizon sums into metrics: lists indexed by horizon day
+    (day 1 first) of 'mae', 'mape' (percent), 'directional_accuracy',
+    'coverage' (share of realized prices inside the interval),
+    'lower_coverage' (at or above the lower bound), 'upper_coverage' (at or
+    below the upper bound) and 'n' (origins scored). Days without any
+    scored origin (e.g. a ticker shorter than window + horizon) are None.
+    """
+    count = sums["count"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        def mean(field):
+            values = np.round(sums[field] / count, 6).tolist()
+            return [value if n else None for value, n in zip(values, count.tolist())]
+
+        return {
+            "n": count.astype(np.int64).tolist(),
+            "mae": mean("abs_error"),
+            "mape": mean("abs_pct_error"),
+            "directional_accuracy": mean("direction_hits"),
+            "coverage": mean("inside"),
+            "lower_coverage": mean("above_lower"),
+            "upper_coverage": mean("below_upper"),
+        }
+
+
+def _load_prices(ticker, rng, store, days):
+    if store is not None and ticker in store:
+        return store.bars(ticker)["close"]
+    return mock_history_arrays(days, rng)[1]
+
+
+def _backtest_chunk(tickers, horizon, seed, options):
+    """Worker entry point: backtests one shard; returns [(ticker, sums)]."""
+    store, days = options.get("store"), options.get("days", DEFAULT_BACKTEST_DAYS)
+    results = []
+    for ticker in tickers:
+        rng = ticker_rng(ticker, seed)
+        prices = _load_prices(ticker, rng, store, days)
+        results.append((ticker, backtest_prices(prices, horizon, options.get("window", HISTORY_DAYS),
+                                                options.get("step", 1), options.get("confidence", 0.95))))
+    return results
+
+
+def backtest_many(tickers, horizon, workers=None, seed=None, tickers_per_task=DEFAULT_TICKERS_PER_TASK,
+                  max_in_flight=None, **options):
+    """
+    Backtests many tickers over a process pool (same sharding as
+    batch.predict_many, so results do not depend on the worker count).
+
+    Args:
+        tickers: Iterable of ticker symbols; consumed lazily.
+        horizon: Days predicted from every origin.
+        workers: Worker processes (defaults to every core; 1 runs in-process).
+        seed: Base seed for the per-ticker RNG streams.
+        **options: store (HistoryStore; tickers it lacks get mock history),
+            days (mock history length), window, step, confidence.
+
+    Yields:
+        (ticker, sums) per ticker, in completion order.
+    """
+    tickers = iter(tickers)
+    shards = iter(lambda: list(islice(tickers, tickers_per_task)), [])
+    seed = np.random.SeedSequence(seed).entropy
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for shard in shards:
+            yield from _backtest_chunk(shard, horizon, seed, options)
+        return
+
+    max_in_flight = max_in_flight or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for shard in shards:
+            pending.add(pool.submit(_backtest_chunk, shard, horizon, seed, options))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in as_completed(pending):
+            yield from future.result()
+
+
+def run_backtest(tickers, horizon, per_ticker=False, **kwargs):
+    """
+    Backtests `tickers` and returns the report: pooled metrics over every
+    ticker and origin, plus per-ticker metrics when per_ticker is set.
+    """
+    total = empty_sums(horizon)
+    report = {"horizon": horizon, "tickers": 0}
+    tickers_report = {}
+    for ticker, sums in backtest_many(tickers, horizon, **kwargs):
+        add_sums(total, sums)
+        report["tickers"] += 1
+        if per_ticker:
+            tickers_report[ticker] = summarize(sums)
+    report["metrics"] = summarize(total)
+    if per_ticker:
+        report["per_ticker"] = dict(sorted(tickers_report.items()))
+    return report
+
+
+def main(argv=None):
+    from cli import read_tickers
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the forecast model.")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols ('-' reads them from stdin).")
+    parser.add_argument("-f", "--file", help="File with one ticker per line ('-' for stdin).")
+    parser.add_argument("-d", "--horizon", type=int, default=14, help="Days predicted from each origin.")
+    parser.add_argument("--days", type=int, default=DEFAULT_BACKTEST_DAYS,
+                        help="Mock history length for tickers not in the store.")
+    parser.add_argument("--window", type=int, default=HISTORY_DAYS, help="Training window length.")
+    parser.add_argument("--step", type=int, default=1, help="Days between forecast origins.")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Width of the prediction interval.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed for reproducible output.")
+    parser.add_argument("--tickers-per-task", type=int, default=DEFAULT_TICKERS_PER_TASK)
+    parser.add_argument("--data-dir", default=None, help="History store directory (default: mock history).")
+    parser.add_argument("--per-ticker", action="store_true", help="Also report metrics for every ticker.")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args(argv)
+    if not args.tickers and args.file is None:
+        args.tickers = ["-"]
+
+    options = {"days": args.days, "window": args.window, "step": args.step, "confidence": args.confidence}
+    if args.data_dir is not None:
+        from history_store import open_store
+        options["store"] = open_store(args.data_dir)
+
+    report = run_backtest(read_tickers(args.tickers, args.file), args.horizon, per_ticker=args.per_ticker,
+                          workers=args.workers, seed=args.seed, tickers_per_task=args.tickers_per_task,
+                          **options)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# =================================================================
+# BATCH MULTI-TICKER PREDICTION
+# Shards a universe of tickers across a process pool. Every ticker gets
+# its own RNG stream derived from (seed, ticker), so results do not
+# depend on the worker count or on how tickers are grouped into tasks.
+# predict_universe publishes every history once in shared memory
+# (shared_history.py), so tasks carry only ticker row ranges.
+# =================================================================
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from itertools import islice
+
+import numpy as np
+
+from arima import DEFAULT_ORDER, arima_params, fit_arima
+from feature import ARIMA, HISTORY_DAYS, RANDOM_WALK, data_version, load_history, predict_ticker
+from fitting import fit_matrix, forecast_params, stack_histories
+from history_store import HistoryStoreError
+from indicators import indicator_columns
+from shared_history import SharedHistory, attach
+from trading_calendar import DEFAULT_RESOLUTION, bars_per_session
+
+DEFAULT_TICKERS_PER_TASK = 64
+
+
+def ticker_rng(ticker, seed=None):
+    """
+    Returns an independent numpy.random.Generator for one ticker.
+    The stream depends only on the seed and the ticker symbol.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=tuple(ticker.encode())))
+
+
+def _load_histories(tickers, rngs, options):
+    """
+    Loads each ticker's history, setting aside the tickers whose history
+    cannot be read (an invalid symbol or a corrupt store file) so that one
+    bad ticker does not fail the rest of its shard.
+
+    Returns:
+        (rows, histories, errors): the indices of the loaded tickers, their
+        (dates, prices) pairs, and one {"ticker", "error"} record per
+        ticker that failed.
+    """
+    resolution = options.get("resolution", DEFAULT_RESOLUTION)
+    rows, histories, errors = [], [], []
+    for row, (ticker, rng) in enumerate(zip(tickers, rngs)):
+        try:
+            histories.append(load_history(ticker, HISTORY_DAYS, options.get("store"), rng, resolution))
+        except (HistoryStoreError, OSError, ValueError) as error:
+            errors.append({"ticker": ticker, "error": str(error)})
+        else:
+            rows.append(row)
+    return rows, histories, errors
+
+
+def _predict_chunk(tickers, horizon, seed, options):
+    """
+    Worker entry point: loads one shard of tickers' histories and predicts
+    them together (see _predict_histories). Tickers whose history cannot be
+    loaded come back as {"ticker", "error"} records.
+    """
+    rngs = [ticker_rng(ticker, seed) for ticker in tickers]
+    rows, histories, errors = _load_histories(tickers, rngs, options)
+    return errors + _predict_histories([tickers[row] for row in rows], [rngs[row] for row in rows], histories,
+                                       horizon, options)
+
+
+def _predict_shared(handle, start, stop, horizon, options):
+    """
+    Worker entry point for predict_universe: predicts rows start..stop of
+    the shared universe, reading histories and RNG states from the mapping.
+    """
+    shared = attach(handle)
+    rows = range(start, stop)
+    return _predict_histories([shared.ticker(row) for row in rows], [shared.rng(row) for row in rows],
+                              [shared.history(row) for row in rows], horizon, options)
+
+
+def _predict_histories(tickers, rngs, histories, horizon, options):
+    """
+    Predicts a group of tickers whose histories are already loaded, sharing
+    the per-ticker work across the group:
+      1. warm start: with a registry in options (random walk, daily bars),
+         each ticker whose snapshot is at least as new as its data version
+         (feature.data_version) reuses the stored (drift, volatility)
+      2. fit: the remaining histories are stacked into one right-aligned
+         matrix of the training window and fitted in one vectorized pass
+         (fitting.fit_matrix, or arima.fit_arima for model='arima')
+      3. indicators: if requested, they are computed for every full
+         history at once (indicators.indicator_columns) and each ticker's
+         row is trimmed back to its own length
+    predict_ticker then forecasts each ticker from its parameters without
+    refitting or recomputing indicators.
+
+    Args:
+        tickers: Ticker symbols.
+        rngs: One numpy.random.Generator per ticker.
+        histories: One (dates, prices) pair per ticker.
+        horizon: The number of days into the future to predict.
+        options: predict_many's **options; registry and indicators are
+            consumed here, the rest go to feature.predict_ticker.
+
+    Returns:
+        A list of results, in the order of `tickers`.
+    """
+    options = dict(options)
+    registry = options.pop("registry", None)
+    store = options.get("store")
+    resolution = options.get("resolution", DEFAULT_RESOLUTION)
+    model = options.get("model", RANDOM_WALK)
+
+    params = [None] * len(tickers)
+    if registry is not None and model == RANDOM_WALK and bars_per_session(resolution) == 1:
+        params = [registry.params(ticker, data_version(ticker, store)) for ticker in tickers]
+    unfitted = [row for row, found in enumerate(params) if found is None]
+    if unfitted:
+        window = HISTORY_DAYS * bars_per_session(resolution)
+        matrix = stack_histories([histories[row][1] for row in unfitted], window)
+        if model == ARIMA:
+            fit, row_params = fit_arima(matrix, options.get("order", DEFAULT_ORDER)), arima_params
+        else:
+            fit, row_params = fit_matrix(matrix), forecast_params
+        for i, row in enumerate(unfitted):
+            params[row] = row_params(fit, i)
+
+    indicators = [options.pop("indicators", False)] * len(tickers)
+    if indicators[0] and histories:
+        lengths = [len(prices) for _, prices in histories]
+        longest = max(lengths)
+        columns = indicator_columns(stack_histories([prices for _, prices in histories], longest))
+        indicators = [{name: values[row, longest - length:] for name, values in columns.items()}
+                      for row, length in enumerate(lengths)]
+    return [
+        predict_ticker(ticker, horizon, rng=rng, history=history, params=row_params, indicators=row_indicators,
+                       **options)
+        for ticker, rng, history, row_params, row_indicators in zip(tickers, rngs, histories, params, indicators)
+    ]
+
+
+def predict_many(tickers, horizon, workers=None, seed=None, tickers_per_task=DEFAULT_TICKERS_PER_TASK,
+                 max_in_flight=None, **options):
+    """
+    Predicts many tickers, spreading the work over a process pool.
+
+    Args:
+        tickers: Iterable of ticker symbols; consumed lazily, shard by shard.
+        horizon: The number of days into the future to predict.
+        workers: Number of worker processes (defaults to every core). With
+            workers=1 the tickers are predicted in this process.
+        seed: Base seed. None draws fresh OS entropy once for the whole batch,
+            which is then shared by every ticker's stream.
+        tickers_per_task: Tickers sent to a worker per task; larger shards
+            amortize inter-process overhead, smaller ones balance load.
+        max_in_flight: Shards submitted but not yet yielded (default: twice
+            the worker count). Bounds memory for arbitrarily long inputs.
+        **options: Forwarded to feature.predict_ticker (n_paths, confidence,
+            chunk_size, columnar, store, resolution, model, order, indicators) plus registry, a
+            model_registry.ModelRegistry of warm-start parameters.
+
+    Yields:
+        One result dictionary per ticker, in completion order. A ticker
+        whose history cannot be loaded yields {"ticker", "error"} instead.
+    """
+    tickers = iter(tickers)
+    shards = iter(lambda: list(islice(tickers, tickers_per_task)), [])
+    seed = np.random.SeedSequence(seed).entropy
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for shard in shards:
+            yield from _predict_chunk(shard, horizon, seed, options)
+        return
+
+    max_in_flight = max_in_flight or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for shard in shards:
+            pending.add(pool.submit(_predict_chunk, shard, horizon, seed, options))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in as_completed(pending):
+            yield from future.result()
+
+
+def predict_universe(tickers, horizon, workers=None, seed=None, tickers_per_task=DEFAULT_TICKERS_PER_TASK,
+                     max_in_flight=None, **options):
+    """
+    Like predict_many, for a universe known up front: the parent loads
+    every history once and publishes it in shared memory, and each task
+    carries only a (start, stop) range of rows. Workers map the same pages,
+    so memory does not grow with the worker count. Results are identical
+    to predict_many's for the same seed.
+
+    Yields:
+        One result dictionary per ticker, in completion order. Tickers
+        whose history cannot be loaded are yielded first, as
+        {"ticker", "error"} records, and left out of the shared universe.
+    """
+    tickers = list(tickers)
+    seed = np.random.SeedSequence(seed).entropy
+    workers = workers or os.cpu_count() or 1
+    rngs = [ticker_rng(ticker, seed) for ticker in tickers]
+    rows, histories, errors = _load_histories(tickers, rngs, options)
+    yield from errors
+    tickers, rngs = [tickers[row] for row in rows], [rngs[row] for row in rows]
+    if not tickers:
+        return
+    ranges = [(start, min(start + tickers_per_task, len(tickers)))
+              for start in range(0, len(tickers), tickers_per_task)]
+
+    if workers == 1:
+        for start, stop in ranges:
+            yield from _predict_histories(tickers[start:stop], rngs[start:stop], histories[start:stop], horizon,
+                                          options)
+        return
+
+    # The segment must exist before the pool starts, so the workers share
+    # the parent's resource tracker
+    with SharedHistory.publish(tickers, rngs, histories) as shared:
+        del rngs, histories
+        max_in_flight = max_in_flight or 2 * workers
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for start, stop in ranges:
+                pending.add(pool.submit(_predict_shared, shared.handle, start, stop, horizon, options))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            for future in as_completed(pending):
+                yield from future.result()
@@ -0,0 +1,208 @@
+# =================================================================
+# PREDICTION PIPELINE BENCHMARKS
+# Times the hot paths (history generation, fitting, the full prediction,
+# Monte Carlo bands, JSON serialization and the batch API) over sweeps
+# of ticker count, history length, horizon and path count. Reports
+# throughput, latency percentiles and peak memory, writes a JSON results
+# file and compares it against a stored baseline:
+#
+#     python bench.py --quick --output bench_results.json
+#     python bench.py --baseline bench_baseline.json        # exit 1 on regression
+#     python bench.py --save-baseline bench_baseline.json
+# =================================================================
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from batch import predict_many
+from feature import generate_mock_historical_data, predict_ticker, train_and_predict_stock_price
+from fitting import fit_matrix
+from results import to_compact_json
+from simulation import monte_carlo_quantiles
+
+SWEEPS = {
+    "quick": {
+        "tickers": [100, 1000],
+        "history_days": [90, 252],
+        "horizons": [14, 30],
+        "paths": [1_000, 10_000],
+        "batch_tickers": [64],
+    },
+    "full": {
+        "tickers": [100, 1000, 5000],
+        "history_days": [90, 252, 2520],
+        "horizons": [14, 30, 365],
+        "paths": [1_000, 10_000, 100_000],
+        "batch_tickers": [256, 2048],
+    },
+}
+
+DEFAULT_TOLERANCE = 0.20  # Allowed p50 slowdown before a case counts as a regression
+
+
+def _random_prices(tickers, days, seed=0):
+    rng = np.random.default_rng(seed)
+    return 150.0 * np.exp(np.cumsum(rng.normal(0.001, 0.01, (tickers, days)), axis=1))
+
+
+def build_cases(sweep):
+    """
+    Returns the benchmark cases for a sweep as (name, params, units, fn)
+    tuples, where `units` is how many items (tickers, points, bytes...) one
+    call of fn processes; throughput is reported in units per second.
+    """
+    cases = []
+    for days in sweep["history_days"]:
+        cases.append(("generate_mock_historical_data", {"days": days}, days,
+                      lambda days=days: generate_mock_historical_data("BENCH", days=days)))
+        for tickers in sweep["tickers"]:
+            prices = _random_prices(tickers, days)
+            cases.append(("fit_matrix", {"tickers": tickers, "days": days}, tickers,
+                          lambda prices=prices: fit_matrix(prices)))
+
+    for horizon in sweep["horizons"]:
+        cases.append(("train_and_predict_stock_price", {"horizon": horizon}, 1,
+                      lambda horizon=horizon: train_and_predict_stock_price("BENCH", horizon)))
+        records = predict_ticker("BENCH", horizon)
+        columnar = predict_ticker("BENCH", horizon, columnar=True)
+        cases.append(("json_dumps_indent", {"horizon": horizon}, 1,
+                      lambda records=records: json.dumps(records, indent=4)))
+        cases.append(("json_compact_columnar", {"horizon": horizon}, 1,
+                      lambda columnar=columnar: to_compact_json(columnar)))
+        for paths in sweep["paths"]:
+            cases.append(("monte_carlo_quantiles", {"horizon": horizon, "paths": paths}, paths,
+                          lambda horizon=horizon, paths=paths: monte_carlo_quantiles(150.0, horizon, paths)))
+
+    for tickers in sweep["batch_tickers"]:
+        names = [f"T{i}" for i in range(tickers)]
+        cases.append(("predict_many", {"tickers": tickers, "horizon": 30}, tickers,
+                      lambda names=names: sum(1 for _ in predict_many(names, 30, seed=0))))
+    return cases
+
+
+def run_case(fn, min_time=0.5, max_repeats=200, min_repeats=5):
+    """
+    Calls fn repeatedly and returns latency percentiles (seconds) and peak
+    traced memory (bytes) of one extra, separately traced call.
+    """
+    fn()  # Warm-up: imports, caches, first-touch allocations
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_repeats or (
+            len(latencies) < max_repeats and time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "repeats": len(latencies),
+        "mean_s": float(np.mean(latencies)),
+        "p50_s": float(p50),
+        "p90_s": float(p90),
+        "p99_s": float(p99),
+        "peak_memory_bytes": int(peak),
+    }
+
+
+def case_id(name, params):
+    return name + "".join(f" {key}={value}" for key, value in sorted(params.items()))
+
+
+def run_benchmarks(sweep_name="quick", min_time=0.5, only=None):
+    """Runs a sweep and returns the results document."""
+    results = []
+    # The prediction entry point prints a status line per call to stderr; keep it out of the progress rows
+    with open(os.devnull, "w") as devnull:
+        for name, params, units, fn in build_cases(SWEEPS[sweep_name]):
+            if only and name not in only:
+                continue
+            with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+                stats = run_case(fn, min_time=min_time)
+            stats["throughput_per_s"] = units / stats["p50_s"] if stats["p50_s"] else float("inf")
+            results.append({"id": case_id(name, params), "name": name, "params": params,
+                            "units": units, **stats})
+            print(format_row(results[-1]), file=sys.stderr)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "sweep": sweep_name,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares p50 latency per case id. Returns a list of regressions as
+    (id, baseline_p50, current_p50, ratio) for cases slower than
+    (1 + tolerance) times the baseline.
+    """
+    previous = {result["id"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["id"])
+        if before is None or not before["p50_s"]:
+            continue
+        ratio = result["p50_s"] / before["p50_s"]
+        if ratio > 1 + tolerance:
+            regressions.append((result["id"], before["p50_s"], result["p50_s"], ratio))
+    return regressions
+
+
+def format_row(result):
+    return (f"{result['id']:<60} p50 {result['p50_s'] * 1e3:10.3f} ms  p99 {result['p99_s'] * 1e3:10.3f} ms  "
+            f"{result['throughput_per_s']:14.1f}/s  peak {result['peak_memory_bytes'] / 2**20:8.2f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction pipeline.")
+    parser.add_argument("--quick", dest="sweep", action="store_const", const="quick", default="quick",
+                        help="Small sweep (default).")
+    parser.add_argument("--full", dest="sweep", action="store_const", const="full", help="Full sweep.")
+    parser.add_argument("--only", nargs="*", help="Run only these benchmark names.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to spend timing each case.")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results JSON.")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against.")
+    parser.add_argument("--save-baseline", help="Also write the results to this baseline path.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed fractional p50 slowdown versus the baseline.")
+    args = parser.parse_args(argv)
+
+    document = run_benchmarks(args.sweep, min_time=args.min_time, only=args.only)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as handle:
+            json.dump(document, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(document, json.load(handle), args.tolerance)
+        for case, before, after, ratio in regressions:
+            print(f"REGRESSION {case}: p50 {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({ratio:.2f}x)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against baseline.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
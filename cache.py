@@ -0,0 +1,124 @@
+# =================================================================
+# FORECAST CACHE
+# Size-bounded LRU cache with a TTL for columnar prediction results
+# (see results.py), keyed by ticker, data version and model parameters.
+# A cached forecast also answers any shorter horizon for the same key
+# by slicing its prefix: every predicted day depends only on the days
+# before it, so the first N days of a longer forecast are an N-day
+# forecast.
+# =================================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL = 3600.0
+
+
+def forecast_prefix(result, days):
+    """
+    Returns a columnar result truncated to its first `days` predicted days.
+    The predicted columns are NumPy views; nothing is copied.
+    """
+    truncated = dict(result)
+    truncated["predicted"] = {column: values[:days] for column, values in result["predicted"].items()}
+    return truncated
+
+
+class ForecastCache:
+    """
+    LRU + TTL cache of columnar forecasts.
+
+    Only the longest forecast seen for a key is kept. Lookups for a horizon
+    up to that length are hits; longer horizons are misses.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(ticker, data_version, params=()):
+        """Builds the cache key; params is a mapping or iterable of (name, value) pairs."""
+        items = params.items() if hasattr(params, "items") else params
+        return ticker, data_version, tuple(sorted(items))
+
+    def get(self, ticker, days, data_version, params=()):
+        """
+        Returns a `days`-long columnar forecast, or None on a miss.
+        """
+        key = self.make_key(ticker, data_version, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self.entries[key]
+                entry = None
+            if entry is None or len(entry[1]["predicted"]["date"]) < days:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+
+        if len(result["predicted"]["date"]) == days:
+            return result
+        with self.lock:
+            self.prefix_hits += 1
+        return forecast_prefix(result, days)
+
+    def expires_in(self, ticker, days, data_version, params=()):
+        """
+        Returns the seconds until the cached forecast covering `days` for
+        this key expires, or None if there is none. Does not count as a
+        lookup and does not touch the LRU order.
+        """
+        key = self.make_key(ticker, data_version, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or len(entry[1]["predicted"]["date"]) < days:
+                return None
+            remaining = entry[0] - self.clock()
+        return remaining if remaining > 0 else None
+
+    def put(self, ticker, data_version, result, params=()):
+        """
+        Stores a columnar forecast unless a live, longer one is already cached.
+        """
+        key = self.make_key(ticker, data_version, params)
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry is not None and entry[0] > now
+                    and len(entry[1]["predicted"]["date"]) >= len(result["predicted"]["date"])):
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = (now + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "prefix_hits": self.prefix_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,176 @@
+# =================================================================
+# BATCH PREDICTION COMMAND LINE
+# Predicts any number of tickers and streams one compact JSON object
+# per ticker (NDJSON) to stdout as each one finishes:
+#
+#     python cli.py TSLA GOOG --horizon 14
+#     python cli.py --file universe.txt --workers 8 > forecasts.ndjson
+#     cat universe.txt | python cli.py - --paths 10000
+#
+# Tickers are read lazily and results are written as they complete, so
+# memory stays constant however long the input is. A ticker that cannot be
+# predicted (an invalid symbol, an unreadable history) gets an
+# {"ticker", "error"} line instead and the exit status is 1; the other
+# tickers are still predicted. NumPy and the model
+# are only imported once arguments have been parsed, keeping --help and
+# single-ticker runs fast to start.
+# =================================================================
+
+import argparse
+import json
+import sys
+from contextlib import nullcontext
+
+
+def read_tickers(arguments, file=None):
+    """
+    Yields ticker symbols from the positional arguments, then from `file`
+    (a path, or '-' for stdin), skipping blank lines and '#' comments.
+    A positional '-' also means stdin.
+    """
+    sources = []
+    for argument in arguments:
+        if argument == "-":
+            sources.append(sys.stdin)
+        else:
+            yield argument.strip().upper()
+    if file is not None:
+        sources.append(sys.stdin if file == "-" else open(file))
+    for source in sources:
+        with source if source is not sys.stdin else nullcontext(source):
+            for line in source:
+                ticker = line.split("#", 1)[0].strip().upper()
+                if ticker:
+                    yield ticker
+
+
+def checked_tickers(tickers, pattern, errors):
+    """
+    Yields the tickers that match `pattern` (history_store.TICKER_PATTERN)
+    and appends an {"ticker", "error"} record to `errors` for every other
+    one, so an invalid symbol never reaches a worker.
+    """
+    for ticker in tickers:
+        if pattern.fullmatch(ticker) is None:
+            errors.append({"ticker": ticker, "error": f"Invalid ticker {ticker!r}."})
+        else:
+            yield ticker
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Predict stock prices for many tickers, streaming NDJSON to stdout."
+    )
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols ('-' reads them from stdin).")
+    parser.add_argument("-f", "--file", help="File with one ticker per line ('-' for stdin).")
+    parser.add_argument("-d", "--horizon", type=int, default=14, help="Trading days to predict (default: 14).")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Worker processes (default: all cores; 1 runs in-process).")
+    parser.add_argument("--paths", type=int, default=0, help="Monte Carlo paths per ticker (default: single path).")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Width of the prediction interval.")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed for reproducible output.")
+    parser.add_argument("--tickers-per-task", type=int, default=64, help="Tickers per worker task.")
+    parser.add_argument("--resolution", default="1d",
+                        help="Bar size: 1d (default) or an intraday size from trading_calendar.RESOLUTIONS "
+                             "such as 5m; intraday runs use mock history.")
+    parser.add_argument("--model", default="random_walk",
+                        help="Forecast model from feature.MODELS: random_walk (default) or arima.")
+    parser.add_argument("--order", default="5,1,0",
+                        help="ARIMA order p,d,q for --model arima (q must be 0; default: 5,1,0).")
+    parser.add_argument("--data-dir", default=None, help="History store directory (default: mock history).")
+    parser.add_argument("--registry", default=None,
+                        help="Model registry file with fitted parameters to warm-start from.")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="Load every history up front and share it with the workers through shared memory "
+                             "(reads the whole ticker list before predicting).")
+    parser.add_argument("--indicators", action="store_true",
+                        help="Add technical indicators (SMA, EMA, RSI, volatility, Bollinger bands, ATR) "
+                             "to every history.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Emit column arrays instead of per-day objects.")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.horizon < 1:
+        parser.error("--horizon must be at least 1.")
+    if args.data_dir is not None and args.resolution != "1d":
+        parser.error("--data-dir holds daily bars; intraday resolutions use mock history.")
+    try:
+        order = tuple(int(part) for part in args.order.split(","))
+    except ValueError:
+        order = ()
+    if len(order) != 3 or order[0] < 1 or order[1] < 0 or order[2] != 0:
+        parser.error("--order must be p,d,0 with p >= 1 and d >= 0.")
+    if args.model == "arima" and args.paths:
+        parser.error("--paths does not apply to --model arima (its bounds are analytic).")
+    if not args.tickers and args.file is None:
+        args.tickers = ["-"]
+
+    # Deferred: NumPy and the model are only needed once the arguments parse.
+    # The canonical resolution and model lists live with them.
+    from feature import MODELS
+    from trading_calendar import RESOLUTIONS
+    if args.resolution not in RESOLUTIONS:
+        parser.error(f"--resolution must be one of {', '.join(RESOLUTIONS)}.")
+    if args.model not in MODELS:
+        parser.error(f"--model must be one of {', '.join(MODELS)}.")
+
+    from batch import predict_many, predict_universe
+    from history_store import TICKER_PATTERN
+    from results import to_compact_json, to_records
+
+    options = {"n_paths": args.paths, "confidence": args.confidence, "columnar": True,
+               "resolution": args.resolution, "model": args.model, "order": order, "indicators": args.indicators}
+    if args.data_dir is not None:
+        from history_store import open_store
+        options["store"] = open_store(args.data_dir)
+    if args.registry is not None:
+        from model_registry import open_registry
+        options["registry"] = open_registry(args.registry)
+
+    workers = args.workers
+    errors = []
+    tickers = checked_tickers(read_tickers(args.tickers, args.file), TICKER_PATTERN, errors)
+    if workers is None and len(args.tickers) == 1 and args.tickers[0] != "-" and args.file is None:
+        workers = 1  # A single ticker is not worth starting a pool
+
+    out = sys.stdout
+    failed = 0
+
+    def write(line):
+        out.write(line)
+        out.write("\n")
+        out.flush()
+
+    def write_errors():
+        nonlocal failed
+        failed += len(errors)
+        for error in errors:
+            write(json.dumps(error, separators=(",", ":")))
+        errors.clear()
+
+    predict = predict_universe if args.shared_memory else predict_many
+    for result in predict(tickers, args.horizon, workers=workers, seed=args.seed,
+                          tickers_per_task=args.tickers_per_task, **options):
+        write_errors()
+        if "error" in result:
+            errors.append(result)
+            write_errors()
+        elif args.columnar:
+            write(to_compact_json(result, args.indicators))
+        else:
+            write(json.dumps(to_records(result, args.indicators), separators=(",", ":")))
+    write_errors()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); exit quietly
+        sys.stderr.close()
+        sys.exit(0)
@@ -0,0 +1 @@
+# Lets pytest import the top-level modules from tests/ (python -m pytest or pytest).
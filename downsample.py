@@ -0,0 +1,85 @@
+# =================================================================
+# CHART DOWNSAMPLING (LARGEST-TRIANGLE-THREE-BUCKETS)
+# Reduces a price series to a pixel budget before it is sent to the
+# UI. Intraday forecasts have tens or hundreds of thousands of bars per
+# ticker, far more than a chart can draw; LTTB keeps the first and last
+# points and, from each bucket in between, the point forming the largest
+# triangle with its neighbours, so peaks and troughs survive while the
+# payload shrinks to roughly one point per pixel.
+# =================================================================
+
+import numpy as np
+
+MIN_POINTS = 3  # First, last and at least one bucket in between
+
+
+def lttb_indices(y, n_out, x=None):
+    """
+    Selects the indices of the points LTTB keeps.
+
+    Args:
+        y: 1-D array of values.
+        n_out: Number of points to keep (the pixel budget).
+        x: Optional x coordinates; defaults to the positions 0..len(y)-1,
+            which matches the UI's evenly spaced category axis.
+
+    Returns:
+        Sorted int64 index array of length min(n_out, len(y)). Series that
+        already fit the budget are returned whole.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n <= MIN_POINTS:
+        return np.arange(n)
+    n_out = max(n_out, MIN_POINTS)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # 1. Bucket edges over the interior points, plus each bucket's centroid
+    #    (the third triangle vertex for the bucket before it), all at once
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    x_means = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    y_means = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    x_means = np.append(x_means[1:], x[-1])  # The last bucket looks ahead to the final point
+    y_means = np.append(y_means[1:], y[-1])
+
+    # 2. Walk the buckets; each choice anchors the next bucket's triangles
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[anchor], y[anchor]
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs((ax - x_means[bucket]) * (y[start:stop] - ay)
+                       - (ax - x[start:stop]) * (y_means[bucket] - ay))
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def downsample_columns(columns, n_out, key="price"):
+    """
+    Downsamples a dictionary of equal-length columns (e.g. the 'historical'
+    or 'predicted' section of a columnar result) to at most n_out rows.
+    The rows are chosen by LTTB on columns[key]; every other column (date,
+    bounds) is taken at the same rows so the series stay aligned.
+    """
+    indices = lttb_indices(columns[key], n_out)
+    if len(indices) == len(columns[key]):
+        return columns
+    return {name: values[indices] for name, values in columns.items()}
+
+
+def downsample_result(result, max_points):
+    """
+    Returns a columnar result (results.py) with the historical and
+    predicted series each reduced to at most max_points points.
+    max_points of 0 or None returns the result unchanged.
+    """
+    if not max_points:
+        return result
+    downsampled = dict(result)
+    downsampled["historical"] = downsample_columns(result["historical"], max_points)
+    downsampled["predicted"] = downsample_columns(result["predicted"], max_points)
+    return downsampled
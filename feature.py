@@ -6,30 +6,360 @@
 # =================================================================
 
 import json
-import random
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
+from statistics import NormalDist
 
-def generate_mock_historical_data(ticker, days=90):
+import numpy as np
+
+import metrics
+from arima import DEFAULT_ORDER, arima_params, fit_arima, forecast_arima
+from fitting import fit_matrix, forecast_params, stack_histories
+from history_store import HistoryStoreError, make_bars
+from indicators import indicator_columns
+from results import columnar_result, to_records
+from trading_calendar import (DEFAULT_CALENDAR, DEFAULT_RESOLUTION, bar_index, bars_per_session, format_dates,
+                              get_calendar)
+
+HISTORY_DAYS = 90  # Length of the training window, in trading sessions
+
+# Model families: the fitted drift/volatility random walk, or ARIMA(p, d, 0) (arima.py)
+RANDOM_WALK = "random_walk"
+ARIMA = "arima"
+MODELS = (RANDOM_WALK, ARIMA)
+
+
+def mock_history_arrays(days=90, rng=None, calendar=DEFAULT_CALENDAR, resolution=DEFAULT_RESOLUTION):
+    """
+    Generates mock history as arrays: the bars of the last `days` trading
+    sessions up to yesterday and closing prices with a slight upward trend
+    and noise. Daily resolution gives one datetime64[D] date per session;
+    intraday resolutions (e.g. '1m') give datetime64[m] bar timestamps,
+    with the trend and noise scaled so a session moves as much as one
+    daily bar does.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    yesterday = str(np.datetime64(datetime.now(), "D") - 1)
+    per_session = bars_per_session(resolution)
+    bars = days * per_session
+    steps = np.arange(bars) / per_session
+
+    # Apply a slight linear trend and random per-bar volatility
+    prices = 150.00 + (steps * 0.15) + (rng.random(bars) - 0.5) * (2.0 / np.sqrt(per_session))
+    sessions = get_calendar(calendar).previous_sessions(yesterday, days)
+    return bar_index(sessions, resolution), np.round(prices, 2)
+
+
+def generate_mock_historical_data(ticker, days=90, rng=None, resolution=DEFAULT_RESOLUTION):
     """
     Generates a mock set of historical closing prices for a given stock ticker.
     Simulates a slight upward trend with daily noise.
+    If an rng (numpy.random.Generator) is given, the noise is drawn from it
+    so the history is reproducible.
+    """
+    dates, prices = mock_history_arrays(days, rng, resolution=resolution)
+    return [{"date": date, "price": price} for date, price in zip(format_dates(dates), prices.tolist())]
+
+
+def load_history(ticker, days=90, store=None, rng=None, resolution=DEFAULT_RESOLUTION):
+    """
+    Returns the training window (dates, closing prices) for `ticker`: the
+    bars of the last `days` sessions at the given resolution.
+
+    With a HistoryStore (history_store.py) the window is a zero-copy view of
+    the last `days` stored bars; tickers not yet in the store are seeded
+    with mock history first. Without a store, fresh mock history is made.
+    The store holds daily bars only.
+    """
+    if store is None:
+        return mock_history_arrays(days, rng, resolution=resolution)
+    if bars_per_session(resolution) != 1:
+        raise ValueError(f"The history store holds daily bars; resolution '{resolution}' needs mock history.")
+    if ticker not in store:
+        dates, prices = mock_history_arrays(days, rng)
+        try:
+            store.append(ticker, make_bars(dates, prices))
+        except HistoryStoreError:
+            pass  # Another worker seeded it first
+    bars = store.tail(ticker, days)
+    return bars["date"], bars["close"]
+
+
+def data_version(ticker, store=None):
+    """
+    Returns a version tag for the history the model trains on: the date of
+    the latest stored bar, or today for mock history (which ends yesterday).
+    """
+    latest = None if store is None else store.latest(ticker)
+    if latest is None:
+        return str(np.datetime64(datetime.now(), "D"))
+    return str(latest["date"])
+
+
+# Forecast engine parameters (daily percentages, matching the original random walk)
+TREND_MIN_PCT = 0.1     # Small positive trend: uniform in [0.1%, 0.6%)
+TREND_RANGE_PCT = 0.5
+NOISE_RANGE_PCT = 1.5   # Random daily noise: uniform in [-0.75%, 0.75%)
+PRICE_FLOOR = 50.0      # Ensure prices stay reasonable
+
+
+def draw_log_returns(rng, shape, params=None):
     """
-    data = []
-    base_price = 150.00
-    date = datetime.now() - timedelta(days=days)
-
-    for i in range(days):
-        # Apply a slight linear trend and random daily volatility
-        price = base_price + (i * 0.15) + (random.random() - 0.5) * 2.0
-        data.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "price": round(price, 2)
-        })
-        date += timedelta(days=1)
+    Draws daily log returns (trend + noise) for an array of the given shape.
+    The last axis is the forecast horizon.
+
+    With params=(drift, volatility), the mean and standard deviation of the
+    daily log return learned by a model, returns are drift plus uniform noise
+    scaled to that volatility. Without params the original mock walk is used.
+    """
+    if params is not None:
+        drift, volatility = params
+        return drift + volatility * np.sqrt(3.0) * (2.0 * rng.random(shape) - 1.0)
+    trend = rng.random(shape) * TREND_RANGE_PCT + TREND_MIN_PCT
+    noise = (rng.random(shape) - 0.5) * NOISE_RANGE_PCT
+    return np.log1p((trend + noise) / 100)
+
+
+def log_return_support(params=None):
+    """
+    Returns the (lowest, highest) daily log return draw_log_returns can produce.
+    """
+    if params is not None:
+        drift, volatility = params
+        return drift - np.sqrt(3.0) * volatility, drift + np.sqrt(3.0) * volatility
+    return (np.log1p((TREND_MIN_PCT - NOISE_RANGE_PCT / 2) / 100),
+            np.log1p((TREND_MIN_PCT + TREND_RANGE_PCT + NOISE_RANGE_PCT / 2) / 100))
+
+
+def log_return_moments(params=None):
+    """
+    Returns the (mean, standard deviation) of a daily log return from
+    draw_log_returns; for the mock walk, to first order in the return.
+    """
+    if params is not None:
+        drift, volatility = params
+        return drift, volatility
+    return (np.log1p((TREND_MIN_PCT + TREND_RANGE_PCT / 2) / 100),
+            np.sqrt((TREND_RANGE_PCT ** 2 + NOISE_RANGE_PCT ** 2) / 12) / 100)
+
+
+def compound_prices(latest_price, log_returns):
+    """
+    Compounds log returns along the last axis into price paths.
+
+    The price floor makes the walk path-dependent (p_i = max(p_{i-1} * f_i,
+    floor)); in log space that is a walk reflected at log(floor), which the
+    running maximum of the deficit solves exactly without a Python loop.
+    """
+    log_floor = np.log(PRICE_FLOOR)
+    walk = np.log(latest_price) + np.cumsum(log_returns, axis=-1)
+    deficit = np.maximum.accumulate(np.maximum(log_floor - walk, 0.0), axis=-1)
+    return np.exp(walk + deficit)
+
+
+def interval_spread(volatility, steps, confidence=0.95):
+    """
+    Half-width, in log price, of the learned-volatility interval `steps`
+    bars ahead: z * volatility * sqrt(steps). Broadcasts over arrays.
+    """
+    return NormalDist().inv_cdf(0.5 + confidence / 2) * volatility * np.sqrt(steps)
+
+
+def median_prices(origin_price, params, steps):
+    """
+    Conditional median price `steps` bars after origin_price under learned
+    (drift, volatility): origin_price * exp(drift * steps), the centre of
+    interval_bounds. Broadcasts over arrays.
+    """
+    drift, _ = params
+    return origin_price * np.exp(drift * steps)
+
+
+def interval_bounds(origin_price, params, steps, confidence=0.95):
+    """
+    Learned-volatility interval `steps` bars after origin_price, centred on
+    the conditional median origin_price * exp(drift * steps) (not on one
+    sampled path, whose own noise would halve the variance it covers).
+
+    Returns:
+        (lower, upper) price arrays. Broadcasts over arrays.
+    """
+    drift, volatility = params
+    centre = np.log(origin_price) + drift * steps
+    spread = interval_spread(volatility, steps, confidence)
+    return np.exp(centre - spread), np.exp(centre + spread)
+
+
+def forecast_arrays(latest_price, prediction_days, rng=None, params=None, confidence=0.95, first_day=1,
+                    origin_price=None):
+    """
+    Vectorized forecast engine, working on whole NumPy arrays. With learned
+    params the price is the conditional median (median_prices) and the
+    bounds are interval_bounds around it, so lower <= price <= upper on
+    every day and nothing is drawn from rng. Without params it draws every
+    day's mock trend and noise at once and compounds them into one path.
+
+    Args:
+        latest_price: Last known closing price the forecast starts from.
+        prediction_days: The number of bars (trading days at daily
+            resolution) into the future to predict.
+        rng: Optional numpy.random.Generator (a fresh one is used if omitted).
+        params: Optional learned (drift, volatility) of per-bar log returns.
+            The bounds are then the interval_bounds at the given
+            `confidence`; otherwise the fixed mock multiplier around the
+            sampled path is used.
+        first_day: Horizon index of the first returned day. Continuing a
+            forecast block by block passes the previous block's last price
+            as latest_price and the next index here.
+        origin_price: Price the whole forecast started from, which the
+            learned median and bounds are centred on (default: latest_price).
+
+    Returns:
+        A dictionary of float64 arrays of length prediction_days:
+        'price', 'lower_bound' and 'upper_bound'.
+    """
+    steps = np.arange(first_day, first_day + prediction_days)
+
+    # 1. Learned model: conditional median and the interval around it
+    if params is not None:
+        origin_price = latest_price if origin_price is None else origin_price
+        with metrics.stage("forecast"):
+            prices = median_prices(origin_price, params, steps)
+        with metrics.stage("bounds"):
+            lower, upper = interval_bounds(origin_price, params, steps, confidence)
+        return {"price": prices, "lower_bound": lower, "upper_bound": upper}
+
+    # 2. Mock walk: trend and noise for every day in one draw, compounded into one path
+    rng = np.random.default_rng() if rng is None else rng
+    with metrics.stage("forecast"):
+        prices = compound_prices(latest_price, draw_log_returns(rng, prediction_days))
+
+    # 3. Confidence interval
+    with metrics.stage("bounds"):
+        # Mock multiplier: starts at 0.5% and widens 0.1% per day
+        confidence_multiplier = 0.005 + steps * 0.001
+
+        return {
+            "price": prices,
+            "lower_bound": prices * (1 - confidence_multiplier),
+            "upper_bound": prices * (1 + confidence_multiplier),
+        }
+
+
+def forecast_date_index(prediction_days, start=None, calendar=DEFAULT_CALENDAR, resolution=DEFAULT_RESOLUTION):
+    """
+    Returns the forecast dates: the bars of the next `prediction_days`
+    trading sessions after `start` (today by default), as datetime64[D]
+    dates at daily resolution or datetime64[m] bar timestamps intraday.
+    """
+    start = str(np.datetime64(start or datetime.now(), "D"))
+    return bar_index(get_calendar(calendar).next_sessions(start, prediction_days), resolution)
+
+
+def forecast_dates(prediction_days, start=None, calendar=DEFAULT_CALENDAR, resolution=DEFAULT_RESOLUTION):
+    """
+    Returns the forecast dates as ISO strings, formatted in bulk.
+    """
+    return format_dates(forecast_date_index(prediction_days, start, calendar, resolution))
+
+
+def train_model(ticker, rng, store=None, history=None, params=None, resolution=DEFAULT_RESOLUTION,
+                model=RANDOM_WALK, order=DEFAULT_ORDER):
+    """
+    Loads the training window and fits the model.
+
+    Returns:
+        (historical_dates, historical_prices, latest_price, params), where
+        params is the fitted per-bar (drift, volatility) for the random
+        walk or the arima.arima_params dictionary for model='arima', the
+        given params, or None (the mock random walk) if the history is too
+        short to fit.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}'; expected one of {', '.join(MODELS)}.")
+
+    # 1. Data Acquisition (90 sessions of history from the store, or mock data)
+    if history is None:
+        with metrics.stage("data"):
+            history = load_history(ticker, days=HISTORY_DAYS, store=store, rng=rng, resolution=resolution)
+    historical_dates, historical_prices = history
+
+    # 2. Model Training: closed-form drift and volatility fit (fitting.py),
+    #    or Yule-Walker AR coefficients via Levinson-Durbin (arima.py)
+    if params is None:
+        window = HISTORY_DAYS * bars_per_session(resolution)
+        matrix = stack_histories([historical_prices], window)
+        with metrics.stage("fit"):
+            if model == ARIMA:
+                params = arima_params(fit_arima(matrix, order))
+            else:
+                params = forecast_params(fit_matrix(matrix))
+    return historical_dates, historical_prices, float(historical_prices[-1]), params
+
+
+def predict_ticker(ticker, prediction_days, rng=None, n_paths=0, confidence=0.95, chunk_size=None,
+                   columnar=False, store=None, params=None, history=None, resolution=DEFAULT_RESOLUTION,
+                   model=RANDOM_WALK, order=DEFAULT_ORDER, indicators=False):
+    """
+    Runs the full pipeline for one ticker and returns the result dictionary.
+    This is the quiet core of train_and_predict_stock_price; pass an rng to
+    make the whole run (history and forecast) reproducible. With
+    columnar=True the result stays in struct-of-arrays form (see results.py)
+    and no per-day dicts are built. With a HistoryStore the training window
+    is read from it instead of generated. params=(drift, volatility) skips
+    fitting and forecasts from an already learned model (see model_state.py),
+    and history=(dates, prices) supplies an already loaded training window.
+    An intraday resolution (e.g. '1m') trains on and forecasts every bar
+    of each session; prediction_days still counts trading sessions.
+    model='arima' forecasts the conditional mean of an ARIMA(p, d, 0) fit
+    of the given order with analytic psi-weight bounds (arima.py).
+    indicators=True adds the technical indicators of the training history
+    (indicators.py) as extra historical columns; a dictionary of such
+    columns, aligned with the history, is used as already computed. They
+    are reported with the history only; the forecast does not use them.
+    """
+    if model == ARIMA and n_paths:
+        raise ValueError("The ARIMA model has analytic bounds; Monte Carlo paths are not supported.")
+    rng = np.random.default_rng() if rng is None else rng
+
+    # 1-2. Data Acquisition and Model Training
+    historical_dates, historical_prices, latest_price, params = train_model(
+        ticker, rng, store=store, history=history, params=params, resolution=resolution, model=model, order=order
+    )
+    
+    # 3. Generate Predictions (vectorized, see forecast_arrays), one step per bar
+    horizon = prediction_days * bars_per_session(resolution)
+    if model == ARIMA and params is not None:
+        with metrics.stage("forecast"):  # Mean path and psi-weight bounds in one pass
+            forecast = forecast_arima(np.asarray(historical_prices)[None, :], params, horizon, confidence)
+            forecast = {key: values[0] for key, values in forecast.items()}
+    elif n_paths:
+        from simulation import monte_carlo_forecast
+        with metrics.stage("forecast"):  # Quantile bounds come out of the same simulation
+            forecast = monte_carlo_forecast(latest_price, horizon, n_paths, confidence=confidence,
+                                            chunk_size=chunk_size, rng=rng, params=params)
+    else:
+        forecast = forecast_arrays(latest_price, horizon, rng=rng, params=params,
+                                   confidence=confidence)
     
-    return data
+    # 4. Compile Results
+    result = columnar_result(ticker, latest_price, historical_dates, historical_prices,
+                             forecast_date_index(prediction_days, resolution=resolution), forecast)
+    if indicators is True:
+        with metrics.stage("features"):
+            indicators = indicator_columns(historical_prices)
+    if indicators:
+        result["historical"].update(indicators)
+    if columnar:
+        return result
+    with metrics.stage("serialize"):
+        return to_records(result, indicators=bool(indicators))
+
 
-def train_and_predict_stock_price(ticker: str, prediction_days: int) -> dict:
+def train_and_predict_stock_price(ticker: str, prediction_days: int, n_paths: int = 0,
+                                  confidence: float = 0.95, chunk_size: int = None,
+                                  columnar: bool = False, resolution: str = DEFAULT_RESOLUTION,
+                                  model: str = RANDOM_WALK, order: tuple = DEFAULT_ORDER) -> dict:
     """
     Simulates the machine learning workflow for stock price prediction.
     In a real application, this would use libraries like NumPy, Pandas, 
@@ -37,61 +367,32 @@ def train_and_predict_stock_price(ticker: str, prediction_days: int) -> dict:
     
     Args:
         ticker: The stock ticker symbol (e.g., 'GOOG').
-        prediction_days: The number of days into the future to predict.
+        prediction_days: The number of trading days into the future to predict.
+        n_paths: If non-zero, run in Monte Carlo mode: simulate this many
+            paths and report the median price with empirical `confidence`
+            quantile bounds (see simulation.py).
+        confidence: Central interval width for the Monte Carlo bounds.
+        chunk_size: Monte Carlo paths simulated per chunk; bounds memory
+            use when n_paths is large.
+        columnar: Return the struct-of-arrays result from results.py
+            instead of lists of per-day dicts.
+        resolution: Bar size: '1d' (default) or an intraday resolution such
+            as '5m' or '1m' (see trading_calendar.RESOLUTIONS).
+        model: 'random_walk' (default) or 'arima' for an ARIMA(p, d, 0)
+            model fitted with Levinson-Durbin, whose bounds are the
+            analytic prediction interval at `confidence`.
+        order: The (p, d, q) order of the ARIMA model; q must be 0.
 
     Returns:
         A dictionary containing historical and predicted data points, now
         including confidence intervals for the predictions.
     """
-    
-    # 1. Mock Data Acquisition (Fetch 90 days of history)
-    historical_data = generate_mock_historical_data(ticker, days=90)
-    
-    # 2. Mock Model Training (Simulated)
-    # The 'model' learns the upward trend and volatility.
-    latest_price = historical_data[-1]['price']
-    
-    # 3. Generate Predictions
-    predicted_prices = []
-    current_price = latest_price
-
-    for i in range(1, prediction_days + 1):
-        # Simulate price movement based on last price + random walk + trend
-        trend = (random.random() * 0.5) + 0.1 # Small positive trend
-        noise = (random.random() - 0.5) * 1.5  # Random daily noise
-        
-        current_price = current_price * (1 + (trend + noise) / 100)
-        
-        # Ensure prices stay reasonable
-        if current_price < 50: current_price = 50 
-
-        # --- NEW FEATURE: Confidence Interval ---
-        # Base confidence multiplier starts small (0.5%) and increases slightly (0.1% per day)
-        # The further out the prediction, the wider the interval, reflecting higher uncertainty.
-        confidence_multiplier = 0.005 + (i * 0.001) 
-        
-        lower_bound = current_price * (1 - confidence_multiplier)
-        upper_bound = current_price * (1 + confidence_multiplier)
-        # --- END NEW FEATURE ---
-        
-        future_date = datetime.now() + timedelta(days=i)
-        
-        predicted_prices.append({
-            "date": future_date.strftime("%Y-%m-%d"),
-            "price": round(current_price, 2),
-            "lower_bound": round(lower_bound, 2),
-            "upper_bound": round(upper_bound, 2)
-        })
-    
-    # 4. Compile Results
-    results = {
-        "ticker": ticker,
-        "latest_price": latest_price,
-        "historical_data": historical_data,
-        "predicted_data": predicted_prices
-    }
-
-    print(f"Prediction complete for {ticker}. Predicted {prediction_days} days into the future.")
+    results = predict_ticker(ticker, prediction_days, n_paths=n_paths, confidence=confidence,
+                             chunk_size=chunk_size, columnar=columnar, resolution=resolution,
+                             model=model, order=order)
+
+    # Status goes to stderr so stdout stays clean JSON
+    print(f"Prediction complete for {ticker}. Predicted {prediction_days} days into the future.", file=sys.stderr)
     return results
 
 if __name__ == "__main__":
@@ -101,7 +402,6 @@ if __name__ == "__main__":
     # In a real API endpoint, this JSON would be sent back to the web application
     print(json.dumps(output, indent=4))
 
-# Example usage function call (used by the HTML front-end simulator)
-# Note: Since the web application runs JavaScript, it must simulate calling this
-# Python function via a mock API endpoint.
-# simulate_api_call('GOOG', 30)
+# The HTML front-end (UI.py) calls this model through the asyncio HTTP
+# service in server.py:
+# python server.py --port 8000  ->  GET /predict?ticker=GOOG&days=30
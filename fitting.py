@@ -0,0 +1,92 @@
+# =================================================================
+# BATCHED CLOSED-FORM MODEL FITTING
+# Estimates the forecast model's parameters for a whole matrix of
+# tickers x days in one vectorized pass:
+#   - drift and volatility: mean and sample std of daily log returns
+#   - trend: OLS line through log price against the day index
+# Missing days are NaN, so histories of uneven length share one matrix.
+# =================================================================
+
+import numpy as np
+
+MIN_OBSERVATIONS = 3  # Two returns are the least a sample std can use
+
+
+def _masked_sum(values, mask):
+    return np.where(mask, values, 0.0).sum(axis=1)
+
+
+def fit_matrix(prices):
+    """
+    Fits every row of a tickers x days price matrix (oldest day first).
+
+    Args:
+        prices: 2-D float array; NaN marks a day without a bar.
+
+    Returns:
+        A dictionary of arrays, one entry per ticker:
+        'n_obs', 'drift', 'volatility' (daily log returns), 'slope',
+        'intercept' (OLS of log price on the day index), 'latest_price'.
+        Rows with fewer than MIN_OBSERVATIONS bars get NaN estimates.
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    rows, days = prices.shape
+    valid = ~np.isnan(prices)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_prices = np.log(prices)
+
+        # 1. Drift and volatility from the returns between consecutive bars
+        returns = np.diff(log_prices, axis=1)
+        has_return = ~np.isnan(returns)
+        m = has_return.sum(axis=1)
+        drift = _masked_sum(returns, has_return) / m
+        deviations = np.where(has_return, returns - drift[:, None], 0.0)
+        volatility = np.sqrt((deviations * deviations).sum(axis=1) / (m - 1))
+
+        # 2. Linear trend: closed-form OLS on centred day indices
+        n = valid.sum(axis=1)
+        t = np.arange(days, dtype=np.float64)
+        t_mean = _masked_sum(t[None, :], valid) / n
+        y_mean = _masked_sum(log_prices, valid) / n
+        dt = np.where(valid, t[None, :] - t_mean[:, None], 0.0)
+        dy = np.where(valid, log_prices - y_mean[:, None], 0.0)
+        slope = (dt * dy).sum(axis=1) / (dt * dt).sum(axis=1)
+        intercept = y_mean - slope * t_mean
+
+    # 3. Latest price: the last valid bar of each row
+    last = days - 1 - np.argmax(valid[:, ::-1], axis=1)
+    latest_price = prices[np.arange(rows), last]
+
+    enough = n >= MIN_OBSERVATIONS
+    return {
+        "n_obs": n,
+        "drift": np.where(enough, drift, np.nan),
+        "volatility": np.where(enough, volatility, np.nan),
+        "slope": np.where(enough, slope, np.nan),
+        "intercept": np.where(enough, intercept, np.nan),
+        "latest_price": latest_price,
+    }
+
+
+def stack_histories(histories, days):
+    """
+    Right-aligns 1-D price arrays into a len(histories) x days matrix padded
+    with NaN on the left (histories longer than `days` keep their tail).
+    """
+    matrix = np.full((len(histories), days), np.nan)
+    for row, prices in zip(matrix, histories):
+        tail = np.asarray(prices, dtype=np.float64)[-days:]
+        if len(tail):
+            row[days - len(tail):] = tail
+    return matrix
+
+
+def forecast_params(fit, row=0):
+    """
+    Returns the (drift, volatility) pair the forecast engine takes for one
+    row of a fit, or None when that row could not be fitted.
+    """
+    drift, volatility = fit["drift"][row], fit["volatility"][row]
+    if np.isnan(drift) or np.isnan(volatility):
+        return None
+    return float(drift), float(volatility)
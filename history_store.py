@@ -0,0 +1,246 @@
+# =================================================================
+# MEMORY-MAPPED PRICE HISTORY STORE
+# One append-only binary file per ticker holding fixed-width daily bars
+# behind a small header. Files are opened with mmap (numpy.memmap), so:
+#   - the latest bar is an O(1) index into the mapping,
+#   - any date window is a zero-copy NumPy view (binary search on dates),
+#   - appends are a single write() of whole records under a file lock,
+#     and readers only ever see complete records (a new file gets its
+#     header in the same write; until then readers see no bars),
+#   - rewrites (replace) go to a new file renamed over the old one.
+# =================================================================
+
+import fcntl
+import os
+import re
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+MAGIC = b"TSBARS01"
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("record_size", "<u4")])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+FORMAT_VERSION = 1
+
+BAR_DTYPE = np.dtype([
+    ("date", "<M8[D]"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+EMPTY_BARS = np.zeros(0, dtype=BAR_DTYPE)
+
+# Valid ticker symbols; they name the store's files, so they can never
+# contain a path separator or start with a dot
+MAX_TICKER_LENGTH = 16
+TICKER_PATTERN = re.compile(rf"[A-Z0-9][A-Z0-9.^=_-]{{0,{MAX_TICKER_LENGTH - 1}}}")
+
+
+class HistoryStoreError(Exception):
+    """Raised for corrupt files, out-of-order appends or invalid tickers."""
+
+
+def make_bars(dates, close, open=None, high=None, low=None, volume=None):
+    """
+    Builds a structured bar array from columns. Missing open/high/low
+    default to the close, missing volume to zero.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    bars = np.empty(len(close), dtype=BAR_DTYPE)
+    bars["date"] = np.asarray(dates, dtype="datetime64[D]")
+    bars["close"] = close
+    bars["open"] = close if open is None else open
+    bars["high"] = close if high is None else high
+    bars["low"] = close if low is None else low
+    bars["volume"] = 0.0 if volume is None else volume
+    return bars
+
+
+class HistoryStore:
+    """
+    Per-ticker bar files under a root directory.
+
+    Mappings are cached per ticker and transparently remapped when another
+    writer (or process) has appended to the file.
+    """
+
+    def __init__(self, root):
+        self.root = os.fspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Pickles by root so worker processes reattach through open_store
+        return open_store, (self.root,)
+
+    def path(self, ticker):
+        ticker = ticker.upper()
+        if TICKER_PATTERN.fullmatch(ticker) is None:
+            raise HistoryStoreError(f"Invalid ticker {ticker!r}.")
+        return os.path.join(self.root, f"{ticker}.bars")
+
+    def tickers(self):
+        """Returns the sorted list of stored tickers."""
+        return sorted(name[:-5] for name in os.listdir(self.root) if name.endswith(".bars"))
+
+    def __contains__(self, ticker):
+        try:
+            return os.stat(self.path(ticker)).st_size >= HEADER_SIZE
+        except FileNotFoundError:
+            return False
+
+    # --- Reading -------------------------------------------------------------
+
+    def bars(self, ticker):
+        """
+        Returns every bar of `ticker` as a read-only memory-mapped structured
+        array (empty if the ticker is unknown).
+        """
+        path = self.path(ticker)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return EMPTY_BARS
+        if stat.st_size < HEADER_SIZE:
+            return EMPTY_BARS  # Just created by a writer that has not written to it yet
+        count = (stat.st_size - HEADER_SIZE) // BAR_DTYPE.itemsize
+        identity = (stat.st_ino, count)  # A replaced file has a new inode
+
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == identity:
+                return cached[1]
+            self._check_header(path)
+            bars = EMPTY_BARS if count == 0 else np.memmap(
+                path, dtype=BAR_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,)
+            )
+            self._maps[path] = (identity, bars)
+            return bars
+
+    def latest(self, ticker):
+        """Returns the most recent bar (a structured scalar) or None."""
+        bars = self.bars(ticker)
+        return bars[-1] if len(bars) else None
+
+    def window(self, ticker, start=None, end=None):
+        """
+        Returns the bars with start <= date <= end as a zero-copy view.
+        Either bound may be omitted.
+        """
+        bars = self.bars(ticker)
+        dates = bars["date"]
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        hi = len(bars) if end is None else np.searchsorted(dates, np.datetime64(end, "D"), side="right")
+        return bars[lo:hi]
+
+    def tail(self, ticker, count):
+        """Returns the last `count` bars as a zero-copy view."""
+        bars = self.bars(ticker)
+        return bars[max(len(bars) - count, 0):]
+
+    # --- Writing -------------------------------------------------------------
+
+    def append(self, ticker, bars):
+        """
+        Atomically appends bars (a BAR_DTYPE array) to `ticker`'s file.
+
+        Dates must be strictly increasing and later than the stored latest bar.
+        The records go out in a single write() while holding an exclusive
+        lock, together with the header for a new file; a torn tail left by
+        a crashed writer is trimmed first.
+        """
+        bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+        if len(bars) == 0:
+            return
+        if len(bars) > 1 and np.any(np.diff(bars["date"]) <= np.timedelta64(0, "D")):
+            raise HistoryStoreError("Bars must have strictly increasing dates.")
+
+        path = self.path(ticker)
+        fd = self._lock_file(path)
+        try:
+            size = os.fstat(fd).st_size
+            header = b""
+            if size < HEADER_SIZE:
+                # New (or torn-header) file: the header goes out with the bars
+                header, whole = self._header().tobytes(), 0
+            else:
+                self._check_header(path)
+                whole = HEADER_SIZE + (size - HEADER_SIZE) // BAR_DTYPE.itemsize * BAR_DTYPE.itemsize
+            if whole != size:
+                os.ftruncate(fd, whole)
+            if whole > HEADER_SIZE:
+                last = np.frombuffer(os.pread(fd, BAR_DTYPE.itemsize, whole - BAR_DTYPE.itemsize), dtype=BAR_DTYPE)
+                if bars["date"][0] <= last["date"][0]:
+                    raise HistoryStoreError(
+                        f"{ticker}: bar dated {bars['date'][0]} is not after the latest stored bar "
+                        f"({last['date'][0]})."
+                    )
+            os.pwrite(fd, header + bars.tobytes(), whole)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def replace(self, ticker, bars):
+        """
+        Atomically replaces `ticker`'s history with bars (strictly
+        increasing dates). The new file is written next to the old one and
+        renamed over it, so readers see either the old or the new history;
+        mappings held by readers stay valid until they next call bars().
+        """
+        bars = np.ascontiguousarray(bars, dtype=BAR_DTYPE)
+        if len(bars) > 1 and np.any(np.diff(bars["date"]) <= np.timedelta64(0, "D")):
+            raise HistoryStoreError("Bars must have strictly increasing dates.")
+
+        path = self.path(ticker)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        fd = self._lock_file(path)
+        try:
+            with open(temporary, "wb") as handle:
+                handle.write(self._header().tobytes())
+                handle.write(bars.tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, path)
+        finally:
+            os.close(fd)
+
+    # --- Helpers -------------------------------------------------------------
+
+    @staticmethod
+    def _lock_file(path):
+        """
+        Opens (creating if needed) and exclusively locks `path`; returns the
+        descriptor. Retries if the file was replaced while waiting for the
+        lock, so the lock is always held on the current file.
+        """
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    @staticmethod
+    def _header():
+        return np.array([(MAGIC, FORMAT_VERSION, BAR_DTYPE.itemsize)], dtype=HEADER_DTYPE)
+
+    @staticmethod
+    def _check_header(path):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if (len(header) != 1 or header["magic"][0] != MAGIC
+                or header["record_size"][0] != BAR_DTYPE.itemsize):
+            raise HistoryStoreError(f"{path} is not a version {FORMAT_VERSION} bar file.")
+
+
+@lru_cache(maxsize=None)
+def open_store(root):
+    """Returns the process-wide HistoryStore for `root` (one set of mappings per process)."""
+    return HistoryStore(root)
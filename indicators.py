@@ -0,0 +1,414 @@
+# =================================================================
+# TECHNICAL INDICATORS (BATCH AND STREAMING)
+# Simple and exponential moving averages, RSI, rolling volatility,
+# Bollinger bands and ATR, in two interchangeable forms:
+#   - batch: whole tickers x days matrices at once. Rolling windows are
+#     differences of cumulative sums; exponential (and Wilder) smoothing
+#     is the closed form y_t = d^t * (y_0 + a * cumsum(x_k / d^k)),
+#     evaluated in blocks short enough that d^-k cannot overflow
+#   - streaming: one object per ticker (__slots__, array-backed ring
+#     buffers) updated in O(1) per new bar, so a long-lived consumer
+#     keeps indicators current without rereading history
+# Both give the same values for the same bars. Rows may start with NaN
+# (right-aligned histories, see fitting.stack_histories) but have no
+# gaps after their first bar; an indicator is NaN until its window has
+# filled.
+# The indicators describe a history for API consumers (&indicators=1,
+# cli.py --indicators); the forecast models in feature.py and arima.py
+# do not take them as inputs.
+# =================================================================
+
+import math
+from array import array
+
+import numpy as np
+
+SMA_WINDOW = 20
+EMA_SPAN = 12
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 20
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2.0    # Band half-width in standard deviations
+ATR_PERIOD = 14
+RESYNC_ROUNDS = 64       # Streaming windows re-sum their buffer every RESYNC_ROUNDS x window bars
+
+# Column names of indicator_columns / IndicatorState, in output order
+COLUMNS = (f"sma_{SMA_WINDOW}", f"ema_{EMA_SPAN}", f"rsi_{RSI_PERIOD}", f"volatility_{VOLATILITY_WINDOW}",
+           "bollinger_upper", "bollinger_lower", f"atr_{ATR_PERIOD}")
+# Decimals kept in JSON output (prices to cents, volatility as a fraction)
+DECIMALS = {**dict.fromkeys(COLUMNS, 2), f"volatility_{VOLATILITY_WINDOW}": 6}
+
+
+# --- Batch -----------------------------------------------------------------
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=np.float64)
+    return np.atleast_2d(values), values.ndim == 1
+
+
+def _restore(result, was_1d):
+    return result[0] if was_1d else result
+
+
+def _first_valid(matrix):
+    """Index of each row's first non-NaN value (the row length if none)."""
+    if matrix.shape[1] == 0:
+        return np.zeros(len(matrix), dtype=np.intp)
+    valid = ~np.isnan(matrix)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), matrix.shape[1])
+
+
+def _trailing_sums(values, window):
+    """Sums of every trailing window (NaN until the first full one)."""
+    rows, days = values.shape
+    cumulative = np.zeros((rows, days + 1))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+    sums = np.full(values.shape, np.nan)
+    np.subtract(cumulative[:, window:], cumulative[:, :-window], out=sums[:, window - 1:])
+    return sums
+
+
+def _window_moments(matrix, window, squares=False):
+    """
+    Mean (and, with squares=True, sum of squared deviations) of every
+    trailing window, from cumulative sums of values shifted by the row's
+    first value, which keeps the squares well conditioned. Windows that
+    reach into a row's leading NaN are NaN.
+    """
+    rows, days = matrix.shape
+    if window > days:
+        return np.full(matrix.shape, np.nan), np.full(matrix.shape, np.nan)
+    first = _first_valid(matrix)
+    leading = np.arange(days)[None, :] < first[:, None]
+    shift = matrix[np.arange(rows), np.minimum(first, days - 1)][:, None]
+    shifted = matrix - shift
+    shifted[leading] = 0.0
+
+    total = _trailing_sums(shifted, window)
+    mean = total / window
+    deviations = None
+    if squares:
+        shifted *= shifted
+        deviations = np.maximum(_trailing_sums(shifted, window) - total * mean, 0.0)
+    mean += shift
+    unfilled = np.arange(days)[None, :] < (first + window - 1)[:, None]
+    mean[unfilled] = np.nan
+    if squares:
+        deviations[unfilled] = np.nan
+    return mean, deviations
+
+
+def sma(prices, window=SMA_WINDOW):
+    """Simple moving average over the trailing `window` bars."""
+    matrix, was_1d = _as_matrix(prices)
+    return _restore(_window_moments(matrix, window)[0], was_1d)
+
+
+def rolling_std(values, window, ddof=0):
+    """Standard deviation over the trailing `window` values."""
+    matrix, was_1d = _as_matrix(values)
+    deviations = _window_moments(matrix, window, squares=True)[1]
+    return _restore(np.sqrt(deviations / (window - ddof)), was_1d)
+
+
+def _smooth(matrix, alpha, start):
+    """
+    Exponential smoothing y_t = (1 - alpha) * y_{t-1} + alpha * x_t that
+    starts from y = x at column `start` of every row (NaN before it).
+    Values after `start` must not be NaN.
+    """
+    rows, days = matrix.shape
+    decay = 1.0 - alpha
+    out = np.full(matrix.shape, np.nan)
+    live = start < days
+    if not live.any():
+        return out
+    t = np.arange(days)
+    seed = matrix[np.arange(rows), np.minimum(start, days - 1)]
+    # Before its start a row repeats its seed, which leaves y at the seed
+    values = np.where(t[None, :] < start[:, None], seed[:, None], matrix)
+
+    if decay == 0.0:
+        out = values.copy()
+    else:
+        block = max(1, int(150.0 / -math.log10(decay)))  # decay ** -block stays below 1e150
+        previous = seed
+        for begin in range(0, days, block):
+            chunk = values[:, begin:begin + block]
+            powers = decay ** np.arange(chunk.shape[1])
+            out[:, begin:begin + block] = powers * (decay * previous[:, None]
+                                                    + alpha * np.cumsum(chunk / powers, axis=1))
+            previous = out[:, begin + chunk.shape[1] - 1]
+    out[t[None, :] < start[:, None]] = np.nan
+    return out
+
+
+def ema(prices, span=EMA_SPAN):
+    """Exponential moving average with alpha = 2 / (span + 1), seeded with the first bar."""
+    matrix, was_1d = _as_matrix(prices)
+    return _restore(_smooth(matrix, 2.0 / (span + 1.0), _first_valid(matrix)), was_1d)
+
+
+def _wilder(values, period):
+    """
+    Wilder's smoothing (alpha = 1 / period) seeded with the simple average
+    of each row's first `period` values; NaN until then.
+    """
+    rows, days = values.shape
+    seed_at = _first_valid(values) + period - 1
+    live = seed_at < days
+    values = values.copy()
+    if live.any():
+        means = _window_moments(values, period)[0]
+        values[live, seed_at[live]] = means[live, seed_at[live]]
+    return _smooth(values, 1.0 / period, np.where(live, seed_at, days))
+
+
+def _with_previous(matrix, values):
+    """Pads per-bar-change values (one column shorter) back to the bar columns."""
+    return np.concatenate((np.full((len(matrix), 1), np.nan), values), axis=1)
+
+
+def rsi(prices, period=RSI_PERIOD):
+    """Wilder's relative strength index (0-100)."""
+    matrix, was_1d = _as_matrix(prices)
+    change = np.diff(matrix, axis=1)
+    gains = _wilder(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), period)
+    losses = _wilder(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        index = np.where(losses > 0, 100.0 - 100.0 / (1.0 + gains / losses), np.where(gains > 0, 100.0, 50.0))
+    return _restore(_with_previous(matrix, np.where(np.isnan(gains), np.nan, index)), was_1d)
+
+
+def volatility(prices, window=VOLATILITY_WINDOW):
+    """Sample standard deviation of daily log returns over the trailing `window` returns."""
+    matrix, was_1d = _as_matrix(prices)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(matrix), axis=1)
+    return _restore(_with_previous(matrix, rolling_std(returns, window, ddof=1)), was_1d)
+
+
+def bollinger(prices, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+    """Bollinger bands: (middle, upper, lower) = SMA -/+ width population standard deviations."""
+    matrix, was_1d = _as_matrix(prices)
+    middle, deviations = _window_moments(matrix, window, squares=True)
+    spread = np.sqrt(deviations / window)
+    return tuple(_restore(band, was_1d) for band in (middle, middle + width * spread, middle - width * spread))
+
+
+def atr(close, high=None, low=None, period=ATR_PERIOD):
+    """
+    Wilder's average true range. Without high/low (close-only history) the
+    true range is the absolute close-to-close change.
+    """
+    close, was_1d = _as_matrix(close)
+    high = close if high is None else _as_matrix(high)[0]
+    low = close if low is None else _as_matrix(low)[0]
+    previous = close[:, :-1]
+    true_range = np.fmax(high[:, 1:] - low[:, 1:],
+                         np.fmax(np.abs(high[:, 1:] - previous), np.abs(low[:, 1:] - previous)))
+    true_range[np.isnan(previous) | np.isnan(close[:, 1:])] = np.nan
+    return _restore(_with_previous(close, _wilder(true_range, period)), was_1d)
+
+
+def indicator_columns(close, high=None, low=None):
+    """
+    Every indicator (see COLUMNS) for a price array or tickers x days
+    matrix, as a dictionary of arrays shaped like `close`.
+    """
+    _, upper, lower = bollinger(close)
+    values = (sma(close), ema(close), rsi(close), volatility(close), upper, lower, atr(close, high, low))
+    return dict(zip(COLUMNS, values))
+
+
+# --- Streaming -------------------------------------------------------------
+
+class RollingWindow:
+    """Ring buffer of the last `size` values with running sum and sum of squares."""
+
+    __slots__ = ("values", "size", "count", "position", "total", "total_sq", "until_resync")
+
+    def __init__(self, size):
+        self.values = array("d", bytes(8 * size))
+        self.size = size
+        self.count = 0
+        self.position = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.until_resync = RESYNC_ROUNDS * size
+
+    def push(self, value):
+        if self.count == self.size:
+            old = self.values[self.position]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.total += value
+        self.total_sq += value * value
+        self.until_resync -= 1
+        if self.until_resync == 0:
+            # Amortized O(1): drop the rounding error the running sums pick up
+            held = self.values if self.count == self.size else self.values[:self.count]
+            self.total = math.fsum(held)
+            self.total_sq = math.fsum(value * value for value in held)
+            self.until_resync = RESYNC_ROUNDS * self.size
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def mean(self):
+        return self.total / self.size if self.full else math.nan
+
+    def std(self, ddof=0):
+        if not self.full:
+            return math.nan
+        mean = self.total / self.size
+        return math.sqrt(max(self.total_sq - self.total * mean, 0.0) / (self.size - ddof))
+
+
+class StreamingSMA:
+    __slots__ = ("window",)
+
+    def __init__(self, window=SMA_WINDOW):
+        self.window = RollingWindow(window)
+
+    def update(self, price):
+        self.window.push(price)
+        return self.window.mean()
+
+
+class StreamingEMA:
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span=EMA_SPAN):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+
+    def update(self, price):
+        self.value = price if math.isnan(self.value) else self.value + self.alpha * (price - self.value)
+        return self.value
+
+
+class WilderAverage:
+    """Wilder's smoothing, seeded with the mean of the first `period` values."""
+
+    __slots__ = ("period", "count", "value")
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, value):
+        if self.count < self.period:
+            self.count += 1
+            self.value += (value - self.value) / self.count  # Running mean until seeded
+            return self.value if self.count == self.period else math.nan
+        self.value += (value - self.value) / self.period
+        return self.value
+
+
+class StreamingRSI:
+    __slots__ = ("previous", "gains", "losses")
+
+    def __init__(self, period=RSI_PERIOD):
+        self.previous = math.nan
+        self.gains = WilderAverage(period)
+        self.losses = WilderAverage(period)
+
+    def update(self, price):
+        change, self.previous = price - self.previous, price
+        if math.isnan(change):
+            return math.nan
+        gain = self.gains.update(max(change, 0.0))
+        loss = self.losses.update(max(-change, 0.0))
+        if math.isnan(gain):
+            return math.nan
+        if loss > 0:
+            return 100.0 - 100.0 / (1.0 + gain / loss)
+        return 100.0 if gain > 0 else 50.0
+
+
+class StreamingVolatility:
+    __slots__ = ("previous", "returns")
+
+    def __init__(self, window=VOLATILITY_WINDOW):
+        self.previous = math.nan
+        self.returns = RollingWindow(window)
+
+    def update(self, price):
+        previous, self.previous = self.previous, price
+        if math.isnan(previous):
+            return math.nan
+        self.returns.push(math.log(price / previous))
+        return self.returns.std(ddof=1)
+
+
+class StreamingBollinger:
+    __slots__ = ("window", "width")
+
+    def __init__(self, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+        self.window = RollingWindow(window)
+        self.width = width
+
+    def update(self, price):
+        """Returns (middle, upper, lower)."""
+        self.window.push(price)
+        middle, spread = self.window.mean(), self.window.std()
+        return middle, middle + self.width * spread, middle - self.width * spread
+
+
+class StreamingATR:
+    __slots__ = ("previous", "average")
+
+    def __init__(self, period=ATR_PERIOD):
+        self.previous = math.nan
+        self.average = WilderAverage(period)
+
+    def update(self, close, high=None, low=None):
+        high = close if high is None else high
+        low = close if low is None else low
+        previous, self.previous = self.previous, close
+        if math.isnan(previous):
+            return math.nan
+        return self.average.update(max(high - low, abs(high - previous), abs(low - previous)))
+
+
+class IndicatorState:
+    """
+    Every indicator of one ticker, updated bar by bar in O(1). Build it
+    once from history (from_history), then feed each new bar to update().
+    """
+
+    __slots__ = ("sma", "ema", "rsi", "volatility", "bollinger", "atr", "latest")
+
+    def __init__(self):
+        self.sma = StreamingSMA()
+        self.ema = StreamingEMA()
+        self.rsi = StreamingRSI()
+        self.volatility = StreamingVolatility()
+        self.bollinger = StreamingBollinger()
+        self.atr = StreamingATR()
+        self.latest = dict.fromkeys(COLUMNS, math.nan)
+
+    @classmethod
+    def from_history(cls, close, high=None, low=None):
+        state = cls()
+        close = np.asarray(close, dtype=np.float64).tolist()
+        high = close if high is None else np.asarray(high, dtype=np.float64).tolist()
+        low = close if low is None else np.asarray(low, dtype=np.float64).tolist()
+        for bar in zip(close, high, low):
+            state.update(*bar)
+        return state
+
+    def update(self, close, high=None, low=None):
+        """Adds one bar; returns the latest value of every indicator (see COLUMNS)."""
+        _, upper, lower = self.bollinger.update(close)
+        values = (self.sma.update(close), self.ema.update(close), self.rsi.update(close),
+                  self.volatility.update(close), upper, lower, self.atr.update(close, high, low))
+        self.latest = dict(zip(COLUMNS, values))
+        return self.latest
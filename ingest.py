@@ -0,0 +1,497 @@
+# =================================================================
+# BULK HISTORY INGESTION
+# Loads daily bars from multi-ticker CSV or Parquet files into the
+# HistoryStore (history_store.py) the model reads from:
+#   1. reads the file in chunks of rows (numpy's C parser for CSV,
+#      record batches for Parquet), so the file is never held in memory
+#   2. converts and validates every chunk with whole-column operations
+#      and spools the valid rows to one scratch file per ticker
+#   3. per ticker: sorts by date, drops duplicate dates (the last row
+#      wins), gap-fills missing trading sessions with the previous close
+#      and writes the result to the store
+# Rows for dates after a ticker's stored history are appended; anything
+# else rewrites that ticker's file with the merged history. With
+# --model-state, a RollingModelState (model_state.py) takes the new bars
+# as they are written and its estimates are published to --registry, so
+# the server forecasts from models that are current without a refit.
+#
+#     python ingest.py prices.csv --data-dir data
+#     python ingest.py --feed vendor_drop --data-dir data --model-state data/models.npz --registry models.reg
+#
+# Files need a header row with at least date and close columns, plus a
+# ticker column unless --ticker names the one ticker in the file. Dates
+# are ISO 8601; a time of day is ignored.
+# =================================================================
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from history_store import BAR_DTYPE, TICKER_PATTERN, open_store
+from trading_calendar import DEFAULT_CALENDAR, get_calendar
+
+DEFAULT_CHUNK_ROWS = 1 << 18
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+FIELDS = ("ticker", "date") + PRICE_FIELDS
+REQUIRED_FIELDS = ("date", "close")
+
+# Accepted header names (case-insensitive) for every field
+COLUMN_ALIASES = {
+    "ticker": ("ticker", "symbol"),
+    "date": ("date", "day", "timestamp", "time"),
+    "open": ("open",),
+    "high": ("high",),
+    "low": ("low",),
+    "close": ("close", "adj_close", "adjusted_close", "price"),
+    "volume": ("volume",),
+}
+REJECT_REASONS = ("malformed", "bad_ticker", "bad_date", "bad_price")
+
+
+class IngestError(Exception):
+    """Raised for files that cannot be ingested at all (missing columns, unknown format)."""
+
+
+def map_columns(header):
+    """
+    Maps a header row to {field: column index} using COLUMN_ALIASES.
+    Raises IngestError if a required field has no column.
+    """
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        raise IngestError(f"No column for {', '.join(missing)} in header {header}.")
+    return columns
+
+
+# --- Vectorized conversion -------------------------------------------------
+
+def _parse_unique(values, convert, missing):
+    """Converts a string column by converting each distinct value once."""
+    unique, inverse = np.unique(values, return_inverse=True)
+    converted = []
+    for value in unique.tolist():
+        try:
+            converted.append(convert(value))
+        except ValueError:
+            converted.append(missing)
+    return np.array(converted)[inverse]
+
+
+def to_dates(values):
+    """Converts a column of ISO date(time) strings to datetime64[D]; NaT where invalid."""
+    values = np.char.strip(np.asarray(values, dtype=str)).astype("U10")  # Keeps YYYY-MM-DD
+    try:
+        return values.astype("datetime64[D]")
+    except ValueError:
+        return _parse_unique(values, lambda value: np.datetime64(value, "D"),
+                             np.datetime64("NaT", "D")).astype("datetime64[D]")
+
+
+def to_floats(values):
+    """Converts a column of number strings to float64; NaN where empty or invalid."""
+    values = np.asarray(values, dtype=str)
+    try:
+        return values.astype(np.float64)
+    except ValueError:
+        return _parse_unique(values, float, np.nan).astype(np.float64)
+
+
+def clean_chunk(columns, counts):
+    """
+    Validates one chunk of converted columns and returns the valid rows as
+    (names, codes, bars): the distinct tickers, the index into names of
+    every bar, and the bars. Missing open/high/low become the close and
+    missing volume zero; rejected rows are counted into counts[reason].
+
+    Args:
+        columns: {'ticker': str array, 'date': datetime64[D] array,
+            'close': float array, optional 'open', 'high', 'low', 'volume'}.
+        counts: Dictionary of running counters, updated in place.
+    """
+    close = columns["close"]
+    rows = len(close)
+    dates = columns["date"]
+
+    # 1. Tickers are normalized and checked once per distinct raw value
+    raw, inverse = np.unique(columns["ticker"], return_inverse=True)
+    cleaned = [ticker.strip().upper() for ticker in raw.tolist()]
+    names, remap = np.unique(np.array(cleaned, dtype=str), return_inverse=True)
+    codes = remap.reshape(-1)[inverse.reshape(-1)]
+    good_name = np.array([TICKER_PATTERN.fullmatch(name) is not None for name in names.tolist()], dtype=bool)
+
+    # 2. Every check at once; each rejected row is charged to its first failure
+    prices = {field: np.where(np.isnan(columns[field]), close, columns[field]) if field in columns else close
+              for field in ("open", "high", "low")}
+    volume = np.nan_to_num(columns["volume"], nan=0.0) if "volume" in columns else np.zeros(rows)
+    with np.errstate(invalid="ignore"):
+        good_price = ((close > 0) & np.isfinite(close) & (prices["open"] > 0) & (prices["high"] >= prices["low"])
+                      & (prices["low"] > 0) & np.isfinite(prices["high"]) & (volume >= 0))
+    checks = (("bad_ticker", good_name[codes]), ("bad_date", ~np.isnat(dates)), ("bad_price", good_price))
+    valid = np.ones(rows, dtype=bool)
+    for reason, passed in checks:
+        counts[reason] += int((valid & ~passed).sum())
+        valid &= passed
+
+    # 3. Pack the survivors as store records
+    bars = np.empty(int(valid.sum()), dtype=BAR_DTYPE)
+    bars["date"] = dates[valid]
+    bars["close"] = close[valid]
+    for field, values in prices.items():
+        bars[field] = values[valid]
+    bars["volume"] = volume[valid]
+    return names, codes[valid], bars
+
+
+# --- Readers ---------------------------------------------------------------
+
+def _csv_fallback(lines, columns, width):
+    """Slow path for a chunk the C parser rejects: per-row split, malformed rows dropped."""
+    lines = [line for line in lines if line.strip()]
+    rows = [row for row in csv.reader(lines) if len(row) == width]
+    table = np.array(rows, dtype=str).reshape(len(rows), width)
+    return {field: table[:, index] for field, index in columns.items()}, len(lines) - len(rows)
+
+
+def iter_csv_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, ticker=None):
+    """
+    Yields (columns, malformed) per chunk of a CSV file: converted column
+    arrays (see clean_chunk) and the number of rows that could not be split
+    into the header's columns.
+    """
+    with open(path, newline="") as handle:
+        header = next(csv.reader([handle.readline()]), [])
+        columns = map_columns(header)
+        if "ticker" not in columns and ticker is None:
+            raise IngestError(f"{path} has no ticker column; name its ticker explicitly.")
+        fields = [field for field in FIELDS if field in columns]
+        dtype = np.dtype([(field, "U32" if field == "ticker" else "M8[D]" if field == "date" else "f8")
+                          for field in fields])
+
+        while True:
+            lines = list(islice(handle, chunk_rows))
+            if not lines:
+                return
+            try:
+                table = np.loadtxt(lines, dtype=dtype, delimiter=",", quotechar='"', ndmin=1,
+                                   usecols=[columns[field] for field in fields])
+                chunk, malformed = {field: table[field] for field in fields}, 0
+            except ValueError:
+                # Bad values or ragged rows somewhere in the chunk: parse it as text
+                chunk, malformed = _csv_fallback(lines, columns, len(header))
+                chunk = {field: values if field == "ticker" else to_dates(values) if field == "date"
+                         else to_floats(values) for field, values in chunk.items()}
+            if "ticker" not in columns:
+                chunk["ticker"] = np.full(len(chunk["close"]), ticker)
+            yield chunk, malformed
+
+
+def iter_parquet_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, ticker=None):
+    """Yields (columns, malformed) per record batch of a Parquet file (needs pyarrow)."""
+    try:
+        import pyarrow.parquet as parquet
+    except ImportError:
+        raise IngestError("Reading Parquet files needs pyarrow (pip install pyarrow).") from None
+
+    source = parquet.ParquetFile(path)
+    names = source.schema_arrow.names
+    columns = map_columns(names)
+    if "ticker" not in columns and ticker is None:
+        raise IngestError(f"{path} has no ticker column; name its ticker explicitly.")
+    selected = {field: names[index] for field, index in columns.items()}
+    for batch in source.iter_batches(batch_size=chunk_rows, columns=list(selected.values())):
+        chunk = {}
+        for field, name in selected.items():
+            values = batch.column(name).to_numpy(zero_copy_only=False)
+            if field == "ticker":
+                chunk[field] = values.astype(str)
+            elif field == "date":
+                chunk[field] = values.astype("datetime64[D]") if values.dtype.kind == "M" else to_dates(values)
+            else:
+                chunk[field] = values.astype(np.float64) if values.dtype.kind in "fiu" else to_floats(values)
+        if "ticker" not in columns:
+            chunk["ticker"] = np.full(batch.num_rows, ticker)
+        yield chunk, 0
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, ticker=None):
+    """Picks the reader by file extension (.csv, .txt, .parquet, .pq)."""
+    suffix = Path(path).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        return iter_parquet_chunks(path, chunk_rows, ticker)
+    if suffix in (".csv", ".txt"):
+        return iter_csv_chunks(path, chunk_rows, ticker)
+    raise IngestError(f"Unknown file format '{suffix}' for {path}.")
+
+
+# --- Per-ticker preparation ------------------------------------------------
+
+def prepare_bars(bars, calendar=DEFAULT_CALENDAR, previous=None):
+    """
+    Sorts bars by date, keeps the last of any duplicate dates and fills
+    missing trading sessions with flat bars at the previous close (zero
+    volume). Non-session dates present in the data are kept.
+
+    Args:
+        bars: BAR_DTYPE array in arrival order.
+        calendar: Trading calendar name defining the sessions to fill.
+        previous: Optional stored bar the new bars continue from; gaps
+            after it are filled too, but it is not part of the result.
+
+    Returns:
+        (bars, filled): the prepared BAR_DTYPE array and the number of
+        gap-filled sessions.
+    """
+    if previous is not None:
+        bars = np.concatenate((np.asarray([previous], dtype=BAR_DTYPE), bars))
+    if len(bars) == 0:
+        return bars, 0
+
+    # 1. Stable sort, then keep the last row of every run of equal dates
+    #    (both skipped for the common case of already increasing dates)
+    dates = bars["date"]
+    if np.any(dates[1:] <= dates[:-1]):
+        bars = bars[np.argsort(dates, kind="stable")]
+        dates = bars["date"]
+        bars = bars[np.append(dates[1:] != dates[:-1], True)]
+        dates = bars["date"]
+
+    # 2. Reindex onto every session between the first and last date
+    calendar = get_calendar(calendar)
+    index = calendar.sessions(dates[0], dates[-1])
+    extra = dates[~calendar.is_session(dates)]
+    if len(extra):
+        index = np.union1d(index, extra)
+    source = np.searchsorted(dates, index, side="right") - 1
+    filled = bars[source]
+    gap = dates[source] != index
+    filled["date"] = index
+    for field in ("open", "high", "low"):
+        filled[field][gap] = filled["close"][gap]
+    filled["volume"][gap] = 0.0
+    if previous is not None:
+        filled = filled[1:]
+    return filled, int(gap.sum())
+
+
+def write_ticker(store, ticker, bars, calendar=DEFAULT_CALENDAR):
+    """
+    Writes one ticker's new bars into the store: appended if they all
+    follow the stored history, otherwise merged with it (new rows win on
+    equal dates) and rewritten. Returns (filled, appended): the number of
+    gap-filled sessions and whether the stored bars were only appended to.
+    """
+    latest = store.latest(ticker)
+    if latest is None:
+        prepared, filled = prepare_bars(bars, calendar)
+        store.replace(ticker, prepared)
+    elif bars["date"].min() > latest["date"]:
+        prepared, filled = prepare_bars(bars, calendar, previous=latest)
+        store.append(ticker, prepared)
+        return filled, True
+    else:
+        prepared, filled = prepare_bars(np.concatenate((store.bars(ticker), bars)), calendar)
+        store.replace(ticker, prepared)
+    return filled, False
+
+
+def model_state_bars(state, store, ticker, previous, appended):
+    """
+    Returns the (dates, closes) of `ticker` that `state` has not seen. When
+    the write only appended and the state was current up to `previous`
+    (the stored bar the write followed), that is just the appended bars,
+    an O(1) update per bar; otherwise the ticker is discarded from the
+    state and refilled from its last window of stored bars.
+    """
+    row = state.index.get(ticker)
+    if appended and row is not None and state.watermark[row] == previous["date"]:
+        bars = store.window(ticker, start=previous["date"] + np.timedelta64(1, "D"))
+    else:
+        state.discard([ticker])
+        bars = store.tail(ticker, state.window)
+    return bars["date"], bars["close"]
+
+
+# --- Pipeline ---------------------------------------------------------------
+
+def empty_report():
+    return {"files": 0, "rows": 0, **{reason: 0 for reason in REJECT_REASONS},
+            "duplicates": 0, "gap_filled": 0, "bars_written": 0, "tickers": 0, "seconds": 0.0}
+
+
+def ingest_files(paths, store, chunk_rows=DEFAULT_CHUNK_ROWS, ticker=None, calendar=DEFAULT_CALENDAR,
+                 model_state=None):
+    """
+    Ingests CSV/Parquet files into a HistoryStore.
+
+    Valid rows of every chunk are grouped by ticker and appended to
+    per-ticker scratch files, so memory holds one chunk (while reading) or
+    one ticker's bars (while writing), never a whole file.
+
+    Args:
+        paths: Files to read, in order (later rows win on duplicate dates).
+        store: Destination HistoryStore.
+        chunk_rows: Rows per chunk.
+        ticker: Ticker for files without a ticker column.
+        calendar: Trading calendar used for gap filling.
+        model_state: Optional RollingModelState brought up to date with
+            every written ticker (see model_state_bars).
+
+    Returns:
+        A report dictionary of counts: files, rows read, rows rejected per
+        reason (REJECT_REASONS), duplicates (rows whose date the file or the
+        store already had), gap_filled sessions,
+        bars_written and tickers, plus 'seconds'.
+    """
+    start = perf_counter()
+    report = empty_report()
+    ticker = None if ticker is None else ticker.upper()
+    with tempfile.TemporaryDirectory(prefix="ingest-", dir=store.root) as spool:
+        spooled = {}
+
+        # 1. Parse, validate and spool chunk by chunk
+        for path in paths:
+            report["files"] += 1
+            for columns, malformed in iter_chunks(path, chunk_rows, ticker):
+                report["rows"] += len(columns["close"]) + malformed
+                report["malformed"] += malformed
+                names, codes, bars = clean_chunk(columns, report)
+                order = np.argsort(codes, kind="stable")
+                present, starts = np.unique(codes[order], return_index=True)
+                for name, group in zip(names[present].tolist(), np.split(bars[order], starts[1:])):
+                    with open(os.path.join(spool, name), "ab") as handle:
+                        handle.write(group.tobytes())
+                    spooled[name] = spooled.get(name, 0) + len(group)
+
+        # 2. Sort, dedupe, gap-fill and store one ticker at a time
+        updates = {}
+        for name in sorted(spooled):
+            bars = np.fromfile(os.path.join(spool, name), dtype=BAR_DTYPE)
+            previous = store.latest(name)
+            before = len(store.bars(name))
+            filled, appended = write_ticker(store, name, bars, calendar)
+            if model_state is not None:
+                updates[name] = model_state_bars(model_state, store, name, previous, appended)
+            written = len(store.bars(name)) - before
+            report["gap_filled"] += filled
+            report["bars_written"] += written
+            report["duplicates"] += max(len(bars) + filled - written, 0)
+            report["tickers"] += 1
+
+        # 3. One vectorized model refresh for every written ticker
+        if model_state is not None:
+            model_state.extend(updates)
+
+    report["seconds"] = round(perf_counter() - start, 3)
+    return report
+
+
+class LocalFileFeed:
+    """
+    Stand-in for a vendor data feed: a drop directory that receives CSV or
+    Parquet files (e.g. one file of end-of-day bars per session). pending()
+    lists files not yet ingested, in name order; a JSON manifest in the
+    directory remembers each ingested file's size and modification time,
+    so a re-delivered (changed) file is picked up again.
+    """
+
+    MANIFEST = ".ingested.json"
+    PATTERNS = ("*.csv", "*.txt", "*.parquet", "*.pq")
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / self.MANIFEST
+
+    def _manifest(self):
+        try:
+            return json.loads(self.manifest_path.read_text())
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def _signature(path):
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def pending(self):
+        manifest = self._manifest()
+        files = sorted({path for pattern in self.PATTERNS for path in self.directory.glob(pattern)})
+        return [path for path in files if manifest.get(path.name) != self._signature(path)]
+
+    def mark_ingested(self, paths):
+        manifest = self._manifest()
+        manifest.update({path.name: self._signature(path) for path in paths})
+        temporary = self.manifest_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+        os.replace(temporary, self.manifest_path)
+
+
+def ingest_feed(feed, store, **options):
+    """Ingests a feed's pending files (see ingest_files) and marks them done."""
+    paths = feed.pending()
+    report = ingest_files(paths, store, **options)
+    feed.mark_ingested(paths)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load daily bars from CSV/Parquet files into a history store.")
+    parser.add_argument("files", nargs="*", help="CSV or Parquet files to ingest, in order.")
+    parser.add_argument("--feed", default=None, help="Drop directory to ingest new files from.")
+    parser.add_argument("--data-dir", required=True, help="History store directory.")
+    parser.add_argument("--ticker", default=None, help="Ticker for files without a ticker column.")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows parsed per chunk.")
+    parser.add_argument("--calendar", default=DEFAULT_CALENDAR, help="Trading calendar for gap filling.")
+    parser.add_argument("--model-state", default=None,
+                        help="Rolling model state file (.npz) to update with the new bars (created if missing).")
+    parser.add_argument("--registry", default=None,
+                        help="Model registry to publish the updated estimates to (needs --model-state).")
+    args = parser.parse_args(argv)
+    if not args.files and args.feed is None:
+        parser.error("give files to ingest or --feed")
+    if args.registry is not None and args.model_state is None:
+        parser.error("--registry needs --model-state")
+
+    store = open_store(args.data_dir)
+    options = {"chunk_rows": args.chunk_rows, "ticker": args.ticker, "calendar": args.calendar}
+    try:
+        if args.model_state is not None:
+            from model_state import RollingModelState
+            state_exists = os.path.exists(args.model_state)
+            options["model_state"] = RollingModelState.load(args.model_state) if state_exists else RollingModelState([])
+        report = ingest_files(args.files, store, **options) if args.files else empty_report()
+        if args.feed is not None:
+            feed_report = ingest_feed(LocalFileFeed(args.feed), store, **options)
+            report = {key: report[key] + feed_report[key] for key in feed_report}
+        if args.model_state is not None:
+            options["model_state"].rebuild()  # Saved sums are exact, whatever this run pushed
+            temporary = f"{args.model_state}.{os.getpid()}.tmp"  # Readers never see a partial state
+            with open(temporary, "wb") as handle:
+                options["model_state"].save(handle)
+            os.replace(temporary, args.model_state)
+            if args.registry is not None:
+                from model_registry import open_registry
+                options["model_state"].publish(open_registry(args.registry))
+    except (IngestError, OSError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# =================================================================
+# PIPELINE INSTRUMENTATION
+# Low-overhead timers, counters and latency histograms for the stages
+# of the prediction pipeline (data, fit, forecast, bounds, serialize),
+# plus callback gauges for cache hit ratios and queue depths and
+# callback counters for totals kept elsewhere (cache lookups). Renders
+# everything in the Prometheus text exposition format (server.py serves
+# it at /metrics) and offers an in-process profiling hook.
+#
+# Disabled by default outside the server (set STOCK_METRICS=1 or call
+# enable()); when disabled, stage() returns a shared no-op context
+# manager and increment() returns at once, so instrumented code pays
+# one flag check per call.
+# =================================================================
+
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = "stock_stage_seconds"
+STAGES = ("data", "fit", "features", "forecast", "bounds", "serialize")
+
+_enabled = os.environ.get("STOCK_METRICS", "") not in ("", "0")
+_NULL = nullcontext()
+_lock = threading.Lock()
+_histograms = {}   # (metric, labels) -> _Histogram
+_counters = {}     # (metric, labels) -> float
+_gauges = {}       # metric -> callable returning a number or {labels: number} (gauges and callback counters)
+_help = {STAGE_METRIC: ("histogram", "Time spent in each prediction pipeline stage.")}
+_hooks = []
+_local = threading.local()
+
+
+def enable(flag=True):
+    """Turns recording on (or off with flag=False)."""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def enabled():
+    return _enabled
+
+
+def describe(metric, kind, help_text):
+    """Declares a metric's type ('counter', 'gauge', 'histogram') and help line."""
+    _help[metric] = (kind, help_text)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def observe(metric, seconds, **labels):
+    """Records one latency sample into a histogram."""
+    if not _enabled:
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram()
+        histogram.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram.total += seconds
+        histogram.count += 1
+    if metric == STAGE_METRIC:
+        captured = getattr(_local, "captured", None)
+        if captured is not None:
+            captured.append((labels["stage"], seconds))
+        for hook in _hooks:
+            hook(labels["stage"], seconds)
+
+
+def increment(metric, amount=1, **labels):
+    """Adds to a counter."""
+    if not _enabled:
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def register_gauge(metric, help_text, callback):
+    """
+    Registers a gauge read at scrape time. callback() returns a number, or
+    a dict mapping label dicts (as tuples of (name, value) pairs) to numbers.
+    """
+    _gauges[metric] = callback
+    describe(metric, "gauge", help_text)
+
+
+def register_counter(metric, help_text, callback):
+    """
+    Registers a counter read at scrape time, for a running total another
+    component already keeps; callback() returns what a gauge callback does,
+    and its values must never decrease.
+    """
+    _gauges[metric] = callback
+    describe(metric, "counter", help_text)
+
+
+class _Timer:
+    __slots__ = ("metric", "labels", "start")
+
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.metric, perf_counter() - self.start, **self.labels)
+        return False
+
+
+def stage(name):
+    """Context manager timing one pipeline stage (see STAGES)."""
+    if not _enabled:
+        return _NULL
+    return _Timer(STAGE_METRIC, {"stage": name})
+
+
+@contextmanager
+def capture():
+    """
+    Collects the (stage, seconds) samples recorded by this thread inside
+    the block into the yielded list. Process-pool workers use it to ship
+    their stage timings back to the parent (see record_samples).
+    """
+    previous = getattr(_local, "captured", None)
+    _local.captured = samples = []
+    try:
+        yield samples
+    finally:
+        _local.captured = previous
+
+
+def record_samples(samples):
+    """Records (stage, seconds) samples captured in another process."""
+    for name, seconds in samples:
+        observe(STAGE_METRIC, seconds, stage=name)
+
+
+def add_hook(hook):
+    """
+    Installs a profiling hook: hook(stage, seconds) is called after every
+    timed stage in this process while metrics are enabled.
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+@contextmanager
+def profile():
+    """
+    In-process profiling: enables recording for the block and yields a
+    dict that fills with {stage: {'calls', 'seconds'}} totals, e.g.
+
+        with metrics.profile() as stages:
+            train_and_predict_stock_price("GOOG", 30)
+        print(stages)
+    """
+    totals = {}
+
+    def hook(name, seconds):
+        entry = totals.setdefault(name, {"calls": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+
+    was_enabled = _enabled
+    enable()
+    add_hook(hook)
+    try:
+        yield totals
+    finally:
+        remove_hook(hook)
+        enable(was_enabled)
+
+
+def reset():
+    """Drops every recorded sample and counter (gauges stay registered)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Returns every metric in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        histograms = {key: (list(h.counts), h.total, h.count) for key, h in _histograms.items()}
+        counters = dict(_counters)
+    gauges = {}
+    for metric, callback in list(_gauges.items()):
+        value = callback()
+        gauges[metric] = value if isinstance(value, dict) else {(): value}
+
+    families = {}
+    for (metric, labels), value in counters.items():
+        families.setdefault(metric, []).append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+    for metric, values in gauges.items():
+        for labels, value in values.items():
+            families.setdefault(metric, []).append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+    for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+        lines = families.setdefault(metric, [])
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+            cumulative += bucket
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total!r}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+    output = []
+    for metric in sorted(families):
+        kind, help_text = _help.get(metric, ("untyped", metric))
+        output += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"] + families[metric]
+    return "\n".join(output) + "\n"
@@ -0,0 +1,286 @@
+# =================================================================
+# PERSISTED MODEL REGISTRY
+# Fitted per-ticker model parameters for the whole universe in one
+# compact fixed-layout binary file, so new processes start warm instead
+# of refitting. Layout (little-endian, struct-of-arrays):
+#
+#     header  magic 'TSMODL01', format version, model version, count,
+#             creation time                                  (32 bytes)
+#     columns ticker (S16, sorted) | drift | volatility | slope |
+#             intercept | latest_price | n_obs | watermark | fitted_at
+#             each `count` fixed-width values, back to back
+#
+# Readers memory-map the file (pages are shared by every process that
+# maps it) and find a ticker by binary search on the sorted ticker
+# column: loading is O(1), a lookup O(log n). Writers build a complete
+# new file and atomically rename it over the old one, so readers never
+# see a partial snapshot and pick up new ones on their next lookup.
+#
+#     python model_registry.py build --file universe.txt --data-dir data --output models.reg
+#     python model_registry.py show models.reg GOOG TSLA
+# =================================================================
+
+import argparse
+import fcntl
+import os
+import sys
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+MAGIC = b"TSMODL01"
+FORMAT_VERSION = 1
+MODEL_VERSION = 1  # Bump when fitting changes; snapshots of other versions are ignored
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("format_version", "<u4"), ("model_version", "<u4"),
+                         ("count", "<u8"), ("created", "<M8[s]")])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+
+COLUMNS = (
+    ("ticker", np.dtype("S16")),
+    ("drift", np.dtype("<f8")),
+    ("volatility", np.dtype("<f8")),
+    ("slope", np.dtype("<f8")),
+    ("intercept", np.dtype("<f8")),
+    ("latest_price", np.dtype("<f8")),
+    ("n_obs", np.dtype("<i8")),
+    ("watermark", np.dtype("<M8[D]")),  # Date of the last bar the fit saw
+    ("fitted_at", np.dtype("<M8[s]")),
+)
+FIT_COLUMNS = ("drift", "volatility", "slope", "intercept", "latest_price")
+MAX_TICKER_BYTES = COLUMNS[0][1].itemsize
+
+
+class ModelRegistryError(Exception):
+    """Raised for corrupt or incompatible registry files."""
+
+
+def make_records(tickers, fit, watermarks, fitted_at=None):
+    """
+    Builds registry columns from a fit.
+
+    Args:
+        tickers: Ticker symbols, one per fit row.
+        fit: Dictionary of per-ticker arrays as returned by
+            fitting.fit_matrix or RollingModelState.estimates.
+        watermarks: Per-ticker date (or one date for all) of the latest bar
+            the fit used; lookups treat older snapshots as stale.
+        fitted_at: Timestamp recorded with every row (default: now).
+
+    Returns:
+        Dictionary of column arrays, sorted by ticker.
+    """
+    encoded = [ticker.upper().encode() for ticker in tickers]
+    if any(len(ticker) > MAX_TICKER_BYTES for ticker in encoded):
+        raise ValueError(f"Ticker symbols are limited to {MAX_TICKER_BYTES} bytes.")
+    count = len(encoded)
+    columns = {"ticker": np.array(encoded, dtype=COLUMNS[0][1]).reshape(count)}
+    for name in FIT_COLUMNS:
+        columns[name] = np.asarray(fit[name], dtype=np.float64).reshape(count)
+    columns["n_obs"] = np.asarray(fit.get("n_obs", np.zeros(count)), dtype=np.int64).reshape(count)
+    columns["watermark"] = np.broadcast_to(np.asarray(watermarks, dtype="datetime64[D]"), (count,))
+    columns["fitted_at"] = np.full(count, np.datetime64(fitted_at or datetime.now(), "s"))
+    order = np.argsort(columns["ticker"], kind="stable")
+    return {name: values[order] for name, values in columns.items()}
+
+
+class ModelRegistry:
+    """
+    Read access to a registry file plus whole-snapshot updates.
+
+    The mapping is refreshed whenever the file has been replaced, so a
+    long-running process always serves the newest snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._mapped = None  # (file identity, header, columns)
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Pickles by path so worker processes reattach through open_registry
+        return open_registry, (self.path,)
+
+    # --- Reading -------------------------------------------------------------
+
+    def columns(self):
+        """
+        Returns the registry as a dictionary of read-only column arrays
+        backed by the memory mapping (empty columns if there is no file).
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if self._mapped is None or self._mapped[0] != identity:
+                self._mapped = (identity, *self._map(stat.st_size))
+            return self._mapped[2]
+
+    def _map(self, size):
+        if size < HEADER_SIZE:
+            raise ModelRegistryError(f"{self.path} is too short to be a model registry.")
+        mapping = np.memmap(self.path, dtype=np.uint8, mode="r")
+        header = np.frombuffer(mapping, dtype=HEADER_DTYPE, count=1)[0]
+        if header["magic"] != MAGIC or header["format_version"] != FORMAT_VERSION:
+            raise ModelRegistryError(f"{self.path} is not a version {FORMAT_VERSION} model registry.")
+        count = int(header["count"])
+        if size != HEADER_SIZE + count * sum(dtype.itemsize for _, dtype in COLUMNS):
+            raise ModelRegistryError(f"{self.path} is truncated.")
+        if header["model_version"] != MODEL_VERSION:
+            count = 0  # Fitted by another model version: every entry is stale
+        columns, offset = {}, HEADER_SIZE
+        for name, dtype in COLUMNS:
+            columns[name] = np.frombuffer(mapping, dtype=dtype, count=count, offset=offset)
+            offset += int(header["count"]) * dtype.itemsize
+        return header, columns
+
+    def __len__(self):
+        return len(self.columns()["ticker"])
+
+    def tickers(self):
+        return [ticker.decode() for ticker in self.columns()["ticker"].tolist()]
+
+    def rows(self, tickers):
+        """Returns the row index of every ticker (-1 where absent), vectorized."""
+        column = self.columns()["ticker"]
+        keys = np.array([ticker.upper().encode() for ticker in tickers], dtype=column.dtype)
+        rows = np.searchsorted(column, keys)
+        found = rows < len(column)
+        found[found] = column[rows[found]] == keys[found]
+        return np.where(found, rows, -1)
+
+    def __contains__(self, ticker):
+        return self.rows([ticker])[0] >= 0
+
+    def get(self, ticker):
+        """Returns one ticker's entry as a dictionary of Python values, or None."""
+        row = self.rows([ticker])[0]
+        if row < 0:
+            return None
+        entry = {name: values[row].item() for name, values in self.columns().items()}
+        entry["ticker"] = entry["ticker"].decode()
+        return entry
+
+    def params(self, ticker, watermark=None):
+        """
+        Returns the (drift, volatility) the forecast engine takes, or None
+        if the ticker is absent, unfitted, or its snapshot predates
+        `watermark` (the date of the newest bar the caller has).
+        """
+        row = self.rows([ticker])[0]
+        if row < 0:
+            return None
+        columns = self.columns()
+        if watermark is not None and columns["watermark"][row] < np.datetime64(watermark, "D"):
+            return None
+        drift, volatility = float(columns["drift"][row]), float(columns["volatility"][row])
+        if np.isnan(drift) or np.isnan(volatility):
+            return None
+        return drift, volatility
+
+    # --- Writing -------------------------------------------------------------
+
+    def update(self, records):
+        """
+        Merges records (see make_records) into the registry: rows for
+        tickers already present are replaced, new tickers are added. The
+        merged snapshot replaces the file atomically.
+        """
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)  # One writer at a time; readers never block
+            current = self.columns()
+            keep = ~np.isin(current["ticker"], records["ticker"])
+            merged = {name: np.concatenate((current[name][keep], np.asarray(records[name], dtype=dtype)))
+                      for name, dtype in COLUMNS}
+            order = np.argsort(merged["ticker"], kind="stable")
+            self._write({name: values[order] for name, values in merged.items()})
+        finally:
+            os.close(fd)
+
+    def _write(self, columns):
+        count = len(columns["ticker"])
+        header = np.array([(MAGIC, FORMAT_VERSION, MODEL_VERSION, count, np.datetime64(datetime.now(), "s"))],
+                          dtype=HEADER_DTYPE)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as handle:
+            handle.write(header.tobytes())
+            for name, dtype in COLUMNS:
+                handle.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, self.path)
+
+
+@lru_cache(maxsize=None)
+def open_registry(path):
+    """Returns the process-wide ModelRegistry for `path` (one mapping per process)."""
+    return ModelRegistry(path)
+
+
+def build_registry(path, tickers, store=None, chunk_size=1024, seed=None):
+    """
+    Fits `tickers` in vectorized chunks and writes them into the registry
+    at `path`. Histories come from `store`, or from mock data (seeded per
+    ticker as in batch.py) when no store is given. Returns the number of
+    tickers written.
+    """
+    from batch import ticker_rng
+    from feature import HISTORY_DAYS, data_version, load_history
+    from fitting import fit_matrix, stack_histories
+
+    registry = open_registry(path)
+    seed = np.random.SeedSequence(seed).entropy
+    tickers, written = list(tickers), 0
+    for start in range(0, len(tickers), chunk_size):
+        chunk = tickers[start:start + chunk_size]
+        histories = [load_history(ticker, HISTORY_DAYS, store, ticker_rng(ticker, seed)) for ticker in chunk]
+        fit = fit_matrix(stack_histories([prices for _, prices in histories], HISTORY_DAYS))
+        watermarks = [data_version(ticker, store) for ticker in chunk]
+        registry.update(make_records(chunk, fit, watermarks))
+        written += len(chunk)
+    return written
+
+
+def main(argv=None):
+    from cli import read_tickers
+
+    parser = argparse.ArgumentParser(description="Build or inspect a persisted model registry.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Fit tickers and write them to a registry file.")
+    build.add_argument("tickers", nargs="*", help="Ticker symbols ('-' reads them from stdin).")
+    build.add_argument("-f", "--file", help="File with one ticker per line ('-' for stdin).")
+    build.add_argument("--data-dir", default=None, help="History store directory (default: mock history).")
+    build.add_argument("--output", required=True, help="Registry file to create or update.")
+    build.add_argument("--seed", type=int, default=None, help="Base seed for mock histories.")
+    show = commands.add_parser("show", help="Print registry entries.")
+    show.add_argument("path", help="Registry file.")
+    show.add_argument("tickers", nargs="*", help="Tickers to show (default: a summary).")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not args.tickers and args.file is None:
+            args.tickers = ["-"]
+        store = None
+        if args.data_dir is not None:
+            from history_store import open_store
+            store = open_store(args.data_dir)
+        count = build_registry(args.output, read_tickers(args.tickers, args.file), store, seed=args.seed)
+        print(f"Wrote {count} models to {args.output}.", file=sys.stderr)
+        return 0
+
+    registry = open_registry(args.path)
+    if not args.tickers:
+        print(f"{args.path}: {len(registry)} models (model version {MODEL_VERSION})")
+        return 0
+    for ticker in args.tickers:
+        entry = registry.get(ticker)
+        print(f"{ticker.upper()}: {'not found' if entry is None else entry}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# =================================================================
+# INCREMENTAL MODEL STATE
+# Persistent per-ticker state for the trend/volatility model, kept as
+# running sums over a rolling window of log prices:
+#   - trend:      n, sum t, sum t^2, sum y, sum y^2, sum t*y  (OLS of y on t)
+#   - volatility: m, sum r, sum r^2                           (log returns r)
+# Adding a bar or dropping the oldest one touches each sum once, so a
+# refresh is O(1) per ticker and vectorized across the whole universe.
+# ingest.py keeps a saved state current as bars land, recomputes the
+# sums from the ring buffers before each save (rebuild) so rounding
+# error never carries over between runs, and publishes its estimates to
+# the model registry (model_registry.py), which is where the server
+# reads them from.
+# =================================================================
+
+import numpy as np
+
+from feature import HISTORY_DAYS
+from model_registry import make_records
+
+DEFAULT_WINDOW = HISTORY_DAYS  # The fit's window, so published estimates match fitting.fit_matrix
+
+SUM_FIELDS = ("n", "sum_t", "sum_tt", "sum_y", "sum_yy", "sum_ty", "m", "sum_r", "sum_rr")
+
+
+class RollingModelState:
+    """
+    Rolling-window model state for a universe of tickers.
+
+    Each ticker keeps a ring buffer of its last `window` log prices (needed
+    to know what leaves the window), the running sums in SUM_FIELDS and the
+    date of the last bar pushed with one (its watermark). The time index t
+    of a bar is its position in the ticker's own bar sequence.
+    """
+
+    def __init__(self, tickers, window=DEFAULT_WINDOW):
+        if window < 2:
+            raise ValueError("window must hold at least two bars.")
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.window = window
+        size = len(self.tickers)
+        self.buffer = np.full((size, window), np.nan)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.sums = {field: np.zeros(size) for field in SUM_FIELDS}
+        self.watermark = np.full(size, np.datetime64("NaT"), dtype="datetime64[D]")
+
+    # --- Updates -------------------------------------------------------------
+
+    def push(self, prices, dates=None):
+        """
+        Adds one bar per ticker. `prices` is an array aligned with
+        self.tickers; NaN entries (no new bar for that ticker) are skipped.
+        Tickers whose window is full drop their oldest bar at the same time.
+        `dates` (aligned the same way, or one date for all) become the
+        watermarks of the tickers that got a bar.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        rows = np.flatnonzero(~np.isnan(prices))
+        if rows.size == 0:
+            return
+        window = self.window
+        c = self.count[rows]
+        y_new = np.log(prices[rows])
+
+        # 1. Drop the oldest bar (and the oldest return) where the window is full
+        full = rows[c >= window]
+        if full.size:
+            t_old = self.count[full] - window
+            y_old = self.buffer[full, t_old % window]
+            r_old = self.buffer[full, (t_old + 1) % window] - y_old
+            self._add(full, -1.0, t_old, y_old)
+            self._add_return(full, -1.0, r_old)
+
+        # 2. Add the new bar and the return into it
+        has_prev = rows[c > 0]
+        if has_prev.size:
+            prev = self.buffer[has_prev, (self.count[has_prev] - 1) % window]
+            self._add_return(has_prev, 1.0, np.log(prices[has_prev]) - prev)
+        self._add(rows, 1.0, c, y_new)
+
+        self.buffer[rows, c % window] = y_new
+        self.count[rows] += 1
+        if dates is not None:
+            self.watermark[rows] = np.broadcast_to(np.asarray(dates, dtype="datetime64[D]"), prices.shape)[rows]
+
+    def extend(self, updates):
+        """
+        Adds several bars per ticker: `updates` maps a ticker to the
+        (dates, closes) of its new bars, oldest first. Unknown tickers are
+        added. Bars are pushed one column at a time across every ticker, so
+        a universe-wide end-of-day refresh is a handful of vectorized pushes.
+        """
+        self.add_tickers(updates)
+        longest = max((len(closes) for _, closes in updates.values()), default=0)
+        prices = np.full((len(self.tickers), longest), np.nan)
+        dates = np.full((len(self.tickers), longest), np.datetime64("NaT"), dtype="datetime64[D]")
+        for ticker, (bar_dates, closes) in updates.items():
+            row = self.index[ticker]
+            prices[row, :len(closes)] = closes
+            dates[row, :len(closes)] = bar_dates
+        for column in range(longest):
+            self.push(prices[:, column], dates[:, column])
+
+    def add_tickers(self, tickers):
+        """Adds empty rows for the tickers not tracked yet."""
+        new = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.index]
+        if not new:
+            return
+        self.index.update({ticker: len(self.tickers) + i for i, ticker in enumerate(new)})
+        self.tickers.extend(new)
+        self.buffer = np.concatenate((self.buffer, np.full((len(new), self.window), np.nan)))
+        self.count = np.concatenate((self.count, np.zeros(len(new), dtype=np.int64)))
+        self.sums = {field: np.concatenate((values, np.zeros(len(new)))) for field, values in self.sums.items()}
+        self.watermark = np.concatenate((self.watermark, np.full(len(new), np.datetime64("NaT"), "datetime64[D]")))
+
+    def discard(self, tickers):
+        """Forgets every bar of `tickers`, e.g. before refilling them from a rewritten history."""
+        rows = [self.index[ticker] for ticker in tickers if ticker in self.index]
+        self.buffer[rows] = np.nan
+        self.count[rows] = 0
+        for values in self.sums.values():
+            values[rows] = 0.0
+        self.watermark[rows] = np.datetime64("NaT")
+
+    def _add(self, rows, sign, t, y):
+        t = t.astype(np.float64)
+        s = self.sums
+        s["n"][rows] += sign
+        s["sum_t"][rows] += sign * t
+        s["sum_tt"][rows] += sign * t * t
+        s["sum_y"][rows] += sign * y
+        s["sum_yy"][rows] += sign * y * y
+        s["sum_ty"][rows] += sign * t * y
+
+    def _add_return(self, rows, sign, r):
+        s = self.sums
+        s["m"][rows] += sign
+        s["sum_r"][rows] += sign * r
+        s["sum_rr"][rows] += sign * r * r
+
+    @classmethod
+    def from_price_matrix(cls, tickers, prices, window=DEFAULT_WINDOW):
+        """
+        Builds state from a tickers x days price matrix (oldest day first).
+        NaN marks days a ticker has no bar, so uneven histories are allowed.
+        """
+        state = cls(tickers, window)
+        for column in np.asarray(prices, dtype=np.float64).T:
+            state.push(column)
+        return state
+
+    # --- Estimates -----------------------------------------------------------
+
+    def estimates(self):
+        """
+        Returns per-ticker model estimates as arrays aligned with self.tickers:
+        'drift' and 'volatility' (mean and sample std of daily log returns),
+        'slope' and 'intercept' (OLS trend of log price on t) and
+        'latest_price', plus 'n_obs' (bars in the window). Tickers with too
+        few bars get NaN.
+        """
+        s = self.sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = s["m"]
+            drift = s["sum_r"] / m
+            variance = (s["sum_rr"] - m * drift * drift) / (m - 1)
+            n = s["n"]
+            sxx = n * s["sum_tt"] - s["sum_t"] ** 2
+            slope = (n * s["sum_ty"] - s["sum_t"] * s["sum_y"]) / sxx
+            intercept = (s["sum_y"] - slope * s["sum_t"]) / n
+        last = self.buffer[np.arange(len(self.tickers)), (self.count - 1) % self.window]
+        return {
+            "n_obs": n.astype(np.int64),
+            "drift": np.where(m > 0, drift, np.nan),
+            "volatility": np.where(m > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan),
+            "slope": np.where(n > 1, slope, np.nan),
+            "intercept": np.where(n > 0, intercept, np.nan),
+            "latest_price": np.where(self.count > 0, np.exp(last), np.nan),
+        }
+
+    def publish(self, registry, tickers=None):
+        """
+        Writes the estimates of `tickers` (default: all with a watermark) to
+        a ModelRegistry, stamped with their watermarks, so the server's
+        warm-start lookups use them.
+        """
+        if tickers is None:
+            tickers = [ticker for ticker, date in zip(self.tickers, self.watermark) if not np.isnat(date)]
+        rows = [self.index[ticker] for ticker in tickers]
+        if rows:
+            fit = {name: values[rows] for name, values in self.estimates().items()}
+            registry.update(make_records(tickers, fit, self.watermark[rows]))
+
+    # --- Persistence ---------------------------------------------------------
+
+    def save(self, file):
+        """Writes the state to an .npz archive."""
+        np.savez(file, tickers=np.array(self.tickers, dtype=np.str_), window=self.window,
+                 buffer=self.buffer, count=self.count, watermark=self.watermark, **self.sums)
+
+    @classmethod
+    def load(cls, file):
+        """Reads a state written by save()."""
+        with np.load(file) as archive:
+            state = cls(archive["tickers"].tolist(), int(archive["window"]))
+            state.buffer = archive["buffer"]
+            state.count = archive["count"]
+            state.watermark = archive["watermark"]
+            state.sums = {field: archive[field] for field in SUM_FIELDS}
+        return state
+
+    def rebuild(self):
+        """
+        Recomputes the running sums from the ring buffers, discarding any
+        floating-point drift accumulated over many add/drop updates.
+        """
+        size = len(self.tickers)
+        held = np.minimum(self.count, self.window)
+        base = self.count - held
+        k = np.arange(self.window)
+
+        # Reorder each ring buffer oldest-first; column k is bar number base + k
+        t = base[:, None] + k
+        valid = k < held[:, None]
+        y = np.where(valid, self.buffer[np.arange(size)[:, None], t % self.window], np.nan)
+        r = np.diff(y, axis=1)
+        t = np.where(valid, t, 0).astype(np.float64)
+        y0 = np.nan_to_num(y)
+        r0 = np.nan_to_num(r)
+
+        self.sums = {
+            "n": valid.sum(axis=1).astype(np.float64),
+            "sum_t": t.sum(axis=1),
+            "sum_tt": (t * t).sum(axis=1),
+            "sum_y": y0.sum(axis=1),
+            "sum_yy": (y0 * y0).sum(axis=1),
+            "sum_ty": (t * y0).sum(axis=1),
+            "m": (~np.isnan(r)).sum(axis=1).astype(np.float64),
+            "sum_r": r0.sum(axis=1),
+            "sum_rr": (r0 * r0).sum(axis=1),
+        }
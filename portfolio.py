@@ -0,0 +1,257 @@
+# =================================================================
+# CORRELATED PORTFOLIO FORECAST
+# Forecasts a weighted basket of tickers jointly instead of one ticker
+# at a time with independent noise:
+#   1. aligns the tickers' histories on common dates and estimates the
+#      daily log-return means and a Ledoit-Wolf shrinkage covariance
+#   2. simulates correlated Gaussian return paths through its Cholesky
+#      factor, in fixed-size chunks of paths
+#   3. folds every chunk into streaming histograms (simulation.py) for
+#      per-asset and portfolio-value quantiles, and reports Value at Risk
+# Memory is bounded by the chunk size and the histograms, whatever the
+# number of paths:
+#
+#     python portfolio.py GOOG:0.4 AAPL:0.35 MSFT:0.25 --days 30 --paths 100000
+# =================================================================
+
+import argparse
+import json
+import sys
+from functools import reduce
+
+import numpy as np
+
+from feature import HISTORY_DAYS, forecast_date_index, load_history
+from simulation import DEFAULT_QUANTILES, QuantileHistogram
+from trading_calendar import format_dates
+
+DEFAULT_VAR_LEVELS = (0.95, 0.99)
+DEFAULT_CHUNK_ELEMENTS = 1 << 22   # Simulated values per chunk (paths x days x assets), ~32 MiB
+ASSET_BINS = 512                   # Histogram bins per asset and day
+PORTFOLIO_BINS = 4096
+SUPPORT_SIGMAS = 8.0               # Asset histogram half-width in standard deviations
+MIN_COMMON_DAYS = 3
+
+
+def align_histories(histories):
+    """
+    Aligns (dates, prices) histories on the dates all of them share.
+
+    Returns:
+        (dates, prices): the common dates and a days x assets price matrix.
+    """
+    common = reduce(np.intersect1d, [np.asarray(dates) for dates, _ in histories])
+    if len(common) < MIN_COMMON_DAYS:
+        raise ValueError(f"The histories share only {len(common)} dates; at least {MIN_COMMON_DAYS} are needed.")
+    columns = [np.asarray(prices, dtype=np.float64)[np.searchsorted(dates, common)] for dates, prices in histories]
+    return common, np.column_stack(columns)
+
+
+def shrinkage_covariance(returns, shrinkage=None):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled
+    identity (mean variance on the diagonal).
+
+    Args:
+        returns: days x assets matrix of returns.
+        shrinkage: Fixed intensity in [0, 1]; None estimates the optimal
+            intensity from the data (Ledoit & Wolf, 2004).
+
+    Returns:
+        (covariance, shrinkage)
+    """
+    observations, assets = returns.shape
+    centred = returns - returns.mean(axis=0)
+    sample = centred.T @ centred / observations
+    scale = np.trace(sample) / assets
+    target = scale * np.eye(assets)
+
+    if shrinkage is None:
+        distance = ((sample - target) ** 2).sum()
+        # sum_t ||x_t x_t' - S||^2 = sum_t ||x_t||^4 - T ||S||^2, without forming T outer products
+        norms = (centred * centred).sum(axis=1)
+        spread = ((norms * norms).sum() - observations * (sample * sample).sum()) / observations ** 2
+        shrinkage = 1.0 if distance == 0 else float(np.clip(spread / distance, 0.0, 1.0))
+    return shrinkage * target + (1.0 - shrinkage) * sample, shrinkage
+
+
+def _cholesky(covariance):
+    """Cholesky factor, adding a tiny diagonal jitter if round-off broke definiteness."""
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        jitter = 1e-10 * max(np.trace(covariance) / len(covariance), 1e-300)
+        return np.linalg.cholesky(covariance + jitter * np.eye(len(covariance)))
+
+
+def portfolio_support(centre, half_width, shares):
+    """
+    Bounds of the portfolio value when every asset's log price lies within
+    centre -/+ half_width (days x assets arrays): each holding contributes
+    its smallest and largest value, whichever end of the range that is for
+    a short position.
+
+    Returns:
+        (low, high) per day.
+    """
+    ends = np.stack((np.exp(centre - half_width), np.exp(centre + half_width))) * shares
+    return ends.min(axis=0).sum(axis=1), ends.max(axis=0).sum(axis=1)
+
+
+def iter_correlated_log_prices(log_start, mean, factor, horizon, n_paths, chunk_size, rng):
+    """
+    Yields chunk x horizon x assets arrays of simulated log prices until
+    n_paths paths are drawn. Daily log returns are mean + factor @ z with
+    z standard normal, so their covariance is factor @ factor.T.
+    """
+    remaining = n_paths
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        shocks = rng.standard_normal((size, horizon, len(mean))) @ factor.T
+        shocks += mean
+        yield log_start + np.cumsum(shocks, axis=1)
+        remaining -= size
+
+
+def forecast_portfolio(tickers, weights, prediction_days, n_paths=10_000, quantiles=DEFAULT_QUANTILES,
+                       var_levels=DEFAULT_VAR_LEVELS, initial_value=1.0, chunk_size=None, rng=None,
+                       store=None, shrinkage=None, history_days=HISTORY_DAYS):
+    """
+    Jointly forecasts a weighted portfolio of tickers by correlated Monte Carlo.
+
+    Args:
+        tickers: Ticker symbols.
+        weights: Fraction of initial_value held in each ticker at the start
+            (negative for short positions); held as fixed share counts.
+        prediction_days: Trading days to forecast.
+        n_paths: Number of simulated joint paths.
+        quantiles: Quantile levels reported for every asset and the portfolio.
+        var_levels: Confidence levels of the reported Value at Risk.
+        initial_value: Portfolio value at the latest close.
+        chunk_size: Paths per chunk (default: about DEFAULT_CHUNK_ELEMENTS
+            simulated values per chunk).
+        rng: Optional numpy.random.Generator.
+        store: Optional HistoryStore for the histories (mock data otherwise).
+        shrinkage: Fixed covariance shrinkage intensity (default: Ledoit-Wolf).
+        history_days: Length of the estimation window.
+
+    Returns:
+        A dictionary with 'tickers', 'weights', 'dates' (forecast dates),
+        'latest_prices', 'mean' and 'covariance' (daily log returns),
+        'shrinkage', 'quantile_levels', 'asset_quantiles' (levels x days x
+        assets prices), 'portfolio_quantiles' (levels x days values) and
+        'var' ({level: per-day loss not exceeded with that probability}).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    tickers = list(tickers)
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(tickers) != len(weights):
+        raise ValueError("Every ticker needs exactly one weight.")
+
+    # 1. Aligned histories -> return moments and a well-conditioned covariance
+    _, prices = align_histories([load_history(ticker, history_days, store, rng) for ticker in tickers])
+    returns = np.diff(np.log(prices), axis=0)
+    mean = returns.mean(axis=0)
+    covariance, shrinkage = shrinkage_covariance(returns, shrinkage)
+    factor = _cholesky(covariance)
+
+    latest = prices[-1]
+    shares = initial_value * weights / latest
+    horizon, assets = int(prediction_days), len(tickers)
+    chunk_size = chunk_size or max(1, DEFAULT_CHUNK_ELEMENTS // (horizon * assets))
+
+    # 2. Histogram supports: Gaussian log prices are bounded in practice by a
+    #    few standard deviations, and so is the portfolio value they imply
+    steps = np.arange(1, horizon + 1)[:, None]
+    centre = np.log(latest) + steps * mean
+    half_width = SUPPORT_SIGMAS * np.sqrt(steps * np.diag(covariance))
+    asset_histogram = QuantileHistogram.from_support((centre - half_width).ravel(), (centre + half_width).ravel(),
+                                                     ASSET_BINS)
+    portfolio_histogram = QuantileHistogram.from_support(*portfolio_support(centre, half_width, shares),
+                                                         PORTFOLIO_BINS, log_scale=False)
+
+    # 3. Simulate chunk by chunk; only the histograms outlive a chunk
+    for log_prices in iter_correlated_log_prices(np.log(latest), mean, factor, horizon, n_paths, chunk_size, rng):
+        asset_histogram.add(np.exp(log_prices.reshape(len(log_prices), -1)))
+        portfolio_histogram.add(np.exp(log_prices) @ shares)
+
+    levels = tuple(quantiles)
+    var_levels = tuple(var_levels)
+    portfolio = portfolio_histogram.quantiles(levels + tuple(1 - level for level in var_levels))
+    return {
+        "tickers": tickers,
+        "weights": weights,
+        "initial_value": float(initial_value),
+        "n_paths": int(n_paths),
+        "dates": forecast_date_index(horizon),
+        "latest_prices": latest,
+        "mean": mean,
+        "covariance": covariance,
+        "shrinkage": shrinkage,
+        "quantile_levels": levels,
+        "asset_quantiles": asset_histogram.quantiles(levels).reshape(len(levels), horizon, assets),
+        "portfolio_quantiles": portfolio[:len(levels)],
+        "var": {level: initial_value - portfolio[len(levels) + i] for i, level in enumerate(var_levels)},
+    }
+
+
+def portfolio_json(result):
+    """Converts a forecast_portfolio result to JSON-ready lists, prices rounded to cents."""
+    levels = [str(level) for level in result["quantile_levels"]]
+    return {
+        "tickers": result["tickers"],
+        "weights": result["weights"].tolist(),
+        "initial_value": result["initial_value"],
+        "n_paths": result["n_paths"],
+        "shrinkage": round(result["shrinkage"], 6),
+        "dates": format_dates(result["dates"]),
+        "portfolio": {level: np.round(values, 2).tolist()
+                      for level, values in zip(levels, result["portfolio_quantiles"])},
+        "value_at_risk": {str(level): np.round(values, 2).tolist() for level, values in result["var"].items()},
+        "assets": {
+            ticker: {
+                "latest_price": round(float(result["latest_prices"][i]), 2),
+                "quantiles": {level: np.round(values[:, i], 2).tolist()
+                              for level, values in zip(levels, result["asset_quantiles"])},
+            }
+            for i, ticker in enumerate(result["tickers"])
+        },
+    }
+
+
+def parse_holding(text):
+    """Parses 'TICKER:WEIGHT'; the weight is None when omitted."""
+    ticker, _, weight = text.partition(":")
+    return ticker.strip().upper(), float(weight) if weight else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast a portfolio with correlated Monte Carlo paths.")
+    parser.add_argument("holdings", nargs="+",
+                        help="TICKER:WEIGHT pairs; tickers without a weight share the rest equally.")
+    parser.add_argument("-d", "--days", type=int, default=30, help="Trading days to forecast.")
+    parser.add_argument("--paths", type=int, default=10_000, help="Simulated joint paths.")
+    parser.add_argument("--value", type=float, default=1_000_000.0, help="Portfolio value at the latest close.")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Paths simulated per chunk.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output.")
+    parser.add_argument("--data-dir", default=None, help="History store directory (default: mock history).")
+    args = parser.parse_args(argv)
+
+    holdings = [parse_holding(text) for text in args.holdings]
+    tickers = [ticker for ticker, _ in holdings]
+    unweighted = sum(weight is None for _, weight in holdings)
+    rest = (1.0 - sum(weight for _, weight in holdings if weight is not None)) / max(unweighted, 1)
+    weights = [rest if weight is None else weight for _, weight in holdings]
+    store = None
+    if args.data_dir is not None:
+        from history_store import open_store
+        store = open_store(args.data_dir)
+
+    result = forecast_portfolio(tickers, weights, args.days, n_paths=args.paths, initial_value=args.value,
+                                chunk_size=args.chunk_size, rng=np.random.default_rng(args.seed), store=store)
+    print(json.dumps(portfolio_json(result), indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# =================================================================
+# COLUMNAR PREDICTION RESULTS
+# Struct-of-arrays form of the prediction output: dates as datetime64
+# and prices/bounds as float64 columns. Serializes to compact binary
+# (.npz) and compact JSON, and converts back to the list-of-dicts shape
+# returned by train_and_predict_stock_price for existing consumers.
+# Histories may carry technical-indicator columns (indicators.py), which
+# are only serialized on request.
+# =================================================================
+
+import json
+
+import numpy as np
+
+from indicators import COLUMNS as INDICATOR_COLUMNS, DECIMALS as INDICATOR_DECIMALS
+
+PREDICTED_COLUMNS = ("price", "lower_bound", "upper_bound")
+
+
+def columnar_result(ticker, latest_price, historical_dates, historical_prices, predicted_dates, forecast):
+    """
+    Builds a columnar result.
+
+    Args:
+        ticker: The stock ticker symbol.
+        latest_price: Last known closing price.
+        historical_dates: datetime64 array of history dates ([D] for daily
+            bars, [m] for intraday bars).
+        historical_prices: float array of closing prices.
+        predicted_dates: datetime64 array of forecast dates.
+        forecast: Dictionary with 'price', 'lower_bound' and 'upper_bound'
+            arrays (as returned by feature.forecast_arrays).
+
+    Returns:
+        {'ticker', 'latest_price', 'historical': {'date', 'price'},
+         'predicted': {'date', 'price', 'lower_bound', 'upper_bound'}}
+    """
+    predicted = {"date": np.asarray(predicted_dates, dtype="datetime64")}
+    predicted.update({key: np.asarray(forecast[key], dtype=np.float64) for key in PREDICTED_COLUMNS})
+    return {
+        "ticker": ticker,
+        "latest_price": float(latest_price),
+        "historical": {
+            "date": np.asarray(historical_dates, dtype="datetime64"),
+            "price": np.asarray(historical_prices, dtype=np.float64),
+        },
+        "predicted": predicted,
+    }
+
+
+def _date_strings(dates):
+    # The array's own unit: 'YYYY-MM-DD' for daily bars, 'YYYY-MM-DDTHH:MM' for intraday
+    return np.datetime_as_string(dates).tolist()
+
+
+def _rounded(values):
+    return np.round(values, 2).tolist()
+
+
+def _nullable(values, decimals):
+    # NaN (an indicator whose window has not filled yet) is not valid JSON
+    return [None if value != value else value for value in np.round(values, decimals).tolist()]
+
+
+def _indicator_lists(historical):
+    return {name: _nullable(historical[name], INDICATOR_DECIMALS[name]) for name in INDICATOR_COLUMNS}
+
+
+def historical_records(historical, indicators=False):
+    """
+    Converts historical columns to a list of {'date', 'price'} dicts, plus
+    every indicator column (indicators.COLUMNS) with indicators=True.
+    """
+    dates, prices = _date_strings(historical["date"]), _rounded(historical["price"])
+    if not indicators:
+        return [{"date": date, "price": price} for date, price in zip(dates, prices)]
+    names = ("date", "price") + INDICATOR_COLUMNS
+    return [dict(zip(names, row)) for row in zip(dates, prices, *_indicator_lists(historical).values())]
+
+
+def predicted_records(predicted):
+    """Converts predicted columns to a list of {'date', 'price', 'lower_bound', 'upper_bound'} dicts."""
+    columns = [_rounded(predicted[key]) for key in PREDICTED_COLUMNS]
+    return [
+        {"date": date, "price": price, "lower_bound": lower, "upper_bound": upper}
+        for date, price, lower, upper in zip(_date_strings(predicted["date"]), *columns)
+    ]
+
+
+def to_records(result, indicators=False):
+    """
+    Converts a columnar result to the list-of-dicts shape produced by
+    train_and_predict_stock_price (with indicators=True, including the
+    history's indicator columns).
+    """
+    return {
+        "ticker": result["ticker"],
+        "latest_price": result["latest_price"],
+        "historical_data": historical_records(result["historical"], indicators),
+        "predicted_data": predicted_records(result["predicted"]),
+    }
+
+
+def to_compact_json(result, indicators=False):
+    """
+    Serializes a columnar result as compact JSON: one array per column,
+    ISO dates, prices rounded to cents and no whitespace. indicators=True
+    adds the history's indicator columns (null before a window fills).
+    """
+    payload = {
+        "ticker": result["ticker"],
+        "latest_price": result["latest_price"],
+        "historical": {
+            "date": _date_strings(result["historical"]["date"]),
+            "price": _rounded(result["historical"]["price"]),
+        },
+        "predicted": {"date": _date_strings(result["predicted"]["date"])},
+    }
+    if indicators:
+        payload["historical"].update(_indicator_lists(result["historical"]))
+    payload["predicted"].update({key: _rounded(result["predicted"][key]) for key in PREDICTED_COLUMNS})
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def from_compact_json(text):
+    """Parses the output of to_compact_json back into a columnar result."""
+    payload = json.loads(text)
+    result = columnar_result(
+        payload["ticker"],
+        payload["latest_price"],
+        payload["historical"]["date"],
+        payload["historical"]["price"],
+        payload["predicted"]["date"],
+        payload["predicted"],
+    )
+    result["historical"].update({name: np.array(payload["historical"][name], dtype=np.float64)
+                                 for name in INDICATOR_COLUMNS if name in payload["historical"]})
+    return result
+
+
+def save_npz(results, file):
+    """
+    Writes a batch of columnar results to one .npz archive.
+
+    Columns of every ticker are concatenated; per-ticker row offsets are
+    stored alongside so the batch can be split back without any parsing.
+    Dates are stored as int64 counts with each ticker's datetime64 dtype,
+    so daily ([D]) and intraday ([m]) results can share one archive
+    without being promoted to a common unit. Extra columns, such as
+    technical indicators, are saved with their section; every result must
+    then carry the same ones.
+
+    Raises:
+        ValueError: If the results do not all have the same columns.
+    """
+    results = list(results)
+    arrays = {
+        "ticker": np.array([result["ticker"] for result in results], dtype=np.str_),
+        "latest_price": np.array([result["latest_price"] for result in results], dtype=np.float64),
+    }
+    for section in ("historical", "predicted"):
+        columns = list(results[0][section]) if results else ["date"]
+        for result in results:
+            if sorted(result[section]) != sorted(columns):
+                raise ValueError(f"Results in one archive need the same {section} columns: "
+                                 f"{result['ticker']} has {sorted(result[section])}, expected {sorted(columns)}.")
+        lengths = [len(result[section]["date"]) for result in results]
+        arrays[f"{section}_columns"] = np.array(columns, dtype=np.str_)
+        arrays[f"{section}_offsets"] = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        dates = [np.asarray(result[section]["date"], dtype="datetime64") for result in results]
+        arrays[f"{section}_date_dtype"] = np.array([values.dtype.str for values in dates], dtype=np.str_)
+        arrays[f"{section}_date"] = np.concatenate([values.view(np.int64) for values in dates] or [[]]).astype(np.int64)
+        for column in columns:
+            if column != "date":
+                arrays[f"{section}_{column}"] = np.concatenate([result[section][column] for result in results])
+    np.savez_compressed(file, **arrays)
+
+
+def load_npz(file):
+    """Reads a batch written by save_npz; returns a list of columnar results."""
+    with np.load(file) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+
+    def section(name, index):
+        start, stop = arrays[f"{name}_offsets"][index:index + 2]
+        values = {column: arrays[f"{name}_{column}"][start:stop] for column in arrays[f"{name}_columns"].tolist()}
+        values["date"] = values["date"].view(arrays[f"{name}_date_dtype"][index])
+        return values
+
+    return [
+        {
+            "ticker": str(ticker),
+            "latest_price": float(arrays["latest_price"][i]),
+            "historical": section("historical", i),
+            "predicted": section("predicted", i),
+        }
+        for i, ticker in enumerate(arrays["ticker"])
+    ]
@@ -0,0 +1,252 @@
+# =================================================================
+# BACKGROUND FORECAST PRECOMPUTATION
+# Keeps the serving cache (cache.py) warm for a hot set of forecasts,
+# so interactive requests are answered from precomputed results and
+# only cold tickers are modelled on the request path:
+#   - the hot set is a configured watchlist x horizon (x variant) set,
+#     plus the most requested forecasts (decayed request counts)
+#   - every cycle queues the hot-set forecasts that are missing, were
+#     computed from older data, or expire before the next cycle, most
+#     popular first, and works through them on the server's process
+#     pool with bounded concurrency, leaving room for interactive misses
+#   - cycles run every `interval` seconds, when trigger() is called,
+#     as soon as the data version of a hot-set forecast changes (polled
+#     every `poll_interval` seconds, so bars appended by ingest.py in
+#     another process are picked up), and before a daily deadline such
+#     as market open, starting early enough for the whole hot set to be
+#     ready by then (from the measured time per forecast)
+# =================================================================
+
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from feature import RANDOM_WALK
+from trading_calendar import DEFAULT_CALENDAR, DEFAULT_RESOLUTION, bars_per_session, get_calendar
+
+DEFAULT_INTERVAL = 900.0         # Seconds between refresh cycles
+DEFAULT_POLL = 30.0              # Seconds between data version checks
+DEFAULT_HALF_LIFE = 3600.0       # Seconds for a request's popularity weight to halve
+DEFAULT_TOP_POPULAR = 20         # Most requested forecasts warmed beyond the watchlist
+MAX_TRACKED = 10_000             # Popularity keys kept (the least popular half is pruned)
+DEADLINE_SAFETY = 2.0            # Start pre-deadline cycles this many estimated durations early
+DEADLINE_MARGIN = 60.0           # ... plus this many seconds
+
+# A forecast variant: (paths, resolution, model); the watchlist default is the UI's request
+DEFAULT_VARIANT = (0, DEFAULT_RESOLUTION, RANDOM_WALK)
+
+metrics.describe("stock_precompute_jobs_total", "counter", "Background forecasts by outcome.")
+metrics.describe("stock_precompute_deadline_misses_total", "counter",
+                 "Pre-deadline cycles that finished after the deadline.")
+
+
+class Popularity:
+    """
+    Request counts with exponential decay, keyed by (ticker, paths,
+    resolution, model). A request adds 1; older requests weigh
+    0.5 ** (age / half_life).
+    """
+
+    def __init__(self, half_life=DEFAULT_HALF_LIFE, max_keys=MAX_TRACKED, clock=time.monotonic):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.clock = clock
+        self.scores = {}  # key -> (score, time of last update)
+
+    def _decayed(self, entry, now):
+        score, stamp = entry
+        return score * 0.5 ** ((now - stamp) / self.half_life)
+
+    def record(self, key, weight=1.0):
+        now = self.clock()
+        entry = self.scores.get(key)
+        self.scores[key] = ((0.0 if entry is None else self._decayed(entry, now)) + weight, now)
+        if len(self.scores) > self.max_keys:
+            keep = self.top(self.max_keys // 2)
+            self.scores = {key: self.scores[key] for key, _ in keep}
+
+    def score(self, key):
+        entry = self.scores.get(key)
+        return 0.0 if entry is None else self._decayed(entry, self.clock())
+
+    def top(self, count):
+        """Returns the `count` most popular (key, score) pairs, most popular first."""
+        now = self.clock()
+        return heapq.nlargest(count, ((key, self._decayed(entry, now)) for key, entry in self.scores.items()),
+                              key=lambda item: item[1])
+
+
+def parse_deadline(text):
+    """Parses a daily 'HH:MM' deadline (server local time) into a datetime.time."""
+    return datetime.strptime(text, "%H:%M").time()
+
+
+def next_deadline(deadline, now=None, calendar=DEFAULT_CALENDAR):
+    """The next datetime at `deadline` o'clock on a trading session after `now`."""
+    now = now or datetime.now()
+    day = now.date() if now.time() < deadline else now.date() + timedelta(days=1)
+    sessions = get_calendar(calendar)
+    while not sessions.is_session([day])[0]:
+        day += timedelta(days=1)
+    return datetime.combine(day, deadline)
+
+
+class PrecomputeScheduler:
+    """
+    Warms a PredictionService's cache in the background (see the module
+    comment). Start it with `asyncio.ensure_future(scheduler.run())`.
+
+    Args:
+        service: The server.PredictionService whose cache and pool are used.
+        watchlist: Tickers to keep warm.
+        horizons: Trading days to precompute per ticker; only the longest
+            matters, since shorter horizons are served from its prefix.
+        variants: (paths, resolution, model) combinations per ticker.
+        concurrency: Forecasts computed at once (keep it below the pool size
+            so interactive misses do not queue behind background work).
+        interval: Seconds between cycles.
+        deadline: Optional daily 'HH:MM' by which the hot set must be ready.
+        top_popular: Most requested forecasts warmed beyond the watchlist.
+        poll_interval: Seconds between checks of the hot set's data versions.
+    """
+
+    def __init__(self, service, watchlist, horizons=(), variants=(DEFAULT_VARIANT,), concurrency=1,
+                 interval=DEFAULT_INTERVAL, deadline=None, top_popular=DEFAULT_TOP_POPULAR,
+                 poll_interval=DEFAULT_POLL):
+        self.service = service
+        self.watchlist = list(dict.fromkeys(ticker.upper() for ticker in watchlist))
+        self.horizon = max((*horizons, service.cache_horizon))
+        self.variants = list(variants)
+        self.concurrency = max(1, concurrency)
+        self.interval = interval
+        self.deadline = None if deadline is None else parse_deadline(deadline)
+        self.top_popular = top_popular
+        self.poll_interval = poll_interval
+        self.versions = {}       # (ticker, resolution) -> data version when the last cycle started
+        self.job_seconds = 1.0   # Moving average of one forecast's wall time
+        self.pending = 0
+        self.last_cycle = {}
+        self._wake = asyncio.Event()
+
+    def register_metrics(self):
+        metrics.register_gauge("stock_precompute_pending", "Background forecasts queued in the current cycle.",
+                               lambda: self.pending)
+        metrics.register_gauge("stock_precompute_hot_set", "Forecasts in the precomputed hot set.",
+                               lambda: len(self.hot_set()))
+
+    def trigger(self):
+        """Starts a cycle now (call after new data has been loaded)."""
+        self._wake.set()
+
+    def data_versions(self):
+        """Returns the current data version of every hot-set (ticker, resolution)."""
+        keys = dict.fromkeys((ticker, resolution) for _, _, (ticker, _, resolution, _) in self.hot_set())
+        return {key: self.service.version_for(*key) for key in keys}
+
+    def data_changed(self):
+        """True if new data arrived for a hot-set ticker since the last cycle started."""
+        return any(self.versions.get(key, version) != version for key, version in self.data_versions().items())
+
+    def hot_set(self):
+        """Returns the hot set as (priority, order, key) tuples; key = (ticker, paths, resolution, model)."""
+        popularity = self.service.popularity
+        keys = [(ticker, *variant) for ticker in self.watchlist for variant in self.variants]
+        keys += [key for key, _ in popularity.top(self.top_popular)]
+        keys = list(dict.fromkeys(keys))
+        return [(-popularity.score(key), order, key) for order, key in enumerate(keys)]
+
+    def _due(self, key, horizon_seconds):
+        """True if the key's forecast is missing, stale or expires within horizon_seconds."""
+        ticker, paths, resolution, model = key
+        version = self.service.version_for(ticker, resolution)
+        remaining = self.service.cache.expires_in(ticker, self.horizon * bars_per_session(resolution), version,
+                                                  {"n_paths": paths, "resolution": resolution, "model": model})
+        return remaining is None or remaining < horizon_seconds
+
+    async def run_cycle(self, fresh_for=None):
+        """
+        Computes every due forecast of the hot set, most popular first.
+
+        Args:
+            fresh_for: Seconds the cached forecasts must stay valid for
+                (default: until the next cycle).
+
+        Returns:
+            Counts of 'computed', 'failed' and 'fresh' (skipped) forecasts
+            and the cycle's 'seconds'.
+        """
+        started = time.monotonic()
+        fresh_for = self.interval if fresh_for is None else fresh_for
+        self.versions = self.data_versions()
+        hot_set = self.hot_set()
+        queue = [entry for entry in hot_set if self._due(entry[2], fresh_for)]
+        heapq.heapify(queue)
+        counts = {"computed": 0, "failed": 0, "fresh": len(hot_set) - len(queue)}
+        metrics.increment("stock_precompute_jobs_total", counts["fresh"], outcome="fresh")
+        self.pending = len(queue)
+
+        async def worker():
+            while queue:
+                _, _, (ticker, paths, resolution, model) = heapq.heappop(queue)
+                job_started = time.monotonic()
+                try:
+                    await self.service.warm(ticker, self.horizon, paths, resolution, model)
+                except Exception:
+                    outcome = "failed"  # The request path retries it on demand
+                else:
+                    outcome = "computed"
+                    self.job_seconds += 0.2 * (time.monotonic() - job_started - self.job_seconds)
+                counts[outcome] += 1
+                self.pending -= 1
+                metrics.increment("stock_precompute_jobs_total", outcome=outcome)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        counts["seconds"] = round(time.monotonic() - started, 3)
+        self.last_cycle = counts
+        return counts
+
+    def estimated_cycle_seconds(self):
+        """Worst-case duration of a cycle that has to compute the whole hot set."""
+        return len(self.hot_set()) * self.job_seconds / self.concurrency
+
+    def _seconds_to_deadline_start(self, now=None):
+        """Seconds until the next pre-deadline cycle must start (None without a deadline)."""
+        if self.deadline is None:
+            return None
+        now = now or datetime.now()
+        lead = self.estimated_cycle_seconds() * DEADLINE_SAFETY + DEADLINE_MARGIN
+        start = next_deadline(self.deadline, now) - timedelta(seconds=lead)
+        return max((start - now).total_seconds(), 0.0)
+
+    async def run(self):
+        """Runs cycles until cancelled."""
+        while True:
+            self._wake.clear()  # A trigger() during the cycle starts another one right after it
+            until_deadline = self._seconds_to_deadline_start()
+            if until_deadline == 0.0:
+                # Pre-deadline cycle: everything must still be valid an interval after the deadline
+                deadline = next_deadline(self.deadline)
+                await self.run_cycle(fresh_for=(deadline - datetime.now()).total_seconds() + self.interval)
+                if datetime.now() > deadline:
+                    metrics.increment("stock_precompute_deadline_misses_total")
+                # Wait past the deadline so this day's start time is not hit again
+                await self._sleep((deadline - datetime.now()).total_seconds() + 1.0)
+                continue
+            await self.run_cycle()
+            await self._sleep(self.interval if until_deadline is None else min(self.interval, until_deadline))
+
+    async def _sleep(self, seconds):
+        """
+        Sleeps up to `seconds`, returning early when trigger() is called or
+        when data_changed() (checked every poll_interval seconds).
+        """
+        end = time.monotonic() + max(seconds, 0.0)
+        while time.monotonic() < end:
+            try:
+                await asyncio.wait_for(self._wake.wait(), min(end - time.monotonic(), self.poll_interval))
+                return
+            except asyncio.TimeoutError:
+                if self.data_changed():
+                    return
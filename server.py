@@ -0,0 +1,496 @@
+# =================================================================
+# PREDICTION HTTP SERVICE (ASYNCIO)
+# Serves the feature.py model over HTTP for the UI.py front-end:
+#
+#     GET /predict?ticker=GOOG&days=14[&paths=10000][&resolution=1m][&points=800][&model=arima][&indicators=1]
+#     GET /predict/stream?ticker=GOOG&days=14[&paths=10000][&format=sse]
+#     GET /health
+#     GET /metrics        (Prometheus text: stage latencies, cache, queues)
+#
+# 'resolution' selects daily (1d, default) or intraday bars; 'points' is
+# the chart's pixel budget: each series is downsampled server-side with
+# LTTB (downsample.py) so large intraday payloads stay small. 'model'
+# picks the random walk (default) or ARIMA(5,1,0) (arima.py).
+# 'indicators=1' adds technical indicators to every history point
+# (indicators.py); they are computed on the first request for them and
+# then kept with the cached forecast.
+# Forecasts are served from an LRU/TTL cache when possible (cache.py),
+# which --watchlist keeps warm in the background (scheduler.py).
+# On a miss the CPU-bound model run is offloaded to a process pool,
+# identical concurrent misses share one computation, and every request
+# has a timeout. /predict/stream gets its forecast the same way and
+# sends it block by block as streaming.py events, in chunked NDJSON or
+# Server-Sent Events. Uses only the standard library (plus the model's
+# NumPy).
+#
+#     python server.py --port 8000
+# =================================================================
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, ForecastCache, forecast_prefix
+from downsample import MIN_POINTS, downsample_result
+from feature import MODELS, RANDOM_WALK, data_version, predict_ticker
+from history_store import TICKER_PATTERN, open_store
+from indicators import COLUMNS as INDICATOR_COLUMNS, indicator_columns
+from model_registry import open_registry
+from results import to_records
+from scheduler import DEFAULT_INTERVAL, Popularity, PrecomputeScheduler, parse_deadline
+from streaming import iter_result_events
+from trading_calendar import DEFAULT_RESOLUTION, RESOLUTIONS, bars_per_session
+
+MAX_PREDICTION_DAYS = 365
+MAX_PATHS = 1_000_000
+MAX_SIMULATED_VALUES = 100_000_000  # Monte Carlo paths x forecast bars a single request may ask for
+MAX_CHUNK_ELEMENTS = 1 << 22        # Simulated values per Monte Carlo chunk in a worker (~32 MiB per array)
+MAX_POINTS = 100_000
+DEFAULT_TIMEOUT = 10.0
+CACHE_HORIZON = 30  # The UI caps horizons at 30 days; compute that much on a miss
+MAX_HEADER_BYTES = 16 * 1024
+ENDPOINTS = ("/health", "/metrics", "/predict", "/predict/stream")
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+metrics.describe("stock_requests_total", "counter", "HTTP requests by endpoint and status.")
+metrics.describe("stock_request_seconds", "histogram", "HTTP request latency by endpoint.")
+metrics.describe("stock_model_runs_total", "counter", "Model runs (cache misses) by resolution, model and mode.")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error", 504: "Gateway Timeout"}
+
+
+class RequestError(Exception):
+    """A client error that maps directly onto an HTTP status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_predict_query(query):
+    """
+    Validates the /predict query string.
+
+    Returns:
+        (ticker, days, paths, resolution, points, model, indicators), where
+        points is the downsampling budget (0 keeps every point) and
+        indicators whether the history carries technical indicators.
+    """
+    params = parse_qs(query)
+    ticker = params.get("ticker", [""])[0].strip().upper()
+    if not ticker:
+        raise RequestError(400, "Missing 'ticker' parameter.")
+    if TICKER_PATTERN.fullmatch(ticker) is None:
+        raise RequestError(400, f"Invalid ticker {ticker!r}.")
+    try:
+        days = int(params.get("days", ["14"])[0])
+        paths = int(params.get("paths", ["0"])[0])
+        points = int(params.get("points", ["0"])[0])
+    except ValueError:
+        raise RequestError(400, "'days', 'paths' and 'points' must be integers.")
+    resolution = params.get("resolution", [DEFAULT_RESOLUTION])[0]
+    model = params.get("model", [RANDOM_WALK])[0]
+    indicators = params.get("indicators", ["0"])[0]
+    if not 1 <= days <= MAX_PREDICTION_DAYS:
+        raise RequestError(400, f"'days' must be between 1 and {MAX_PREDICTION_DAYS}.")
+    if not 0 <= paths <= MAX_PATHS:
+        raise RequestError(400, f"'paths' must be between 0 and {MAX_PATHS}.")
+    if resolution not in RESOLUTIONS:
+        raise RequestError(400, f"'resolution' must be one of {', '.join(RESOLUTIONS)}.")
+    # Misses compute at least CACHE_HORIZON days, so that is what the paths are simulated over
+    if paths * max(days, CACHE_HORIZON) * bars_per_session(resolution) > MAX_SIMULATED_VALUES:
+        raise RequestError(400, f"'paths' x forecast bars must not exceed {MAX_SIMULATED_VALUES:,}; "
+                                f"request fewer paths, days or a coarser resolution.")
+    if model not in MODELS:
+        raise RequestError(400, f"'model' must be one of {', '.join(MODELS)}.")
+    if model != RANDOM_WALK and paths:
+        raise RequestError(400, f"'paths' does not apply to model '{model}'.")
+    if points and not MIN_POINTS <= points <= MAX_POINTS:
+        raise RequestError(400, f"'points' must be 0 or between {MIN_POINTS} and {MAX_POINTS}.")
+    if indicators not in ("0", "1"):
+        raise RequestError(400, "'indicators' must be 0 or 1.")
+    return ticker, days, paths, resolution, points, model, indicators == "1"
+
+
+def _run_prediction(ticker, days, paths, store, resolution=DEFAULT_RESOLUTION, instrument=False, registry=None,
+                    model=RANDOM_WALK):
+    """
+    Executor entry point; returns (columnar result, stage samples). With
+    instrument set, the worker records its stage timings and sends them
+    back for the parent's /metrics (see metrics.capture). With a model
+    registry, an up-to-date snapshot of a random-walk ticker's parameters
+    skips the fit. Indicators are left to _with_indicators, so requests
+    without them never pay for them.
+    """
+    params = None
+    if bars_per_session(resolution) != 1:
+        store = None  # The store holds daily bars; intraday runs use mock history
+    elif registry is not None and model == RANDOM_WALK:
+        params = registry.params(ticker, data_version(ticker, store))
+    metrics.enable(instrument)
+    with metrics.capture() as samples:
+        result = predict_ticker(ticker, days, n_paths=paths, chunk_size=_chunk_size(days, resolution), columnar=True,
+                                store=store, resolution=resolution, params=params, model=model)
+    return result, samples
+
+
+def _chunk_size(days, resolution):
+    """Monte Carlo paths per chunk that keep a run within MAX_CHUNK_ELEMENTS simulated values."""
+    return max(1, MAX_CHUNK_ELEMENTS // (days * bars_per_session(resolution)))
+
+
+def _with_indicators(result):
+    """
+    Adds the history's technical indicators to a cached forecast, once: the
+    columns go into its historical dictionary, which the cache entry and
+    every prefix of it share.
+    """
+    historical = result["historical"]
+    if INDICATOR_COLUMNS[0] not in historical:
+        with metrics.stage("features"):
+            historical.update(indicator_columns(historical["price"]))
+    return result
+
+
+def _encode(result, indicators=False):
+    with metrics.stage("serialize"):
+        return json.dumps(to_records(result, indicators), separators=(",", ":")).encode()
+
+
+class PredictionService:
+    """
+    Answers predictions from the forecast cache, running misses off the
+    event loop. Misses are coalesced: while a computation for a given key
+    is in flight, new requests for it await that computation instead of
+    starting another one.
+    """
+
+    def __init__(self, executor, timeout=DEFAULT_TIMEOUT, cache=None, cache_horizon=CACHE_HORIZON,
+                 store=None, registry=None):
+        self.executor = executor
+        self.store = store
+        self.registry = registry
+        self.timeout = timeout
+        self.cache = ForecastCache() if cache is None else cache
+        self.cache_horizon = cache_horizon
+        self.in_flight = {}
+        self.active_streams = 0
+        self.popularity = Popularity()
+
+    def register_metrics(self):
+        """Exposes cache and queue state on /metrics: totals as counters, the rest as gauges."""
+        metrics.register_gauge("stock_cache_hit_ratio", "Forecast cache hits / lookups.",
+                               lambda: self.cache.stats()["hit_ratio"])
+        metrics.register_counter("stock_cache_lookups_total", "Forecast cache lookups by outcome.",
+                                 lambda: {(("outcome", outcome),): self.cache.stats()[outcome]
+                                          for outcome in ("hits", "prefix_hits", "misses")})
+        metrics.register_gauge("stock_cache_entries", "Forecasts held in the cache.",
+                               lambda: self.cache.stats()["entries"])
+        metrics.register_counter("stock_cache_evictions_total", "Forecasts evicted from the cache.",
+                                 lambda: self.cache.stats()["evictions"])
+        metrics.register_gauge("stock_computations_in_flight",
+                               "Coalesced model runs queued or running in the process pool.",
+                               lambda: len(self.in_flight))
+        metrics.register_gauge("stock_active_streams", "Open /predict/stream responses.",
+                               lambda: self.active_streams)
+
+    def _store_for(self, resolution):
+        return self.store if bars_per_session(resolution) == 1 else None
+
+    def version_for(self, ticker, resolution=DEFAULT_RESOLUTION):
+        """The data version a forecast of `ticker` at `resolution` is cached under."""
+        return data_version(ticker, self._store_for(resolution))
+
+    async def predict(self, ticker, days, paths, resolution=DEFAULT_RESOLUTION, points=0, model=RANDOM_WALK,
+                      indicators=False):
+        """Returns the JSON body for a prediction (see forecast)."""
+        result = await self.forecast(ticker, days, paths, resolution, points, model, indicators)
+        return _encode(result, indicators)
+
+    async def stream(self, ticker, days, paths, resolution=DEFAULT_RESOLUTION, points=0, model=RANDOM_WALK,
+                     indicators=False):
+        """
+        Returns an iterator of prediction events (streaming.iter_result_events)
+        for the forecast predict() would send. Misses are computed, coalesced
+        and cached exactly like predict() misses, so streamed and plain
+        requests share one cache entry.
+        """
+        result = await self.forecast(ticker, days, paths, resolution, points, model, indicators)
+        return iter_result_events(result, days, paths, indicators=indicators)
+
+    async def forecast(self, ticker, days, paths, resolution=DEFAULT_RESOLUTION, points=0, model=RANDOM_WALK,
+                       indicators=False):
+        """
+        Returns the columnar forecast for a request. The cache holds full
+        resolution forecasts; downsampling to `points` is decided per
+        request, and indicators are added to the entry the first time a
+        request asks for them. Misses run on the process pool.
+        """
+        self.popularity.record((ticker, paths, resolution, model))
+        version = self.version_for(ticker, resolution)
+        params = {"n_paths": paths, "resolution": resolution, "model": model}
+        bars = days * bars_per_session(resolution)
+        result = self.cache.get(ticker, bars, version, params)
+        if result is None:
+            computed = await self._compute(ticker, days, paths, version, params, resolution, model)
+            result = forecast_prefix(computed, bars)
+        if indicators:
+            result = _with_indicators(result)
+        return downsample_result(result, points)
+
+    async def warm(self, ticker, days, paths=0, resolution=DEFAULT_RESOLUTION, model=RANDOM_WALK):
+        """
+        Computes a forecast into the cache without a request timeout (used by
+        the background scheduler). Shares in-flight computations like misses do.
+        """
+        params = {"n_paths": paths, "resolution": resolution, "model": model}
+        await self._task(ticker, days, paths, self.version_for(ticker, resolution), params, resolution, model)
+
+    async def _compute(self, ticker, days, paths, version, params, resolution=DEFAULT_RESOLUTION,
+                       model=RANDOM_WALK):
+        task = self._task(ticker, days, paths, version, params, resolution, model)
+        # shield() keeps one caller's timeout from cancelling the shared task
+        return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+
+    def _task(self, ticker, days, paths, version, params, resolution, model):
+        """Returns the shared task computing (and then caching) this forecast."""
+        horizon = max(days, self.cache_horizon)
+        key = (ticker, version, paths, resolution, model, horizon)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(ticker, horizon, paths, resolution, model))
+            self.in_flight[key] = task
+
+            def finished(done):
+                self.in_flight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self.cache.put(ticker, version, done.result(), params)
+
+            task.add_done_callback(finished)
+        return task
+
+    async def _run(self, ticker, horizon, paths, resolution, model):
+        metrics.increment("stock_model_runs_total", resolution=resolution, mode="pool", model=model)
+        loop = asyncio.get_running_loop()
+        result, samples = await loop.run_in_executor(
+            self.executor, _run_prediction, ticker, horizon, paths, self.store, resolution, metrics.enabled(),
+            self.registry, model
+        )
+        metrics.record_samples(samples)
+        return result
+
+
+async def _read_request(reader):
+    """Reads the request head; returns (method, target)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    if len(head) > MAX_HEADER_BYTES:
+        raise RequestError(400, "Request header too large.")
+    request_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+    parts = request_line.split()
+    if len(parts) != 3:
+        raise RequestError(400, "Malformed request line.")
+    return parts[0], parts[1]
+
+
+def _response(status, body, content_type="application/json"):
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+def _error(status, message):
+    return _response(status, json.dumps({"error": message}).encode())
+
+
+def _format_event(event, sse):
+    with metrics.stage("serialize"):
+        data = json.dumps(event, separators=(",", ":"))
+    if sse:
+        return f"event: {event['event']}\ndata: {data}\n\n".encode()
+    return (data + "\n").encode()
+
+
+async def stream_predictions(service, writer, query):
+    """
+    Streams prediction events with chunked transfer encoding. The query
+    is validated and the forecast computed (or found in the cache) before
+    any bytes are sent, so bad requests and model timeouts still get a
+    normal error response; failures after that end the stream with an
+    'error' event. The service timeout covers the whole request.
+    """
+    sse = parse_qs(query).get("format", ["ndjson"])[0] == "sse"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + service.timeout  # For the whole request, not per event
+    events = await service.stream(*parse_predict_query(query))
+    writer.write((
+        "HTTP/1.1 200 OK\r\n"
+        f"Content-Type: {'text/event-stream' if sse else 'application/x-ndjson'}\r\n"
+        "Transfer-Encoding: chunked\r\n"
+        "Cache-Control: no-cache\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode())
+
+    # Each event serializes a block of the forecast; run that on the default
+    # thread pool so the event loop keeps serving other clients
+    service.active_streams += 1
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(loop.run_in_executor(None, next, events, None),
+                                               max(deadline - loop.time(), 0.0))
+            except asyncio.TimeoutError:
+                event = {"event": "error", "error": "Prediction timed out."}
+            except Exception as error:
+                event = {"event": "error", "error": f"Prediction failed: {error}"}
+            if event is None:
+                break
+            chunk = _format_event(event, sse)
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            await writer.drain()
+            if event["event"] == "error":
+                break
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    finally:
+        service.active_streams -= 1
+
+
+async def handle_connection(service, reader, writer):
+    """Serves a single request per connection."""
+    endpoint, status = "unknown", 200
+    started = time.perf_counter()
+    try:
+        try:
+            method, target = await _read_request(reader)
+            if method != "GET":
+                raise RequestError(405, "Only GET is supported.")
+            url = urlsplit(target)
+            endpoint = url.path if url.path in ENDPOINTS else "other"
+            if url.path == "/health":
+                response = _response(200, b'{"status":"ok"}')
+            elif url.path == "/metrics":
+                response = _response(200, metrics.render_prometheus().encode(), METRICS_CONTENT_TYPE)
+            elif url.path == "/predict":
+                body = await service.predict(*parse_predict_query(url.query))
+                response = _response(200, body)
+            elif url.path == "/predict/stream":
+                await stream_predictions(service, writer, url.query)
+                return
+            else:
+                raise RequestError(404, f"Unknown path '{url.path}'.")
+        except RequestError as error:
+            status = error.status
+            response = _error(error.status, str(error))
+        except asyncio.TimeoutError:
+            status = 504
+            response = _error(504, "Prediction timed out.")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            status = 499  # Client went away
+            return
+        except Exception as error:
+            status = 500
+            response = _error(500, f"Prediction failed: {error}")
+        writer.write(response)
+        await writer.drain()
+    finally:
+        writer.close()
+        metrics.increment("stock_requests_total", endpoint=endpoint, status=status)
+        metrics.observe("stock_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+
+
+async def serve(host="127.0.0.1", port=8000, workers=None, timeout=DEFAULT_TIMEOUT,
+                cache_size=DEFAULT_MAX_ENTRIES, cache_ttl=DEFAULT_TTL, data_dir=None, instrument=True,
+                registry_path=None, watchlist=(), horizons=(), precompute_interval=DEFAULT_INTERVAL,
+                deadline=None, precompute_workers=None):
+    """
+    Starts the service and runs until cancelled. With a watchlist, a
+    PrecomputeScheduler keeps its forecasts (for the given horizons) warm,
+    using up to precompute_workers pool workers (default: half the pool).
+    """
+    metrics.enable(instrument)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        cache = ForecastCache(max_entries=cache_size, ttl=cache_ttl)
+        store = None if data_dir is None else open_store(data_dir)
+        registry = None if registry_path is None else open_registry(registry_path)
+        service = PredictionService(executor, timeout=timeout, cache=cache, store=store, registry=registry)
+        service.register_metrics()
+        precompute = None
+        if watchlist:
+            concurrency = precompute_workers or max(1, (workers or os.cpu_count() or 1) // 2)
+            scheduler = PrecomputeScheduler(service, watchlist, horizons, concurrency=concurrency,
+                                            interval=precompute_interval, deadline=deadline)
+            scheduler.register_metrics()
+            precompute = asyncio.ensure_future(scheduler.run())
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_connection(service, reader, writer), host, port
+        )
+        print(f"Prediction service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if precompute is not None:
+                precompute.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve stock price predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="Model worker processes (default: all cores).")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-request timeout in seconds.")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES, help="Forecasts kept in the LRU cache.")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL, help="Seconds a cached forecast stays valid.")
+    parser.add_argument("--data-dir", default=None, help="History store directory (default: mock history).")
+    parser.add_argument("--no-metrics", dest="instrument", action="store_false",
+                        help="Disable stage timing and request metrics (/metrics then only shows gauges).")
+    parser.add_argument("--registry", default=None,
+                        help="Model registry file (model_registry.py) to warm-start fitted parameters from.")
+    parser.add_argument("--watchlist", default=None,
+                        help="File of tickers (one per line) whose forecasts are precomputed in the background.")
+    parser.add_argument("--horizons", default=str(CACHE_HORIZON),
+                        help="Comma-separated trading-day horizons to precompute (default: %(default)s).")
+    parser.add_argument("--precompute-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds between precomputation cycles.")
+    parser.add_argument("--market-open", default=None, metavar="HH:MM",
+                        help="Local time by which the watchlist must be precomputed each trading day.")
+    parser.add_argument("--precompute-workers", type=int, default=None,
+                        help="Pool workers background precomputation may use (default: half).")
+    args = parser.parse_args(argv)
+    watchlist = []
+    if args.watchlist is not None:
+        from cli import read_tickers
+        watchlist = list(read_tickers([], args.watchlist))
+        invalid = [ticker for ticker in watchlist if TICKER_PATTERN.fullmatch(ticker.upper()) is None]
+        if invalid:
+            parser.error(f"--watchlist has invalid tickers: {', '.join(invalid)}")
+    try:
+        horizons = [int(days) for days in args.horizons.split(",")]
+        if args.market_open is not None:
+            parse_deadline(args.market_open)
+    except ValueError:
+        parser.error("--horizons takes comma-separated integers and --market-open a HH:MM time")
+    if not all(1 <= days <= MAX_PREDICTION_DAYS for days in horizons):
+        parser.error(f"--horizons must be between 1 and {MAX_PREDICTION_DAYS}")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.timeout, args.cache_size, args.cache_ttl,
+                          args.data_dir, args.instrument, args.registry, watchlist, horizons,
+                          args.precompute_interval, args.market_open, args.precompute_workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
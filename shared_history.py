@@ -0,0 +1,226 @@
+# =================================================================
+# SHARED-MEMORY HISTORY FOR POOL WORKERS
+# Publishes a universe's training histories once, in one
+# multiprocessing.shared_memory segment, so pool workers read them as
+# zero-copy NumPy views instead of each task pickling its own copy:
+#
+#     dates        n_days date index (datetime64, common to all rows)
+#     tickers      n_tickers symbols (bytes, as wide as the longest one)
+#     rng_states   n_tickers x 6 uint64: every ticker's PCG64 state after
+#                  its history was loaded, so forecasts draw exactly what
+#                  batch.predict_many would
+#     prices       n_tickers x n_days float64, NaN where a ticker has no bar
+#
+# The parent owns the segment (SharedHistory: create, then unlink when
+# done); workers attach by name through a small picklable handle and
+# map the same physical pages, so memory stays flat as workers are
+# added and a task only needs a range of row indices.
+# =================================================================
+
+import atexit
+import sys
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+RNG_STATE_WORDS = 6  # PCG64 state and increment (2 x 128 bits), has_uint32, uinteger
+_MASK64 = (1 << 64) - 1
+
+
+class SharedHistoryHandle(NamedTuple):
+    """What a worker needs to attach: the segment name and the array shapes."""
+    name: str
+    n_tickers: int
+    n_days: int
+    date_dtype: str
+    ticker_dtype: str
+
+
+def _layout(handle):
+    """(name, dtype, shape, offset) of every array in the segment."""
+    arrays = (("dates", np.dtype(handle.date_dtype), (handle.n_days,)),
+              ("tickers", np.dtype(handle.ticker_dtype), (handle.n_tickers,)),
+              ("rng_states", np.dtype(np.uint64), (handle.n_tickers, RNG_STATE_WORDS)),
+              ("prices", np.dtype(np.float64), (handle.n_tickers, handle.n_days)))
+    layout, offset = [], 0
+    for name, dtype, shape in arrays:
+        layout.append((name, dtype, shape, offset))
+        offset += dtype.itemsize * int(np.prod(shape))
+    return layout, offset
+
+
+def _views(segment, handle, writable=False):
+    views = {}
+    for name, dtype, shape, offset in _layout(handle)[0]:
+        view = np.ndarray(shape, dtype=dtype, buffer=segment.buf, offset=offset)
+        view.flags.writeable = writable
+        views[name] = view
+    return views
+
+
+def pack_rng_state(rng):
+    """Encodes a PCG64 Generator's state as RNG_STATE_WORDS uint64 words."""
+    state = rng.bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError("Only PCG64 generators can be shared.")
+    words = []
+    for value in (state["state"]["state"], state["state"]["inc"]):
+        words += [value >> 64, value & _MASK64]
+    return words + [state["has_uint32"], state["uinteger"]]
+
+
+def unpack_rng(words):
+    """Rebuilds a Generator from pack_rng_state words."""
+    words = [int(word) for word in words]
+    bit_generator = np.random.PCG64()
+    bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": words[0] << 64 | words[1], "inc": words[2] << 64 | words[3]},
+        "has_uint32": words[4],
+        "uinteger": words[5],
+    }
+    return np.random.Generator(bit_generator)
+
+
+def stack_on_dates(histories):
+    """
+    Aligns (dates, prices) histories on the union of their dates.
+
+    Returns:
+        (dates, prices): the sorted date index and a histories x dates
+        float64 matrix with NaN where a history has no value.
+    """
+    dates = np.unique(np.concatenate([np.asarray(dates) for dates, _ in histories])) if histories else \
+        np.empty(0, dtype="datetime64[D]")
+    prices = np.full((len(histories), len(dates)), np.nan)
+    for row, (row_dates, row_prices) in zip(prices, histories):
+        row[np.searchsorted(dates, row_dates)] = row_prices
+    return dates, prices
+
+
+class SharedHistory:
+    """
+    Parent-side owner of a published universe. Use as a context manager
+    (or call close()); leaving it unlinks the segment, after which workers
+    that are still attached keep their mapping until they detach or exit.
+
+        with SharedHistory.publish(tickers, rngs, histories) as shared:
+            pool.submit(worker, shared.handle, start, stop)
+    """
+
+    def __init__(self, segment, handle):
+        self.segment = segment
+        self.handle = handle
+        self.arrays = _views(segment, handle)
+
+    @classmethod
+    def publish(cls, tickers, rngs, histories):
+        """
+        Copies the histories into a new segment.
+
+        Args:
+            tickers: Ticker symbols, one per history.
+            rngs: Each ticker's Generator, in the state its forecast should
+                start from.
+            histories: (dates, prices) arrays per ticker, oldest first.
+        """
+        dates, prices = stack_on_dates(histories)
+        encoded = np.array([ticker.encode() for ticker in tickers], dtype=np.bytes_)
+        handle = SharedHistoryHandle("", len(tickers), len(dates), dates.dtype.str, encoded.dtype.str)
+        segment = shared_memory.SharedMemory(create=True, size=max(_layout(handle)[1], 1))
+        handle = handle._replace(name=segment.name)
+        try:
+            arrays = _views(segment, handle, writable=True)
+            arrays["dates"][:] = dates
+            arrays["tickers"][:] = encoded
+            arrays["rng_states"][:] = [pack_rng_state(rng) for rng in rngs]
+            arrays["prices"][:] = prices
+            del arrays
+        except BaseException:
+            segment.close()
+            segment.unlink()
+            raise
+        return cls(segment, handle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """Unlinks the segment and releases this process's mapping."""
+        if self.segment is None:
+            return
+        self.arrays = None
+        self.segment.unlink()
+        try:
+            self.segment.close()
+        except BufferError:
+            pass  # A caller still holds a view; the mapping goes when it does
+        self.segment = None
+
+
+class AttachedHistory:
+    """A worker's read-only view of a published universe."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        if sys.version_info >= (3, 13):
+            self.segment = shared_memory.SharedMemory(handle.name, track=False)
+        else:
+            # Pool workers share the parent's resource tracker, so attaching
+            # does not hand them ownership of the segment
+            self.segment = shared_memory.SharedMemory(handle.name)
+        arrays = _views(self.segment, handle)
+        self.dates = arrays["dates"]
+        self.tickers = arrays["tickers"]
+        self.rng_states = arrays["rng_states"]
+        self.prices = arrays["prices"]
+
+    def history(self, row):
+        """Returns one ticker's (dates, prices), zero-copy unless it has gaps."""
+        prices = self.prices[row]
+        valid = ~np.isnan(prices)
+        first = int(valid.argmax()) if valid.any() else len(prices)
+        if valid[first:].all():
+            return self.dates[first:], prices[first:]
+        return self.dates[valid], prices[valid]
+
+    def ticker(self, row):
+        return self.tickers[row].decode()
+
+    def rng(self, row):
+        return unpack_rng(self.rng_states[row])
+
+    def close(self):
+        self.dates = self.tickers = self.rng_states = self.prices = None
+        try:
+            self.segment.close()
+        except BufferError:
+            pass
+
+
+_attached = {}  # Segment name -> AttachedHistory, per process
+
+
+def attach(handle):
+    """
+    Returns this process's AttachedHistory for `handle`, mapping the segment
+    on first use. Mappings of other (older) segments are released, so a
+    long-lived worker holds at most one universe.
+    """
+    attached = _attached.get(handle.name)
+    if attached is None:
+        detach_all()
+        attached = _attached[handle.name] = AttachedHistory(handle)
+    return attached
+
+
+@atexit.register
+def detach_all():
+    """Releases every mapping this process holds."""
+    while _attached:
+        _attached.popitem()[1].close()
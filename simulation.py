@@ -0,0 +1,201 @@
+# =================================================================
+# MONTE CARLO PATH SIMULATION
+# Draws many independent random-walk paths for the forecast model in
+# feature.py and summarizes them as empirical quantiles per day, so the
+# confidence bands are real statistical intervals instead of a fixed
+# percentage around a single path.
+# =================================================================
+
+import numpy as np
+
+from feature import PRICE_FLOOR, compound_prices, draw_log_returns, log_return_moments, log_return_support
+
+DEFAULT_QUANTILES = (0.025, 0.5, 0.975)
+DEFAULT_BINS = 4096
+MIN_BINS = 64
+MAX_HISTOGRAM_CELLS = 1 << 22  # horizon x n_bins int64 counts (~32 MiB) before bins are reduced
+SUPPORT_SIGMAS = 6.0           # Histogram half-width in standard deviations of the day's log price
+
+
+def simulate_paths(latest_price, horizon, n_paths, rng=None, params=None):
+    """
+    Simulates n_paths price paths in one draw.
+    params=(drift, volatility) simulates a learned model instead of the mock walk.
+
+    Returns:
+        A float64 array of shape (n_paths, horizon).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    return compound_prices(latest_price, draw_log_returns(rng, (n_paths, horizon), params))
+
+
+def _log_price_support(latest_price, horizon, params=None):
+    """
+    Returns per-day [low, high] bounds of the log price. Day i's log price is
+    a sum of i independent steps, so it lies within SUPPORT_SIGMAS standard
+    deviations (sigma * sqrt(i)) of its mean; the bins then stay a small
+    fraction of the spread at any horizon. Every step is also bounded
+    (uniform trend + uniform noise), so day i never lies beyond i extreme
+    steps of the start, nor below the price floor. A reflection off the
+    floor only raises a path, and stays within the same spread above it.
+    """
+    mean, sigma = log_return_moments(params)
+    lowest_step, highest_step = log_return_support(params)
+    steps = np.arange(1, horizon + 1)
+    spread = SUPPORT_SIGMAS * sigma * np.sqrt(steps)
+    log_start = np.log(latest_price)
+    log_floor = np.log(PRICE_FLOOR)
+
+    low = np.maximum(np.maximum(log_start + steps * mean - spread, log_start + steps * lowest_step), log_floor)
+    high = np.minimum(max(log_start, log_floor) + steps * max(mean, 0.0) + spread,
+                      max(log_start, log_floor) + steps * max(highest_step, 0.0))
+    return low, high
+
+
+def histogram_bins(horizon, n_bins=DEFAULT_BINS):
+    """
+    Returns the bins per day a horizon-long histogram can afford: n_bins,
+    reduced so horizon x bins stays within MAX_HISTOGRAM_CELLS, but never
+    below MIN_BINS. Long intraday horizons trade per-bar resolution for
+    bounded memory.
+    """
+    return int(max(MIN_BINS, min(n_bins, MAX_HISTOGRAM_CELLS // max(int(horizon), 1))))
+
+
+class QuantileHistogram:
+    """
+    Streaming per-day quantile estimator over a fixed log-price grid.
+
+    Chunks of simulated paths are folded into a horizon x n_bins histogram
+    (add), and quantiles can be read at any point (quantiles). Memory is
+    O(horizon * n_bins) regardless of how many paths are added; the error
+    is at most one bin width in log price, a fixed fraction of each day's
+    spread (see _log_price_support). Values outside the support are
+    counted in the edge bins. n_bins is capped by histogram_bins(horizon).
+    """
+
+    def __init__(self, latest_price, horizon, n_bins=DEFAULT_BINS, params=None):
+        low, high = _log_price_support(latest_price, horizon, params)
+        self._setup(low, high, histogram_bins(horizon, n_bins), log_scale=True)
+
+    @classmethod
+    def from_support(cls, low, high, n_bins=DEFAULT_BINS, log_scale=True):
+        """
+        Builds a histogram over explicit per-column bounds: low and high are
+        arrays with one entry per column of the paths passed to add(), in
+        log price (or in plain values when log_scale is False).
+        """
+        histogram = cls.__new__(cls)
+        histogram._setup(np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64), n_bins, log_scale)
+        return histogram
+
+    def _setup(self, low, high, n_bins, log_scale):
+        self.low = low
+        self.width = np.maximum((high - low) / n_bins, 1e-12)  # Degenerate (zero-volatility) support
+        self.n_bins = n_bins
+        self.log_scale = log_scale
+        self.day_offset = np.arange(len(low)) * n_bins
+        self.counts = np.zeros(len(low) * n_bins, dtype=np.int64)
+        self.total = 0
+
+    def add(self, paths):
+        """Folds an (n, horizon) array of simulated price paths into the histogram."""
+        values = np.log(paths) if self.log_scale else paths
+        bins = np.floor((values - self.low) / self.width).astype(np.int64)
+        np.clip(bins, 0, self.n_bins - 1, out=bins)
+        self.counts += np.bincount((bins + self.day_offset).ravel(), minlength=self.counts.size)
+        self.total += len(paths)
+
+    def quantiles(self, levels):
+        """Returns a len(levels) x horizon array of the current quantile estimates."""
+        counts = self.counts.reshape(-1, self.n_bins)
+        cumulative = np.cumsum(counts, axis=1)
+        rows = np.arange(len(counts))
+
+        results = []
+        for q in levels:
+            # Locate the bin holding the q-th sample and interpolate inside it
+            target = q * self.total
+            k = np.minimum((cumulative < target).sum(axis=1), self.n_bins - 1)
+            below = np.where(k > 0, cumulative[rows, k - 1], 0)
+            inside = np.maximum(counts[rows, k], 1)
+            fraction = np.clip((target - below) / inside, 0.0, 1.0)
+            value = self.low + (k + fraction) * self.width
+            results.append(np.exp(value) if self.log_scale else value)
+        return np.vstack(results)
+
+
+def iter_path_chunks(latest_price, horizon, n_paths, chunk_size, rng, params=None):
+    """Yields simulated path arrays of at most chunk_size rows until n_paths are drawn."""
+    remaining = n_paths
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield simulate_paths(latest_price, horizon, size, rng, params)
+        remaining -= size
+
+
+def _streaming_quantiles(latest_price, horizon, n_paths, quantiles, chunk_size, n_bins, rng, params):
+    """
+    Estimates quantiles by accumulating a QuantileHistogram one chunk of
+    paths at a time; memory is O(chunk_size * horizon + horizon * n_bins).
+    """
+    histogram = QuantileHistogram(latest_price, horizon, n_bins, params)
+    for paths in iter_path_chunks(latest_price, horizon, n_paths, chunk_size, rng, params):
+        histogram.add(paths)
+    return histogram.quantiles(quantiles)
+
+
+def monte_carlo_quantiles(latest_price, horizon, n_paths=10_000, quantiles=DEFAULT_QUANTILES,
+                          chunk_size=None, n_bins=DEFAULT_BINS, rng=None, params=None):
+    """
+    Simulates n_paths forecast paths and returns the chosen quantiles per day.
+
+    Args:
+        latest_price: Last known closing price the paths start from.
+        horizon: The number of days into the future to simulate.
+        n_paths: Number of Monte Carlo paths.
+        quantiles: Quantile levels in [0, 1] to report.
+        chunk_size: If set (and smaller than n_paths), paths are simulated in
+            chunks of this size and quantiles come from a streaming histogram
+            with n_bins bins per day, keeping memory bounded. Otherwise all
+            paths are held at once and quantiles are exact.
+        n_bins: Histogram resolution for the chunked mode; long horizons use
+            fewer bins (see histogram_bins).
+        rng: Optional numpy.random.Generator.
+        params: Optional learned (drift, volatility) of daily log returns.
+
+    Returns:
+        A dictionary with 'median' (array of length horizon) and 'quantiles'
+        (a dict mapping each quantile level to an array of length horizon).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    levels = tuple(quantiles)
+    wanted = levels + (0.5,)
+
+    if chunk_size is None or chunk_size >= n_paths:
+        paths = simulate_paths(latest_price, horizon, n_paths, rng, params)
+        values = np.quantile(paths, wanted, axis=0)
+    else:
+        values = _streaming_quantiles(latest_price, horizon, n_paths, wanted, chunk_size, n_bins, rng, params)
+
+    return {
+        "median": values[-1],
+        "quantiles": {q: values[i] for i, q in enumerate(levels)},
+    }
+
+
+def monte_carlo_forecast(latest_price, prediction_days, n_paths, confidence=0.95,
+                         chunk_size=None, rng=None, params=None):
+    """
+    Monte Carlo counterpart of feature.forecast_arrays: the price is the
+    per-day median and the bounds are the central `confidence` interval.
+    """
+    tail = (1 - confidence) / 2
+    summary = monte_carlo_quantiles(latest_price, prediction_days, n_paths,
+                                    quantiles=(tail, 1 - tail), chunk_size=chunk_size, rng=rng,
+                                    params=params)
+    return {
+        "price": summary["median"],
+        "lower_bound": summary["quantiles"][tail],
+        "upper_bound": summary["quantiles"][1 - tail],
+    }
@@ -0,0 +1,153 @@
+# =================================================================
+# STREAMING FORECASTS
+# Generator versions of the prediction pipeline. Instead of building the
+# whole predicted_data list first, they yield the history, then forecast
+# points block by block (single-path mode) or refined Monte Carlo
+# quantile snapshots (simulation mode) as soon as each is computed.
+# iter_result_events replays a finished (e.g. cached) forecast as the
+# same events; server.py sends that replay as chunked NDJSON or
+# Server-Sent Events, so streamed requests share the forecast cache.
+# =================================================================
+
+import numpy as np
+
+import metrics
+from arima import DEFAULT_ORDER, forecast_arima
+from downsample import downsample_columns
+from feature import ARIMA, DEFAULT_CALENDAR, RANDOM_WALK, forecast_arrays, forecast_date_index, train_model
+from indicators import indicator_columns
+from results import historical_records, predicted_records, to_records
+from simulation import QuantileHistogram, iter_path_chunks
+from trading_calendar import DEFAULT_RESOLUTION, bars_per_session
+
+DEFAULT_BLOCK_SIZE = 8  # Trading sessions per 'points' event
+DEFAULT_SNAPSHOTS = 8
+
+
+def iter_forecast_blocks(latest_price, prediction_days, block_size=DEFAULT_BLOCK_SIZE, rng=None,
+                         params=None, confidence=0.95):
+    """
+    Yields the single-path forecast in consecutive blocks of at most
+    block_size days (dictionaries shaped like feature.forecast_arrays).
+    Learned params centre every block on latest_price (the median and
+    bounds of the whole forecast); a mock block continues from the previous
+    block's last price. Either way the blocks together form one forecast.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    price, day = latest_price, 1
+    while day <= prediction_days:
+        count = min(block_size, prediction_days - day + 1)
+        block = forecast_arrays(price, count, rng=rng, params=params, confidence=confidence, first_day=day,
+                                origin_price=latest_price)
+        yield block
+        price, day = float(block["price"][-1]), day + count
+
+
+def iter_quantile_snapshots(latest_price, prediction_days, n_paths, chunk_size=None, rng=None,
+                            params=None, confidence=0.95):
+    """
+    Yields (paths_so_far, forecast) after every chunk of simulated paths,
+    where forecast holds the current median and central-interval bounds
+    for the whole horizon. Later snapshots refine earlier ones.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    chunk_size = chunk_size or max(n_paths // DEFAULT_SNAPSHOTS, 1)
+    tail = (1 - confidence) / 2
+    histogram = QuantileHistogram(latest_price, prediction_days, params=params)
+    for paths in iter_path_chunks(latest_price, prediction_days, n_paths, chunk_size, rng, params):
+        histogram.add(paths)
+        lower, upper, median = histogram.quantiles((tail, 1 - tail, 0.5))
+        yield histogram.total, {"price": median, "lower_bound": lower, "upper_bound": upper}
+
+
+def iter_result_events(result, prediction_days, n_paths=0, block_size=DEFAULT_BLOCK_SIZE, indicators=False):
+    """
+    Replays a finished columnar result (results.py) as the events of
+    iter_prediction_events: the history, then the forecast as one
+    'quantiles' snapshot (Monte Carlo results) or as 'points' events of
+    about block_size of the prediction_days sessions each, so a client
+    draws a stored forecast the same way as a live one.
+    """
+    records = to_records(result, indicators)
+    yield {"event": "history", "ticker": records["ticker"], "latest_price": records["latest_price"],
+           "historical_data": records["historical_data"]}
+    predicted = records["predicted_data"]
+    if n_paths:
+        yield {"event": "quantiles", "paths": n_paths, "n_paths": n_paths, "predicted_data": predicted}
+    else:
+        # Blocks split the (possibly downsampled) points in proportion to the sessions they cover
+        blocks = -(-prediction_days // block_size)
+        edges = np.linspace(0, len(predicted), blocks + 1).round().astype(int)
+        for start, stop in zip(edges[:-1], edges[1:]):
+            if stop > start:
+                yield {"event": "points", "predicted_data": predicted[start:stop]}
+    yield {"event": "done"}
+
+
+def _downsampled(columns, max_points):
+    return downsample_columns(columns, max_points) if max_points else columns
+
+
+def iter_prediction_events(ticker, prediction_days, rng=None, n_paths=0, confidence=0.95, chunk_size=None,
+                           store=None, block_size=DEFAULT_BLOCK_SIZE, calendar=DEFAULT_CALENDAR,
+                           resolution=DEFAULT_RESOLUTION, max_points=0, model=RANDOM_WALK, order=DEFAULT_ORDER,
+                           indicators=False):
+    """
+    Runs the pipeline for one ticker as a stream of JSON-ready events:
+
+        {"event": "history", "ticker", "latest_price", "historical_data"}
+        {"event": "points", "predicted_data": [...]}       # next block of days
+        {"event": "quantiles", "paths", "n_paths", "predicted_data": [...]}
+                                                           # whole-horizon snapshot
+        {"event": "done"}
+
+    Single-path runs emit 'points' events that append to each other;
+    Monte Carlo runs (n_paths > 0) emit 'quantiles' events that replace
+    the previous snapshot. block_size counts trading sessions, so at an
+    intraday resolution each block holds every bar of those sessions.
+    With max_points, the history and each snapshot are downsampled to that
+    many points (downsample.py) and every block to its share of the budget.
+    The ARIMA model's forecast is deterministic and analytic, so it is
+    computed at once and sent as the same sequence of blocks. With
+    indicators, the history carries the technical indicators of
+    indicators.py (computed before downsampling).
+    """
+    if model == ARIMA and n_paths:
+        raise ValueError("The ARIMA model has analytic bounds; Monte Carlo paths are not supported.")
+    rng = np.random.default_rng() if rng is None else rng
+    historical_dates, historical_prices, latest_price, params = train_model(
+        ticker, rng, store=store, resolution=resolution, model=model, order=order
+    )
+    history = {"date": historical_dates, "price": historical_prices}
+    if indicators:
+        with metrics.stage("features"):
+            history.update(indicator_columns(historical_prices))
+    yield {
+        "event": "history",
+        "ticker": ticker,
+        "latest_price": latest_price,
+        "historical_data": historical_records(_downsampled(history, max_points), indicators),
+    }
+
+    dates = forecast_date_index(prediction_days, calendar=calendar, resolution=resolution)
+    horizon = len(dates)
+    if n_paths:
+        for done, forecast in iter_quantile_snapshots(latest_price, horizon, n_paths, chunk_size,
+                                                      rng, params, confidence):
+            yield {"event": "quantiles", "paths": done, "n_paths": n_paths,
+                   "predicted_data": predicted_records(_downsampled(dict(forecast, date=dates), max_points))}
+    else:
+        bar, block_bars = 0, block_size * bars_per_session(resolution)
+        if model == ARIMA and params is not None:
+            forecast = forecast_arima(np.asarray(historical_prices)[None, :], params, horizon, confidence)
+            blocks = ({key: values[0, start:start + block_bars] for key, values in forecast.items()}
+                      for start in range(0, horizon, block_bars))
+        else:
+            blocks = iter_forecast_blocks(latest_price, horizon, block_bars, rng, params, confidence)
+        for block in blocks:
+            count = len(block["price"])
+            budget = max_points and max(-(-max_points * count // horizon), 2)
+            block = _downsampled(dict(block, date=dates[bar:bar + count]), budget)
+            yield {"event": "points", "predicted_data": predicted_records(block)}
+            bar += count
+    yield {"event": "done"}
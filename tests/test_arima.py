@@ -0,0 +1,52 @@
+import numpy as np
+
+from arima import autocovariances, fit_arima, forecast_arima, levinson_durbin, psi_weights
+
+
+def simulate_ar_prices(phi, n, seed, drift=0.0005, scale=0.01):
+    """Prices whose daily log returns follow a mean-`drift` AR(len(phi)) process."""
+    noise = np.random.default_rng(seed).normal(0.0, scale, n + 200)
+    returns = np.zeros_like(noise)
+    for t in range(len(phi), len(noise)):
+        returns[t] = np.dot(phi, returns[t - len(phi):t][::-1]) + noise[t]
+    return 100.0 * np.exp(np.cumsum(returns[200:] + drift))
+
+
+def test_levinson_durbin_solves_yule_walker():
+    series = np.random.default_rng(0).normal(size=(4, 300)).cumsum(axis=1) % 7.0
+    _, gamma, _ = autocovariances(series, 5)
+    phi, sigma2 = levinson_durbin(gamma, 5)
+    for row in range(len(gamma)):
+        toeplitz = gamma[row, np.abs(np.subtract.outer(np.arange(5), np.arange(5)))]
+        expected = np.linalg.solve(toeplitz, gamma[row, 1:])
+        np.testing.assert_allclose(phi[row], expected, rtol=1e-8, atol=1e-12)
+        np.testing.assert_allclose(sigma2[row], gamma[row, 0] - expected @ gamma[row, 1:], rtol=1e-8)
+
+
+def test_fit_recovers_an_ar2_process():
+    prices = simulate_ar_prices([0.5, -0.3], 20_000, seed=1)
+    fit = fit_arima(prices[None, :], (2, 1, 0))
+    np.testing.assert_allclose(fit["phi"][0], [0.5, -0.3], atol=0.03)
+    assert abs(fit["mean"][0] - 0.0005) < 0.0003
+    assert abs(np.sqrt(fit["sigma2"][0]) - 0.01) < 0.0005
+
+
+def test_leading_nan_rows_fit_like_their_valid_part():
+    prices = simulate_ar_prices([0.2], 300, seed=2)
+    matrix = np.vstack((prices, np.concatenate((np.full(100, np.nan), prices[100:]))))
+    fit = fit_arima(matrix, (3, 1, 0))
+    alone = fit_arima(prices[None, 100:], (3, 1, 0))
+    for name in ("phi", "mean", "sigma2"):
+        np.testing.assert_allclose(fit[name][1], alone[name][0], rtol=1e-10)
+
+
+def test_psi_weights_and_bounds():
+    np.testing.assert_allclose(psi_weights(np.array([[0.6]]), 0, 5)[0], 0.6 ** np.arange(5))
+    np.testing.assert_allclose(psi_weights(np.zeros((1, 1)), 1, 5)[0], np.ones(5))  # Random walk
+
+    prices = simulate_ar_prices([0.3], 500, seed=3)
+    fit = fit_arima(prices[None, :], (1, 1, 0))
+    forecast = forecast_arima(prices[None, :], fit, 20)
+    assert np.all(forecast["lower_bound"] < forecast["price"])
+    assert np.all(forecast["price"] < forecast["upper_bound"])
+    assert np.all(np.diff(forecast["upper_bound"] / forecast["lower_bound"]) > 0)  # Widening interval
@@ -0,0 +1,69 @@
+import numpy as np
+
+from cache import ForecastCache
+
+PARAMS = {"n_paths": 0, "resolution": "1d", "model": "random_walk"}
+
+
+def _result(days, start=100.0):
+    return {"ticker": "GOOG", "predicted": {"date": np.arange(days), "price": start + np.arange(days)}}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_shorter_horizons_are_prefix_hits():
+    cache = ForecastCache()
+    cache.put("GOOG", "2024-06-28", _result(30), PARAMS)
+    prefix = cache.get("GOOG", 14, "2024-06-28", PARAMS)
+    np.testing.assert_array_equal(prefix["predicted"]["price"], 100.0 + np.arange(14))
+    assert len(cache.get("GOOG", 30, "2024-06-28", PARAMS)["predicted"]["date"]) == 30
+    assert cache.get("GOOG", 31, "2024-06-28", PARAMS) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["prefix_hits"], stats["misses"]) == (2, 1, 1)
+
+
+def test_a_shorter_forecast_does_not_replace_a_longer_one():
+    cache = ForecastCache()
+    cache.put("GOOG", "v1", _result(30), PARAMS)
+    cache.put("GOOG", "v1", _result(14, start=0.0), PARAMS)
+    assert cache.get("GOOG", 30, "v1", PARAMS)["predicted"]["price"][0] == 100.0
+
+
+def test_new_data_versions_and_other_params_miss():
+    cache = ForecastCache()
+    cache.put("GOOG", "2024-06-28", _result(30), PARAMS)
+    assert cache.get("GOOG", 14, "2024-07-01", PARAMS) is None
+    assert cache.get("GOOG", 14, "2024-06-28", dict(PARAMS, n_paths=1000)) is None
+    assert cache.get("GOOG", 14, "2024-06-28", PARAMS) is not None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ForecastCache(max_entries=2)
+    cache.put("A", "v1", _result(5), PARAMS)
+    cache.put("B", "v1", _result(5), PARAMS)
+    cache.get("A", 5, "v1", PARAMS)  # B is now the least recently used
+    cache.put("C", "v1", _result(5), PARAMS)
+    assert cache.get("B", 5, "v1", PARAMS) is None
+    assert cache.get("A", 5, "v1", PARAMS) is not None
+    assert cache.get("C", 5, "v1", PARAMS) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_expire_after_the_ttl():
+    clock = _Clock()
+    cache = ForecastCache(ttl=60.0, clock=clock)
+    cache.put("GOOG", "v1", _result(30), PARAMS)
+    clock.now = 59.0
+    assert cache.expires_in("GOOG", 14, "v1", PARAMS) == 1.0
+    assert cache.get("GOOG", 14, "v1", PARAMS) is not None
+    clock.now = 60.0
+    assert cache.expires_in("GOOG", 14, "v1", PARAMS) is None
+    assert cache.get("GOOG", 14, "v1", PARAMS) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from cli import main
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["GOOG", "--horizon", "0"], "--horizon"),
+    (["GOOG", "--resolution", "2m"], "--resolution must be one of 1d, 30m, 15m, 5m, 1m"),
+    (["GOOG", "--model", "lstm"], "--model must be one of random_walk, arima"),
+])
+def test_invalid_arguments_are_rejected(capsys, argv, message):
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_parsing_does_not_import_numpy():
+    code = "import sys, cli; cli.build_parser().parse_args(['GOOG']); print('numpy' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_bad_tickers_are_reported_per_ticker(tmp_path, capsys):
+    (tmp_path / "CORRUPT.bars").write_bytes(b"not a history file")
+    status = main(["GOOG", "bad/x", "CORRUPT", "MSFT", "--data-dir", str(tmp_path), "--workers", "1",
+                   "--seed", "1", "--horizon", "3"])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert status == 1
+    errors = {line["ticker"]: line["error"] for line in lines if "error" in line}
+    assert errors.keys() == {"BAD/X", "CORRUPT"}
+    assert "Invalid ticker" in errors["BAD/X"]
+    assert sorted(line["ticker"] for line in lines if "error" not in line) == ["GOOG", "MSFT"]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from downsample import downsample_columns, lttb_indices
+
+
+def reference_lttb(y, n_out):
+    """Textbook LTTB (Steinarsson), one bucket and one point at a time."""
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected, anchor = [0], 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < n_out - 1:
+            following = range(edges[bucket + 1], edges[bucket + 2])
+            cx, cy = np.mean(list(following)), np.mean([y[i] for i in following])
+        else:
+            cx, cy = n - 1, y[-1]
+        areas = [abs((anchor - cx) * (y[i] - y[anchor]) - (anchor - i) * (cy - y[anchor])) for i in range(start, stop)]
+        anchor = start + int(np.argmax(areas))
+        selected.append(anchor)
+    return np.array(selected + [n - 1])
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 50), (997, 3), (5000, 800), (101, 100)])
+def test_lttb_matches_reference(n, n_out):
+    y = np.cumsum(np.random.default_rng(n).normal(size=n))
+    indices = lttb_indices(y, n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+    np.testing.assert_array_equal(indices, reference_lttb(y, n_out))
+
+
+def test_lttb_keeps_spikes_and_short_series():
+    y = np.zeros(1000)
+    y[377] = 50.0
+    assert 377 in lttb_indices(y, 20)
+    np.testing.assert_array_equal(lttb_indices(y[:10], 20), np.arange(10))
+
+
+def test_columns_stay_aligned():
+    columns = {"date": np.arange(500), "price": np.sin(np.arange(500) / 20.0), "upper_bound": np.arange(500) * 2.0}
+    reduced = downsample_columns(columns, 40)
+    assert all(len(values) == 40 for values in reduced.values())
+    np.testing.assert_array_equal(reduced["upper_bound"], reduced["date"] * 2.0)
+    np.testing.assert_array_equal(reduced["price"], columns["price"][reduced["date"]])
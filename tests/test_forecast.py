@@ -0,0 +1,87 @@
+import numpy as np
+
+from backtest import add_sums, backtest_prices, empty_sums, summarize
+from feature import PRICE_FLOOR, compound_prices, draw_log_returns, forecast_arrays, interval_bounds
+from streaming import iter_forecast_blocks
+
+PARAMS = (0.0003, 0.015)
+
+
+def _random_walks(count, days, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(PARAMS[0], PARAMS[1], (count, days)), axis=1))
+
+
+def test_interval_coverage_is_close_to_nominal():
+    horizon = 5
+    sums = empty_sums(horizon)
+    for prices in _random_walks(6, 1500):
+        add_sums(sums, backtest_prices(prices, horizon))
+    coverage = np.array(summarize(sums)["coverage"])
+    assert np.all(np.abs(coverage - 0.95) < 0.025), coverage
+
+
+def test_bounds_are_centred_on_the_conditional_median():
+    steps = np.arange(1, 31)
+    lower, upper = interval_bounds(100.0, PARAMS, steps)
+    np.testing.assert_allclose(np.sqrt(lower * upper), 100.0 * np.exp(PARAMS[0] * steps))
+    forecast = forecast_arrays(100.0, 30, rng=np.random.default_rng(1), params=PARAMS)
+    np.testing.assert_allclose(forecast["lower_bound"], lower)
+    np.testing.assert_allclose(forecast["upper_bound"], upper)
+
+
+def test_learned_price_is_the_median_inside_the_bounds():
+    steps = np.arange(1, 253)
+    forecast = forecast_arrays(100.0, 252, rng=np.random.default_rng(2), params=PARAMS)
+    np.testing.assert_allclose(forecast["price"], 100.0 * np.exp(PARAMS[0] * steps))
+    assert np.all(forecast["lower_bound"] <= forecast["price"])
+    assert np.all(forecast["price"] <= forecast["upper_bound"])
+
+    # Half of the simulated paths end above the reported price on every day
+    paths = compound_prices(100.0, draw_log_returns(np.random.default_rng(3), (20000, 252), PARAMS))
+    above = (paths > forecast["price"]).mean(axis=0)
+    assert np.all(np.abs(above - 0.5) < 0.02), above
+
+
+def test_streamed_blocks_keep_the_whole_forecast_interval():
+    blocks = list(iter_forecast_blocks(100.0, 30, block_size=7, rng=np.random.default_rng(1), params=PARAMS))
+    whole = forecast_arrays(100.0, 30, rng=np.random.default_rng(1), params=PARAMS)
+    for key in ("price", "lower_bound", "upper_bound"):
+        np.testing.assert_allclose(np.concatenate([block[key] for block in blocks]), whole[key])
+
+
+def test_short_series_score_nothing():
+    prices = 100.0 * np.exp(np.cumsum(np.random.default_rng(3).normal(0.0, 0.01, 50)))
+    sums = backtest_prices(prices, 14)
+    assert all(not values.any() for values in sums.values())
+    assert summarize(sums)["coverage"] == [None] * 14
+
+    # Exactly one window plus the horizon gives a single origin
+    prices = 100.0 * np.exp(np.cumsum(np.random.default_rng(4).normal(0.0, 0.01, 90 + 14)))
+    assert summarize(backtest_prices(prices, 14))["n"] == [1] * 14
+
+
+def _compound_loop(latest_price, log_returns):
+    prices, price = [], latest_price
+    for log_return in log_returns:
+        price = max(price * np.exp(log_return), PRICE_FLOOR)
+        prices.append(price)
+    return np.array(prices)
+
+
+def test_compounding_matches_the_day_by_day_loop():
+    rng = np.random.default_rng(5)
+    for start, params in [(100.0, None), (52.0, (-0.01, 0.02)), (50.0, (-0.05, 0.01))]:
+        log_returns = draw_log_returns(rng, (20, 250), params)
+        paths = compound_prices(start, log_returns)
+        for row, path in zip(log_returns, paths):
+            np.testing.assert_allclose(path, _compound_loop(start, row), rtol=1e-12)
+
+
+def test_floor_reflects_the_walk():
+    # Falls to the floor, is held there, then compounds up from it
+    log_returns = np.log([0.5, 0.9, 1.1, 1.1])
+    np.testing.assert_allclose(compound_prices(80.0, log_returns),
+                               [PRICE_FLOOR, PRICE_FLOOR, PRICE_FLOOR * 1.1, PRICE_FLOOR * 1.21])
+    paths = compound_prices(60.0, draw_log_returns(np.random.default_rng(6), (100, 500), (-0.01, 0.03)))
+    assert paths.min() >= PRICE_FLOOR * (1 - 1e-12)
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from feature import load_history
+from history_store import BAR_DTYPE, HEADER_SIZE, HistoryStoreError, make_bars, open_store
+from server import RequestError, parse_predict_query
+
+
+@pytest.mark.parametrize("ticker", ["../OUT", "a/b", ".hidden", "", "X" * 17])
+def test_invalid_tickers_never_reach_the_filesystem(tmp_path, ticker):
+    store = open_store(tmp_path / "data")
+    with pytest.raises(HistoryStoreError):
+        load_history(ticker, store=store, rng=np.random.default_rng(0))
+    assert not (tmp_path / "OUT.bars").exists()
+    assert [path.name for path in tmp_path.iterdir()] == ["data"]
+
+
+def test_valid_tickers_round_trip(tmp_path):
+    store = open_store(tmp_path)
+    dates = np.arange("2024-01-01", "2024-01-06", dtype="datetime64[D]")
+    store.append("brk.b", make_bars(dates, np.arange(5.0)))
+    assert "BRK.B" in store
+    assert store.tickers() == ["BRK.B"]
+    assert store.latest("BRK.B")["close"] == 4.0
+
+
+@pytest.mark.parametrize("query", ["ticker=../OUT", "ticker=a%2Fb", "ticker=.x"])
+def test_server_rejects_invalid_tickers(query):
+    with pytest.raises(RequestError) as error:
+        parse_predict_query(query)
+    assert error.value.status == 400
+
+
+@pytest.mark.parametrize("partial", [b"", b"TSBARS"])
+def test_files_without_a_header_are_not_ready(tmp_path, partial):
+    # What a reader sees between a writer's O_CREAT and its first write (or after a torn header)
+    store = open_store(tmp_path)
+    (tmp_path / "GOOG.bars").write_bytes(partial)
+    assert len(store.bars("GOOG")) == 0
+    assert store.latest("GOOG") is None
+    assert "GOOG" not in store
+
+    dates = np.arange("2024-01-01", "2024-01-04", dtype="datetime64[D]")
+    store.append("GOOG", make_bars(dates, [1.0, 2.0, 3.0]))
+    assert "GOOG" in store
+    np.testing.assert_array_equal(store.bars("GOOG")["close"], [1.0, 2.0, 3.0])
+
+
+def test_new_files_are_written_whole(tmp_path, monkeypatch):
+    writes = []
+    pwrite = os.pwrite
+    monkeypatch.setattr(os, "pwrite", lambda fd, data, offset: writes.append(len(data)) or pwrite(fd, data, offset))
+    monkeypatch.setattr(os, "write", lambda fd, data: pytest.fail("header written separately"))
+    store = open_store(tmp_path)
+    dates = np.arange("2024-01-01", "2024-01-04", dtype="datetime64[D]")
+    store.append("GOOG", make_bars(dates, [1.0, 2.0, 3.0]))
+    assert writes == [HEADER_SIZE + 3 * BAR_DTYPE.itemsize]
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from indicators import COLUMNS, IndicatorState, bollinger, ema, indicator_columns, rsi, sma, volatility
+
+
+def random_walk(days, seed=0):
+    return 100.0 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, days)))
+
+
+def reference_ema(prices, span):
+    alpha, out = 2.0 / (span + 1.0), [prices[0]]
+    for price in prices[1:]:
+        out.append(out[-1] + alpha * (price - out[-1]))
+    return np.array(out)
+
+
+def reference_rsi(prices, period):
+    change = np.diff(prices)
+    gain, loss = np.maximum(change, 0), np.maximum(-change, 0)
+    out = np.full(len(prices), np.nan)
+    average_gain, average_loss = gain[:period].mean(), loss[:period].mean()
+    for t in range(period, len(prices)):
+        if t > period:
+            average_gain += (gain[t - 1] - average_gain) / period
+            average_loss += (loss[t - 1] - average_loss) / period
+        out[t] = 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+    return out
+
+
+def test_moving_averages_match_reference():
+    prices = random_walk(300)
+    expected = np.convolve(prices, np.ones(20) / 20, mode="valid")
+    np.testing.assert_allclose(sma(prices, 20)[19:], expected, rtol=1e-10)
+    assert np.isnan(sma(prices, 20)[:19]).all()
+    # Long enough that the closed-form smoothing needs several blocks
+    np.testing.assert_allclose(ema(random_walk(5000), 12), reference_ema(random_walk(5000), 12), rtol=1e-9)
+
+
+def test_rsi_and_volatility_match_reference():
+    prices = random_walk(200, seed=1)
+    np.testing.assert_allclose(rsi(prices, 14), reference_rsi(prices, 14), rtol=1e-9, equal_nan=True)
+    returns = np.diff(np.log(prices))
+    assert volatility(prices, 20)[-1] == pytest.approx(returns[-20:].std(ddof=1), rel=1e-9)
+
+
+def test_bollinger_bands_straddle_the_mean():
+    middle, upper, lower = bollinger(random_walk(100, seed=2))
+    np.testing.assert_allclose(upper - middle, middle - lower)
+    assert np.all(upper[19:] >= lower[19:])
+
+
+def test_matrix_rows_match_single_histories():
+    long, short = random_walk(120, seed=3), random_walk(60, seed=4)
+    matrix = np.full((2, 120), np.nan)
+    matrix[0], matrix[1, 60:] = long, short
+    columns = indicator_columns(matrix)
+    assert tuple(columns) == COLUMNS
+    for name, values in columns.items():
+        np.testing.assert_allclose(values[0], indicator_columns(long)[name], equal_nan=True)
+        np.testing.assert_allclose(values[1, 60:], indicator_columns(short)[name], equal_nan=True)
+        assert np.isnan(values[1, :60]).all()
+
+
+def test_streaming_state_matches_batch_bar_by_bar():
+    # Long enough for the rolling windows to re-sum their buffers several times
+    close = random_walk(3000, seed=5)
+    spread = np.random.default_rng(6).uniform(0.0, 0.01, len(close)) * close
+    high, low = close + spread, close - spread
+    expected = indicator_columns(close, high, low)
+
+    state = IndicatorState()
+    for t, bar in enumerate(zip(close.tolist(), high.tolist(), low.tolist())):
+        latest = state.update(*bar)
+        for name in COLUMNS:
+            np.testing.assert_allclose(latest[name], expected[name][t], rtol=1e-9, atol=1e-9, equal_nan=True,
+                                       err_msg=f"{name} at bar {t}")
+
+
+def test_state_from_history_continues_like_batch():
+    close = random_walk(400, seed=7)
+    state = IndicatorState.from_history(close[:300])
+    for price in close[300:].tolist():
+        latest = state.update(price)
+    expected = indicator_columns(close)
+    for name in COLUMNS:
+        assert latest[name] == pytest.approx(expected[name][-1], rel=1e-9)
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+
+from feature import HISTORY_DAYS
+from fitting import fit_matrix
+from history_store import open_store
+from ingest import ingest_files, main
+from model_registry import open_registry
+
+
+def write_csv(path, lines, header="ticker,date,open,high,low,close,volume"):
+    path.write_text("\n".join([header, *lines]) + "\n")
+    return path
+
+
+def test_duplicate_dates_keep_the_last_row(tmp_path):
+    store = open_store(tmp_path / "data")
+    first = write_csv(tmp_path / "a.csv", ["GOOG,2024-06-03,1,1,1,10,5", "GOOG,2024-06-04,1,1,1,11,5",
+                                           "GOOG,2024-06-03,1,1,1,12,5"])
+    report = ingest_files([first], store)
+    np.testing.assert_array_equal(store.bars("GOOG")["close"], [12.0, 11.0])
+    assert report["duplicates"] == 1 and report["bars_written"] == 2
+
+    # Across files, and against bars already stored, the newer row wins too
+    second = write_csv(tmp_path / "b.csv", ["GOOG,2024-06-04,1,1,1,13,5"])
+    report = ingest_files([second], store)
+    np.testing.assert_array_equal(store.bars("GOOG")["close"], [12.0, 13.0])
+    assert report["duplicates"] == 1
+
+
+def test_missing_sessions_are_filled_with_the_previous_close(tmp_path):
+    store = open_store(tmp_path / "data")
+    # 2024-06-19 (Juneteenth) is a holiday and the weekend is not a session
+    path = write_csv(tmp_path / "a.csv", ["GOOG,2024-06-14,9,12,8,10,100", "GOOG,2024-06-20,10,12,9,11,100"])
+    report = ingest_files([path], store)
+    bars = store.bars("GOOG")
+    np.testing.assert_array_equal(bars["date"], np.array(["2024-06-14", "2024-06-17", "2024-06-18", "2024-06-20"],
+                                                          dtype="datetime64[D]"))
+    assert report["gap_filled"] == 2
+    for field in ("open", "high", "low", "close"):
+        np.testing.assert_array_equal(bars[field][1:3], [10.0, 10.0])
+    np.testing.assert_array_equal(bars["volume"], [100.0, 0.0, 0.0, 100.0])
+
+    # Appended bars are filled from the last stored bar
+    report = ingest_files([write_csv(tmp_path / "b.csv", ["GOOG,2024-06-25,1,1,1,12,5"])], store)
+    assert report["gap_filled"] == 2  # 21st and 24th
+    assert store.latest("GOOG")["close"] == 12.0 and store.bars("GOOG")["close"][-2] == 11.0
+
+
+def test_invalid_rows_are_rejected_by_reason(tmp_path):
+    store = open_store(tmp_path / "data")
+    path = write_csv(tmp_path / "a.csv", [
+        "GOOG,2024-06-03,1,1,1,10,5",
+        "BAD/X,2024-06-03,1,1,1,10,5",   # bad_ticker
+        "GOOG,not-a-date,1,1,1,10,5",    # bad_date
+        "GOOG,2024-06-04,1,1,1,-3,5",    # bad_price
+        "GOOG,2024-06-05,1,0.5,2,10,5",  # bad_price: high < low
+        "GOOG,2024-06-06,1,1,1,10",      # malformed
+        "GOOG,2024-06-07,,,,10,",        # Missing open/high/low/volume default to the close and zero
+    ])
+    report = ingest_files([path], store)
+    assert report["rows"] == 7
+    assert (report["malformed"], report["bad_ticker"], report["bad_date"], report["bad_price"]) == (1, 1, 1, 2)
+    assert store.tickers() == ["GOOG"]
+    latest = store.latest("GOOG")
+    assert latest["date"] == np.datetime64("2024-06-07")
+    assert (latest["open"], latest["high"], latest["low"], latest["volume"]) == (10.0, 10.0, 10.0, 0.0)
+
+
+def test_command_line_publishes_the_model_state(tmp_path, capsys):
+    dates = np.arange("2024-01-01", "2024-07-01", dtype="datetime64[D]")
+    dates = dates[np.is_busday(dates, holidays=["2024-01-01", "2024-01-15", "2024-02-19", "2024-03-29",
+                                                "2024-05-27", "2024-06-19"])]
+    closes = 100.0 * np.exp(np.cumsum(np.random.default_rng(0).normal(0.0, 0.01, len(dates))))
+    path = write_csv(tmp_path / "a.csv", [f"MSFT,{date},{float(close)!r}" for date, close in zip(dates, closes)],
+                     header="ticker,date,close")
+    registry_path = tmp_path / "models.reg"
+    argv = [str(path), "--data-dir", str(tmp_path / "data"), "--model-state", str(tmp_path / "state.npz"),
+            "--registry", str(registry_path)]
+    assert main(argv) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["bars_written"] == len(dates) and report["gap_filled"] == 0
+
+    entry = open_registry(str(registry_path)).get("MSFT")
+    assert entry["watermark"] == dates[-1].item()
+    fit = fit_matrix(closes[None, -HISTORY_DAYS:])
+    assert np.isclose(entry["drift"], fit["drift"][0]) and np.isclose(entry["volatility"], fit["volatility"][0])
@@ -0,0 +1,64 @@
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    monkeypatch.setattr(metrics, "_help", dict(metrics._help))
+    was_enabled = metrics.enabled()
+    metrics.enable()
+    yield
+    metrics.enable(was_enabled)
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_histogram_buckets_are_cumulative():
+    for seconds in (0.00005, 0.0003, 0.0003, 0.001, 3.0, 20.0):
+        metrics.observe("test_seconds", seconds, endpoint="/predict")
+    samples = _samples(metrics.render_prometheus())
+
+    bounds = [str(bound) for bound in metrics.LATENCY_BUCKETS] + ["+Inf"]
+    counts = [int(samples[f'test_seconds_bucket{{endpoint="/predict",le="{bound}"}}']) for bound in bounds]
+    assert counts == sorted(counts)
+    # Bucket bounds are inclusive (le), and +Inf holds every sample
+    assert counts[bounds.index("0.0001")] == 1
+    assert counts[bounds.index("0.0005")] == 3
+    assert counts[bounds.index("0.001")] == 4
+    assert counts[bounds.index("10.0")] == 5
+    assert counts[-1] == int(samples['test_seconds_count{endpoint="/predict"}']) == 6
+    assert float(samples['test_seconds_sum{endpoint="/predict"}']) == pytest.approx(23.00165)
+
+
+def test_types_follow_the_registration():
+    metrics.describe("test_requests_total", "counter", "Requests.")
+    metrics.increment("test_requests_total", endpoint="/predict")
+    metrics.increment("test_requests_total", 2, endpoint="/predict")
+    metrics.register_gauge("test_queue_depth", "Queued jobs.", lambda: 3)
+    metrics.register_counter("test_lookups_total", "Lookups.",
+                             lambda: {(("outcome", "hits"),): 5, (("outcome", "misses"),): 1})
+    metrics.observe(metrics.STAGE_METRIC, 0.01, stage="fit")
+    text = metrics.render_prometheus()
+
+    assert "# TYPE test_requests_total counter" in text
+    assert "# TYPE test_queue_depth gauge" in text
+    assert "# TYPE test_lookups_total counter" in text
+    assert f"# TYPE {metrics.STAGE_METRIC} histogram" in text
+    samples = _samples(text)
+    assert samples['test_requests_total{endpoint="/predict"}'] == "3"
+    assert samples["test_queue_depth"] == "3"
+    assert samples['test_lookups_total{outcome="hits"}'] == "5"
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.enable(False)
+    metrics.increment("test_requests_total")
+    with metrics.stage("fit"):
+        pass
+    assert metrics.render_prometheus() == "\n"
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import model_registry
+from feature import data_version, load_history
+from history_store import make_bars, open_store
+from model_registry import ModelRegistry, ModelRegistryError, build_registry, make_records
+
+
+def _fit(drifts, volatilities):
+    count = len(drifts)
+    return {"drift": drifts, "volatility": volatilities, "slope": np.zeros(count), "intercept": np.ones(count),
+            "latest_price": np.full(count, 100.0), "n_obs": np.full(count, 90)}
+
+
+def test_snapshots_round_trip(tmp_path):
+    path = tmp_path / "models.reg"
+    ModelRegistry(path).update(make_records(["msft", "AAPL"], _fit([0.001, 0.002], [0.01, 0.02]), "2024-06-28"))
+    reader = ModelRegistry(path)  # A separate process would open the file like this
+    assert reader.tickers() == ["AAPL", "MSFT"]
+    assert reader.params("msft") == (0.001, 0.01)
+    assert reader.get("AAPL")["n_obs"] == 90
+    assert reader.params("GOOG") is None
+
+    # Updates replace existing rows, add new ones, and reach open readers
+    ModelRegistry(path).update(make_records(["MSFT", "GOOG"], _fit([0.003, 0.004], [0.03, 0.04]), "2024-07-01"))
+    assert reader.tickers() == ["AAPL", "GOOG", "MSFT"]
+    assert reader.params("MSFT") == (0.003, 0.03)
+    assert reader.params("AAPL") == (0.002, 0.02)
+
+
+def test_older_snapshots_are_stale(tmp_path):
+    registry = ModelRegistry(tmp_path / "models.reg")
+    registry.update(make_records(["GOOG", "NAN"], _fit([0.001, np.nan], [0.01, np.nan]), "2024-06-28"))
+    assert registry.params("GOOG", "2024-06-27") == (0.001, 0.01)
+    assert registry.params("GOOG", "2024-06-28") == (0.001, 0.01)
+    assert registry.params("GOOG", "2024-07-01") is None
+    assert registry.params("NAN") is None  # Too short to fit
+
+
+def test_new_bars_invalidate_the_snapshot(tmp_path):
+    store = open_store(tmp_path / "data")
+    dates, _ = load_history("GOOG", store=store, rng=np.random.default_rng(0))
+    path = tmp_path / "models.reg"
+    build_registry(path, ["GOOG"], store)
+    registry = ModelRegistry(path)
+    assert registry.params("GOOG", data_version("GOOG", store)) is not None
+
+    store.append("GOOG", make_bars(dates[-1:] + 1, np.array([100.0])))
+    assert registry.params("GOOG", data_version("GOOG", store)) is None
+
+
+def test_other_model_versions_are_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "models.reg"
+    ModelRegistry(path).update(make_records(["GOOG"], _fit([0.001], [0.01]), "2024-06-28"))
+    monkeypatch.setattr(model_registry, "MODEL_VERSION", model_registry.MODEL_VERSION + 1)
+    assert len(ModelRegistry(path)) == 0
+
+
+def test_truncated_files_are_rejected(tmp_path):
+    path = tmp_path / "models.reg"
+    ModelRegistry(path).update(make_records(["GOOG"], _fit([0.001], [0.01]), "2024-06-28"))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ModelRegistryError):
+        ModelRegistry(path).params("GOOG")
@@ -0,0 +1,90 @@
+import numpy as np
+
+from fitting import fit_matrix
+from history_store import make_bars, open_store
+from ingest import ingest_files
+from model_registry import open_registry
+from model_state import RollingModelState
+
+DATES = np.arange("2024-01-01", "2024-12-31", dtype="datetime64[D]")
+DATES = DATES[np.is_busday(DATES)]
+
+
+def closes(seed):
+    return 100.0 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0.0, 0.02, len(DATES))))
+
+
+def write_csv(path, rows):
+    with open(path, "w") as handle:
+        handle.write("ticker,date,close\n")
+        handle.writelines(f"{ticker},{date},{float(close)!r}\n" for ticker, date, close in rows)
+
+
+def assert_matches_fit(state, store, tickers):
+    estimates = state.estimates()
+    fit = fit_matrix(np.vstack([store.tail(ticker, state.window)["close"] for ticker in tickers]))
+    rows = [state.index[ticker] for ticker in tickers]
+    for name in ("drift", "volatility", "latest_price"):
+        np.testing.assert_allclose(estimates[name][rows], fit[name], rtol=1e-9)
+
+
+def test_rolling_window_matches_a_refit():
+    prices = np.vstack([closes(0), closes(1)])
+    prices[1, :40] = np.nan  # Shorter history
+    state = RollingModelState.from_price_matrix(["A", "B"], prices)
+    fit = fit_matrix(prices[:, -state.window:])
+    for name in ("drift", "volatility", "latest_price"):
+        np.testing.assert_allclose(state.estimates()[name], fit[name], rtol=1e-9)
+
+
+def test_ingest_keeps_state_current_and_publishes(tmp_path):
+    store, state = open_store(tmp_path / "data"), RollingModelState([])
+    series = {"AAA": closes(2), "BBB": closes(3)}
+    first = [(ticker, date, close) for ticker, values in series.items() for date, close in zip(DATES[:150], values)]
+    write_csv(tmp_path / "first.csv", first)
+    ingest_files([tmp_path / "first.csv"], store, model_state=state)
+    assert_matches_fit(state, store, list(series))
+
+    # Appended bars are pushed onto the state...
+    later = [(ticker, date, close) for ticker, values in series.items()
+             for date, close in zip(DATES[150:155], values[150:155])]
+    write_csv(tmp_path / "later.csv", later)
+    ingest_files([tmp_path / "later.csv"], store, model_state=state)
+    assert_matches_fit(state, store, list(series))
+    assert state.watermark[state.index["AAA"]] == DATES[154]
+
+    # ...a rewrite of older bars refills the ticker from the store
+    write_csv(tmp_path / "fix.csv", [("BBB", DATES[140], 1.5 * series["BBB"][140])])
+    ingest_files([tmp_path / "fix.csv"], store, model_state=state)
+    assert_matches_fit(state, store, list(series))
+
+    registry = open_registry(str(tmp_path / "models.reg"))
+    state.publish(registry)
+    drift, volatility = registry.params("BBB", store.latest("BBB")["date"])
+    assert (drift, volatility) == tuple(state.estimates()[name][state.index["BBB"]] for name in ("drift", "volatility"))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    state = RollingModelState(["A"])
+    state.extend({"A": (DATES[:10], closes(4)[:10]), "B": (DATES[:3], closes(5)[:3])})
+    state.save(tmp_path / "state.npz")
+    loaded = RollingModelState.load(tmp_path / "state.npz")
+    assert loaded.tickers == ["A", "B"]
+    np.testing.assert_array_equal(loaded.watermark, [DATES[9], DATES[2]])
+    np.testing.assert_array_equal(loaded.estimates()["drift"], state.estimates()["drift"])
+
+
+def test_rebuild_recomputes_the_running_sums():
+    prices = np.vstack([closes(6), closes(7)])
+    state = RollingModelState(["A", "B"])
+    # Bars beyond the window are pushed in and dropped out again
+    state.extend({"A": (DATES, prices[0]), "B": (DATES[:100], prices[1, :100])})
+    before = state.estimates()
+    pushed = dict(state.sums)
+    state.rebuild()
+    for field, values in pushed.items():
+        np.testing.assert_allclose(state.sums[field], values, rtol=1e-9)
+    for name in ("drift", "volatility", "slope", "latest_price"):
+        np.testing.assert_allclose(state.estimates()[name], before[name], rtol=1e-9)
+    fit = fit_matrix(np.vstack([prices[0, -state.window:], prices[1, 100 - state.window:100]]))
+    np.testing.assert_allclose(state.estimates()["drift"], fit["drift"], rtol=1e-9)
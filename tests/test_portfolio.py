@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from feature import load_history
+from portfolio import (_cholesky, align_histories, forecast_portfolio, iter_correlated_log_prices,
+                       shrinkage_covariance)
+
+TICKERS = ["GOOG", "AAPL", "MSFT"]
+WEIGHTS = [0.4, 0.35, 0.25]
+
+
+def _exact_values(n_paths, seed, horizon=30, initial_value=1e6):
+    """Portfolio values of the same paths forecast_portfolio draws, computed directly."""
+    rng = np.random.default_rng(seed)
+    _, prices = align_histories([load_history(ticker, rng=rng) for ticker in TICKERS])
+    returns = np.diff(np.log(prices), axis=0)
+    covariance, _ = shrinkage_covariance(returns)
+    shares = initial_value * np.asarray(WEIGHTS) / prices[-1]
+    (log_prices,) = iter_correlated_log_prices(np.log(prices[-1]), returns.mean(axis=0), _cholesky(covariance),
+                                               horizon, n_paths, n_paths, rng)
+    return np.exp(log_prices) @ shares
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, None])
+def test_portfolio_quantiles_match_exact_for_any_chunk_size(chunk_size):
+    n_paths = 4000
+    result = forecast_portfolio(TICKERS, WEIGHTS, 30, n_paths=n_paths, initial_value=1e6, chunk_size=chunk_size,
+                                rng=np.random.default_rng(5))
+    exact = np.quantile(_exact_values(n_paths, 5), result["quantile_levels"], axis=0)
+    np.testing.assert_allclose(result["portfolio_quantiles"], exact, rtol=2e-3)
+
+
+def test_value_at_risk_grows_with_confidence():
+    result = forecast_portfolio(TICKERS, WEIGHTS, 30, n_paths=20_000, initial_value=1e6,
+                                rng=np.random.default_rng(0))
+    assert np.all(result["var"][0.99] > result["var"][0.95])
+    lower, median, upper = result["portfolio_quantiles"]
+    assert np.all(lower < median) and np.all(median < upper)
+
+
+def test_shrinkage_matches_the_ledoit_wolf_formula():
+    returns = np.random.default_rng(2).standard_normal((40, 6)) @ np.diag([1, 2, 1, 3, 1, 1])
+    covariance, shrinkage = shrinkage_covariance(returns)
+    centred = returns - returns.mean(axis=0)
+    sample = centred.T @ centred / len(returns)
+    target = np.trace(sample) / 6 * np.eye(6)
+    spread = np.mean([((np.outer(x, x) - sample) ** 2).sum() for x in centred]) / len(returns)
+    expected = min(spread / ((sample - target) ** 2).sum(), 1.0)
+    assert shrinkage == pytest.approx(expected)
+    np.testing.assert_allclose(covariance, expected * target + (1 - expected) * sample)
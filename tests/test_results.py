@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import pytest
+
+from feature import predict_ticker
+from indicators import COLUMNS as INDICATOR_COLUMNS
+from results import load_npz, save_npz
+
+
+def test_npz_round_trip_keeps_each_resolution():
+    daily = predict_ticker("GOOG", 3, rng=np.random.default_rng(0), columnar=True)
+    intraday = predict_ticker("TSLA", 1, rng=np.random.default_rng(1), columnar=True, resolution="5m")
+    archive = io.BytesIO()
+    save_npz([daily, intraday], archive)
+    archive.seek(0)
+
+    loaded = load_npz(archive)
+    assert [result["ticker"] for result in loaded] == ["GOOG", "TSLA"]
+    for original, result in zip((daily, intraday), loaded):
+        assert result["latest_price"] == original["latest_price"]
+        for section in ("historical", "predicted"):
+            for column, values in result[section].items():
+                assert values.dtype == original[section][column].dtype
+                np.testing.assert_array_equal(values, original[section][column])
+    assert loaded[0]["predicted"]["date"].dtype == np.dtype("datetime64[D]")
+    assert loaded[1]["historical"]["date"].dtype == np.dtype("datetime64[m]")
+
+
+def test_empty_batch_round_trips():
+    archive = io.BytesIO()
+    save_npz([], archive)
+    archive.seek(0)
+    assert load_npz(archive) == []
+
+
+def test_indicator_columns_are_saved():
+    results = [predict_ticker(ticker, 3, rng=np.random.default_rng(seed), columnar=True, indicators=True)
+               for seed, ticker in enumerate(("GOOG", "MSFT"))]
+    archive = io.BytesIO()
+    save_npz(results, archive)
+    archive.seek(0)
+    for original, result in zip(results, load_npz(archive)):
+        assert list(result["historical"]) == list(original["historical"])
+        for column in INDICATOR_COLUMNS:
+            np.testing.assert_array_equal(result["historical"][column], original["historical"][column])
+
+
+def test_results_with_different_columns_are_rejected():
+    plain = predict_ticker("GOOG", 3, rng=np.random.default_rng(0), columnar=True)
+    with_indicators = predict_ticker("MSFT", 3, rng=np.random.default_rng(1), columnar=True, indicators=True)
+    with pytest.raises(ValueError, match="MSFT"):
+        save_npz([plain, with_indicators], io.BytesIO())
@@ -0,0 +1,42 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from feature import load_history
+from history_store import make_bars, open_store
+from scheduler import PrecomputeScheduler
+from server import PredictionService
+
+
+def test_new_bars_start_a_cycle(tmp_path):
+    store = open_store(tmp_path)
+    dates, _ = load_history("GOOG", store=store, rng=np.random.default_rng(0))
+
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            service = PredictionService(executor, store=store)
+            scheduler = PrecomputeScheduler(service, ["GOOG"], interval=3600.0, poll_interval=0.01)
+            task = asyncio.ensure_future(scheduler.run())
+            try:
+                while not scheduler.last_cycle:
+                    await asyncio.sleep(0.01)
+                first = scheduler.last_cycle
+                assert first["computed"] == 1
+                await asyncio.sleep(0.05)
+                assert scheduler.last_cycle is first  # No new data, no new cycle before the interval
+
+                # What ingest.py does from another process
+                store.append("GOOG", make_bars(dates[-1:] + 1, np.array([100.0])))
+                await asyncio.wait_for(_changed(scheduler, first), 5.0)
+                assert scheduler.last_cycle["computed"] == 1
+                assert not scheduler.data_changed()
+            finally:
+                task.cancel()
+
+    asyncio.run(run())
+
+
+async def _changed(scheduler, cycle):
+    while scheduler.last_cycle is cycle:
+        await asyncio.sleep(0.01)
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+from cache import forecast_prefix
+from indicators import COLUMNS as INDICATOR_COLUMNS
+from server import (CACHE_HORIZON, MAX_CHUNK_ELEMENTS, MAX_SIMULATED_VALUES, PredictionService, RequestError,
+                    _chunk_size, _run_prediction, _with_indicators, parse_predict_query)
+
+
+@pytest.mark.parametrize("query", [
+    "ticker=GOOG&paths=1000000&days=365",
+    "ticker=GOOG&paths=10000&days=30&resolution=1m",
+])
+def test_monte_carlo_requests_are_capped(query):
+    with pytest.raises(RequestError) as error:
+        parse_predict_query(query)
+    assert error.value.status == 400
+
+
+def test_cap_counts_the_cache_horizon():
+    paths = MAX_SIMULATED_VALUES // CACHE_HORIZON // 390
+    assert parse_predict_query(f"ticker=GOOG&paths={paths}&days=1&resolution=1m")[2] == paths
+    with pytest.raises(RequestError):
+        parse_predict_query(f"ticker=GOOG&paths={paths + 1}&days=1&resolution=1m")
+
+
+@pytest.mark.parametrize("days, resolution", [(1, "1d"), (30, "1d"), (365, "1d"), (30, "1m")])
+def test_chunks_stay_bounded(days, resolution):
+    bars = days * (390 if resolution == "1m" else 1)
+    assert 1 <= _chunk_size(days, resolution) * bars <= MAX_CHUNK_ELEMENTS
+
+
+def test_indicators_are_computed_on_request_only():
+    result, _ = _run_prediction("GOOG", 5, 0, None)
+    assert INDICATOR_COLUMNS[0] not in result["historical"]
+
+    prefix = _with_indicators(forecast_prefix(result, 3))
+    assert set(INDICATOR_COLUMNS) <= set(prefix["historical"])
+    # Kept with the entry the prefix was cut from
+    assert set(INDICATOR_COLUMNS) <= set(result["historical"])
+
+
+def test_cache_totals_are_counters():
+    service = PredictionService(executor=None)
+    service.register_metrics()
+    text = metrics.render_prometheus()
+    for metric in ("stock_cache_lookups_total", "stock_cache_evictions_total"):
+        assert f"# TYPE {metric} counter" in text
+    assert 'stock_cache_lookups_total{outcome="misses"} 0' in text
+    assert "# TYPE stock_cache_entries gauge" in text
+
+
+def _stream(service, *request):
+    async def collect():
+        return list(await service.stream(*request))
+    return asyncio.run(collect())
+
+
+def test_streams_share_the_forecast_cache():
+    with ThreadPoolExecutor(1) as executor:
+        service = PredictionService(executor)
+        first = _stream(service, "GOOG", 20, 0)
+        second = _stream(service, "GOOG", 14, 0)
+        stats = service.cache.stats()
+    assert (stats["entries"], stats["misses"], stats["hits"]) == (1, 1, 1)
+
+    kinds = [event["event"] for event in first]
+    assert kinds == ["history", "points", "points", "points", "done"]
+    streamed = [point for event in first if event["event"] == "points" for point in event["predicted_data"]]
+    assert len(streamed) == 20
+    assert [point for event in second if event["event"] == "points"
+            for point in event["predicted_data"]] == streamed[:14]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from batch import predict_many, predict_universe, ticker_rng
+from shared_history import SharedHistory, attach, detach_all, pack_rng_state, unpack_rng
+
+TICKERS = ["GOOG", "AAPL", "ABCDEFGHIJKLMNOPQRSTU", "X"]
+
+
+def _by_ticker(results):
+    return {result["ticker"]: result for result in results}
+
+
+def _assert_same(left, right):
+    assert left.keys() == right.keys()
+    for ticker, result in left.items():
+        other = right[ticker]
+        assert result["latest_price"] == other["latest_price"]
+        for section in ("historical", "predicted"):
+            for column, values in result[section].items():
+                np.testing.assert_array_equal(values, other[section][column])
+
+
+def test_rng_state_round_trip():
+    rng = ticker_rng("GOOG", 7)
+    rng.standard_normal(3)
+    copy = unpack_rng(pack_rng_state(rng))
+    np.testing.assert_array_equal(copy.standard_normal(5), rng.standard_normal(5))
+
+
+def test_published_histories_read_back_unchanged():
+    dates = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[D]")
+    histories = [(dates, np.arange(10.0)), (dates[4:], np.arange(6.0))]
+    rngs = [ticker_rng(ticker) for ticker in TICKERS[1:3]]
+    with SharedHistory.publish(TICKERS[1:3], rngs, histories) as shared:
+        attached = attach(shared.handle)
+        assert attached.ticker(1) == TICKERS[2]
+        for row, (row_dates, prices) in enumerate(histories):
+            got_dates, got_prices = attached.history(row)
+            np.testing.assert_array_equal(got_dates, row_dates)
+            np.testing.assert_array_equal(got_prices, prices)
+        detach_all()
+
+
+@pytest.mark.parametrize("options", [{}, {"n_paths": 200}, {"model": "arima"}, {"indicators": True}])
+def test_predict_universe_matches_predict_many(options):
+    expected = _by_ticker(predict_many(TICKERS, 5, workers=1, seed=3, columnar=True, **options))
+    shared = _by_ticker(predict_universe(TICKERS, 5, workers=2, seed=3, tickers_per_task=3, columnar=True,
+                                         **options))
+    _assert_same(shared, expected)
+
+
+@pytest.mark.parametrize("predict", [predict_many, predict_universe])
+@pytest.mark.parametrize("options", [{}, {"n_paths": 200}])
+def test_results_do_not_depend_on_sharding(predict, options):
+    expected = _by_ticker(predict(TICKERS, 5, workers=1, seed=3, tickers_per_task=64, columnar=True, **options))
+    for workers, tickers_per_task in [(1, 1), (2, 1), (2, 3), (3, 2)]:
+        got = _by_ticker(predict(TICKERS, 5, workers=workers, seed=3, tickers_per_task=tickers_per_task,
+                                 columnar=True, **options))
+        _assert_same(got, expected)
+    # A ticker predicted on its own gets the same result as in the batch
+    for ticker in TICKERS:
+        _assert_same(_by_ticker(predict([ticker], 5, workers=1, seed=3, columnar=True, **options)),
+                     {ticker: expected[ticker]})
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from simulation import (DEFAULT_BINS, MAX_HISTOGRAM_CELLS, MIN_BINS, SUPPORT_SIGMAS, QuantileHistogram,
+                        histogram_bins, monte_carlo_quantiles, simulate_paths)
+
+PARAMS = (0.0005, 0.02)
+
+
+@pytest.mark.parametrize("horizon", [1, 30, 365, 30 * 390, 365 * 390])
+def test_histogram_memory_is_bounded(horizon):
+    histogram = QuantileHistogram(100.0, horizon, params=PARAMS)
+    assert MIN_BINS <= histogram.n_bins <= DEFAULT_BINS
+    assert histogram.counts.size <= max(MAX_HISTOGRAM_CELLS, horizon * MIN_BINS)
+
+
+def test_short_horizons_keep_full_resolution():
+    assert histogram_bins(30) == DEFAULT_BINS
+
+
+@pytest.mark.parametrize("horizon", [30, 30 * 390])
+def test_histogram_quantiles_match_empirical(horizon):
+    paths = simulate_paths(100.0, horizon, 4000, np.random.default_rng(0), PARAMS)
+    histogram = QuantileHistogram(100.0, horizon, params=PARAMS)
+    for chunk in np.array_split(paths, 4):
+        histogram.add(chunk)
+
+    levels = (0.025, 0.5, 0.975)
+    estimate = histogram.quantiles(levels)
+    # Each estimate sits at its level of the empirical distribution, up to the paths sharing its bin
+    for level, values in zip(levels, estimate):
+        assert np.all(np.abs((paths <= values).mean(axis=0) - level) < 0.01)
+
+
+@pytest.mark.parametrize("horizon", [30, 30 * 390])
+def test_bins_are_a_fraction_of_the_spread(horizon):
+    params = (0.0, 0.001)  # Roughly one 1m bar
+    spread = params[1] * np.sqrt(np.arange(1, horizon + 1))
+    histogram = QuantileHistogram(100.0, horizon, params=params)
+    assert np.all(histogram.width <= 2 * SUPPORT_SIGMAS * spread / histogram.n_bins * (1 + 1e-9))
+
+    paths = simulate_paths(100.0, horizon, 2000, np.random.default_rng(2), params)
+    histogram.add(paths)
+    levels = (0.025, 0.5, 0.975)
+    error = np.abs(np.log(histogram.quantiles(levels)) - np.log(np.quantile(paths, levels, axis=0)))
+    assert np.all(error[:, -1] < 0.05 * spread[-1]), error[:, -1] / spread[-1]
+
+
+def test_chunked_and_exact_quantiles_agree():
+    exact = monte_carlo_quantiles(100.0, 30, 20_000, rng=np.random.default_rng(1), params=PARAMS)
+    chunked = monte_carlo_quantiles(100.0, 30, 20_000, chunk_size=1_000, rng=np.random.default_rng(1),
+                                    params=PARAMS)
+    np.testing.assert_allclose(chunked["median"], exact["median"], rtol=1e-3)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from trading_calendar import (RESOLUTIONS, bar_index, bars_per_session, format_dates, get_calendar,
+                              nyse_holidays, register_calendar)
+
+HOLIDAYS_2024 = ["2024-01-01", "2024-01-15", "2024-02-19", "2024-03-29", "2024-05-27", "2024-06-19",
+                 "2024-07-04", "2024-09-02", "2024-11-28", "2024-12-25"]
+
+
+def test_nyse_holidays():
+    np.testing.assert_array_equal(nyse_holidays(2024, 2024), np.array(HOLIDAYS_2024, dtype="datetime64[D]"))
+    holidays = nyse_holidays(2021, 2027).astype(str).tolist()
+    assert "2021-07-05" in holidays          # July 4 on a Sunday is observed on Monday
+    assert "2027-06-18" in holidays          # June 19 on a Saturday is observed on Friday
+    assert "2021-12-31" not in holidays      # No Friday make-up for a Saturday New Year
+    assert "2021-06-18" not in holidays      # Juneteenth only from 2022
+
+
+def test_sessions_skip_weekends_and_holidays():
+    calendar = get_calendar()
+    sessions = calendar.sessions("2024-01-01", "2024-12-31")
+    assert len(sessions) == 252
+    assert not np.isin(sessions, np.array(HOLIDAYS_2024, dtype="datetime64[D]")).any()
+    assert calendar.count_sessions("2024-01-01", "2025-01-01") == 252
+    np.testing.assert_array_equal(calendar.is_session(["2024-06-18", "2024-06-19", "2024-06-22"]),
+                                  [True, False, False])
+
+
+def test_next_and_previous_sessions():
+    calendar = get_calendar()
+    # After Friday 2024-06-14 come Mon 17, Tue 18 and (past Juneteenth) Thu 20
+    assert format_dates(calendar.next_sessions("2024-06-14", 3)) == ["2024-06-17", "2024-06-18", "2024-06-20"]
+    # On a holiday, the previous sessions end on the session before it
+    assert format_dates(calendar.previous_sessions("2024-06-19", 2)) == ["2024-06-17", "2024-06-18"]
+    assert format_dates(calendar.previous_sessions("2024-06-20", 1)) == ["2024-06-20"]
+    with pytest.raises(ValueError):
+        calendar.next_sessions("2024-06-14", 3)[0] = np.datetime64("2000-01-01")  # Shared cached arrays
+
+
+@pytest.mark.parametrize("resolution, bars", [("1d", 1), ("30m", 13), ("15m", 26), ("5m", 78), ("1m", 390)])
+def test_bars_per_session(resolution, bars):
+    assert bars_per_session(resolution) == bars
+    index = bar_index(np.array(["2024-06-17", "2024-06-18"], dtype="datetime64[D]"), resolution)
+    assert len(index) == 2 * bars
+    minutes = RESOLUTIONS[resolution]
+    if minutes is not None:
+        # Bars are stamped with their open time, the last one closing at 16:00
+        assert index[0] == np.datetime64("2024-06-17T09:30")
+        assert index[bars - 1] == np.datetime64("2024-06-17T16:00") - np.timedelta64(minutes, "m")
+        assert index[bars] == np.datetime64("2024-06-18T09:30")
+
+
+def test_unknown_names_are_rejected():
+    with pytest.raises(ValueError):
+        bars_per_session("2m")
+    with pytest.raises(ValueError):
+        get_calendar("LSE")
+
+
+def test_registered_calendars():
+    register_calendar("TEST", holidays=["2024-06-18"])
+    assert format_dates(get_calendar("TEST").next_sessions("2024-06-14", 3)) == ["2024-06-17", "2024-06-19",
+                                                                                 "2024-06-20"]
@@ -0,0 +1,170 @@
+# =================================================================
+# TRADING-DAY CALENDAR
+# Generates business-day date ranges as datetime64[D] arrays with
+# numpy's busday machinery, so history and forecast dates skip
+# weekends and exchange holidays without per-day datetime work.
+# Holiday lists are pluggable (register_calendar); generated ranges are
+# cached, and dates are only formatted to strings, in bulk, at output.
+# =================================================================
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_CALENDAR = "NYSE"
+HOLIDAY_YEARS = (1990, 2100)
+
+# Bar resolutions: minutes per bar (None means one bar per session)
+RESOLUTIONS = {"1d": None, "30m": 30, "15m": 15, "5m": 5, "1m": 1}
+DEFAULT_RESOLUTION = "1d"
+SESSION_OPEN_MINUTES = 9 * 60 + 30  # Regular session 09:30-16:00 exchange time
+SESSION_MINUTES = 390
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """The n-th (1-based; -1 for last) given weekday (Mon=0) of a month."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_holidays(first_year, last_year):
+    """
+    Returns the regular NYSE full-day holidays for a range of years as a
+    datetime64[D] array (unscheduled closures are not included).
+    """
+    holidays = []
+    for year in range(first_year, last_year + 1):
+        new_year = date(year, 1, 1)
+        if new_year.weekday() != 5:  # No Friday make-up when Jan 1 falls on a Saturday
+            holidays.append(_observed(new_year))
+        holidays += [
+            _nth_weekday(year, 1, 0, 3),                 # Martin Luther King Jr. Day
+            _nth_weekday(year, 2, 0, 3),                 # Washington's Birthday
+            _easter(year) - timedelta(days=2),           # Good Friday
+            _nth_weekday(year, 5, 0, -1),                # Memorial Day
+            _observed(date(year, 7, 4)),                 # Independence Day
+            _nth_weekday(year, 9, 0, 1),                 # Labor Day
+            _nth_weekday(year, 11, 3, 4),                # Thanksgiving
+            _observed(date(year, 12, 25)),               # Christmas
+        ]
+        if year >= 2022:
+            holidays.append(_observed(date(year, 6, 19)))  # Juneteenth
+    return np.array(sorted(holidays), dtype="datetime64[D]")
+
+
+class TradingCalendar:
+    """
+    A weekmask plus holiday list, with cached session-range generation.
+    Returned arrays are read-only because they are shared through the cache.
+    """
+
+    def __init__(self, holidays=(), weekmask="1111100"):
+        self.busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=np.asarray(holidays, dtype="datetime64[D]"))
+        self.next_sessions = lru_cache(maxsize=1024)(self._next_sessions)
+        self.previous_sessions = lru_cache(maxsize=1024)(self._previous_sessions)
+
+    def _next_sessions(self, start, count):
+        """The `count` trading sessions strictly after `start` (a 'YYYY-MM-DD' string or date)."""
+        offsets = np.arange(1, count + 1)
+        sessions = np.busday_offset(np.datetime64(start, "D"), offsets, roll="backward", busdaycal=self.busdaycal)
+        sessions.setflags(write=False)
+        return sessions
+
+    def _previous_sessions(self, end, count):
+        """The `count` trading sessions ending on or before `end`, oldest first."""
+        offsets = np.arange(1 - count, 1)
+        sessions = np.busday_offset(np.datetime64(end, "D"), offsets, roll="backward", busdaycal=self.busdaycal)
+        sessions.setflags(write=False)
+        return sessions
+
+    def sessions(self, start, end):
+        """All trading sessions with start <= date <= end."""
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        return days[np.is_busday(days, busdaycal=self.busdaycal)]
+
+    def is_session(self, dates):
+        return np.is_busday(np.asarray(dates, dtype="datetime64[D]"), busdaycal=self.busdaycal)
+
+    def count_sessions(self, start, end):
+        """Number of sessions in [start, end)."""
+        return int(np.busday_count(np.datetime64(start, "D"), np.datetime64(end, "D"), busdaycal=self.busdaycal))
+
+
+_CALENDAR_FACTORIES = {
+    DEFAULT_CALENDAR: lambda: TradingCalendar(nyse_holidays(*HOLIDAY_YEARS)),
+    "WEEKDAYS": lambda: TradingCalendar(),
+    "ALL_DAYS": lambda: TradingCalendar(weekmask="1111111"),
+}
+
+
+def register_calendar(name, holidays=(), weekmask="1111100"):
+    """Registers (or replaces) a named calendar built from a holiday list."""
+    _CALENDAR_FACTORIES[name] = lambda: TradingCalendar(holidays, weekmask)
+    get_calendar.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_calendar(name=DEFAULT_CALENDAR):
+    """Returns the shared calendar instance registered under `name`."""
+    try:
+        return _CALENDAR_FACTORIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown trading calendar '{name}'.") from None
+
+
+def bars_per_session(resolution=DEFAULT_RESOLUTION):
+    """Number of bars in one regular session at the given resolution."""
+    try:
+        minutes = RESOLUTIONS[resolution]
+    except KeyError:
+        raise ValueError(f"Unknown resolution '{resolution}'; expected one of {', '.join(RESOLUTIONS)}.") from None
+    return 1 if minutes is None else SESSION_MINUTES // minutes
+
+
+def bar_index(sessions, resolution=DEFAULT_RESOLUTION):
+    """
+    Expands session dates into bar timestamps. Daily resolution returns the
+    sessions themselves (datetime64[D]); intraday resolutions return the
+    open time of every bar in every session as one datetime64[m] array.
+    """
+    minutes = RESOLUTIONS[resolution] if resolution in RESOLUTIONS else bars_per_session(resolution)
+    if minutes is None:
+        return sessions
+    offsets = SESSION_OPEN_MINUTES + np.arange(SESSION_MINUTES // minutes) * minutes
+    opens = np.asarray(sessions, dtype="datetime64[D]").astype("datetime64[m]")
+    return (opens[:, None] + offsets.astype("timedelta64[m]")).ravel()
+
+
+def format_dates(dates):
+    """
+    Formats a datetime64 array as strings in one call: 'YYYY-MM-DD' for
+    daily dates, 'YYYY-MM-DDTHH:MM' for intraday timestamps.
+    """
+    return np.datetime_as_string(np.asarray(dates, dtype="datetime64")).tolist()